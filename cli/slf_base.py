@@ -6,11 +6,13 @@ Performs multiple operations on a Serafin file:
 - select frames
 """
 
+import os.path
 import sys
 from tqdm import tqdm
 
 from pyteltools.geom.transformation import Transformation
 from pyteltools.slf import Serafin
+from pyteltools.slf.misc import equations_var_IDs, prefetched_time_indices
 from pyteltools.slf.variables import do_calculations_in_frame, get_necessary_equations
 from pyteltools.utils.cli import logger, PyTelToolsArgParse
 
@@ -57,14 +59,25 @@ def slf_base(args):
         necessary_equations = get_necessary_equations(resin.header.var_IDs, output_header.var_IDs,
                                                       is_2d=resin.header.is_2d)
 
-        with Serafin.Write(args.out_slf, args.lang, overwrite=args.force) as resout:
+        with Serafin.Write(args.out_slf, args.lang, overwrite=args.force, async_write=True,
+                           append=args.append) as resout:
             resout.write_header(output_header)
 
-            for time_index, time in tqdm(resin.subset_time(args.start, args.end, args.ech), unit='frame'):
+            time_indices = [time_index for time_index, _ in resin.subset_time(args.start, args.end, args.ech)]
+            if all(var_ID in resin.header.var_IDs for var_ID in output_header.var_IDs) and \
+                    output_header.float_type == resin.header.float_type:
+                # No computation is needed: frames are copied (and byte-swapped if necessary) without decoding
+                logger.info('Copying the selected frames and variables')
+                resout.copy_frames(output_header, resin, time_indices, iter_pbar=tqdm)
+                return
+
+            var_IDs = output_header.var_IDs + equations_var_IDs(necessary_equations)
+            for time_index in tqdm(prefetched_time_indices(resin, var_IDs, time_indices), total=len(time_indices),
+                                   unit='frame'):
                 values = do_calculations_in_frame(necessary_equations, resin, time_index, output_header.var_IDs,
                                                   output_header.np_float_type, is_2d=output_header.is_2d,
                                                   us_equation=None)
-                resout.write_entire_frame(output_header, time, values)
+                resout.write_entire_frame(output_header, resin.time[time_index], values)
 
 
 parser = PyTelToolsArgParse(description=__doc__, add_args=['in_slf', 'out_slf', 'shift'])
@@ -78,13 +91,21 @@ group_temp = parser.add_argument_group('Temporal operations (optional)')
 group_temp.add_argument('--ech', type=int, help='frequency sampling of input', default=1)
 group_temp.add_argument('--start', type=float, help='minimum time (in seconds)', default=-float('inf'))
 group_temp.add_argument('--end', type=float, help='maximum time (in seconds)', default=float('inf'))
+group_temp.add_argument('--append', help='append frames to an existing output file (with the same header)',
+                        action='store_true')
 
-parser.add_group_general(['force', 'verbose'])
+parser.add_group_general(['verbose'])
+# an existing output file is checked below (it is expected with `--append`)
+parser.group_general.add_argument('-f', '--force', help='force output overwrite', action='store_true')
 
 
 if __name__ == '__main__':
     args = parser.parse_args()
 
+    if not args.force and not args.append and os.path.isfile(args.out_slf):
+        logger.critical('Output file already exists: %s' % args.out_slf)
+        sys.exit(3)
+
     try:
         slf_base(args)
     except (Serafin.SerafinRequestError, Serafin.SerafinValidationError):
@@ -43,7 +43,11 @@ def slf_flux2d(args):
     logger.debug('The file contains {} open polyline{}.'.format(len(polylines), 's' if len(polylines) > 1 else ''))
 
     # Read Serafin file
-    with Serafin.Read(args.in_slf, args.lang) as resin:
+    if args.next_slf:
+        input_stream = Serafin.MultiRead([args.in_slf] + args.next_slf, args.lang)
+    else:
+        input_stream = Serafin.Read(args.in_slf, args.lang)
+    with input_stream as resin:
         resin.read_header()
         logger.info(resin.header.summary())
         resin.get_time()
@@ -69,7 +73,7 @@ def slf_flux2d(args):
 
         section_names = ['Section %i' % (i + 1) for i in range(len(polylines))]
         calculator = FluxCalculator(flux_type, var_IDs, resin, section_names, polylines, args.ech)
-        calculator.construct_triangles(tqdm)
+        calculator.construct_triangles()
         calculator.construct_intersections()
         result = []
         for time_index, time in enumerate(tqdm(resin.time, unit='frame')):
@@ -95,6 +99,8 @@ def slf_flux2d(args):
 parser = PyTelToolsArgParse(description=__doc__, add_args=['in_slf'])
 parser.add_argument('in_sections', help='set of lines file (*.shp, *.i2s)')
 parser.add_argument('--ech', type=int, help='frequency sampling of input', default=1)
+parser.add_argument('--next_slf', nargs='+', help='following Serafin files of a restart chain (same mesh)',
+                    default=[], metavar='SLF')
 parser.add_argument('--scalars', nargs='*', help='scalars to integrate (up to 2)', default=[], metavar=('VA', 'VB'))
 parser.add_argument('--vectors', nargs=2, help='couple of vectors to integrate (X and Y vectors)', default=[],
                     metavar=('VX', 'VY'))
@@ -4,6 +4,7 @@ Interpolate on a set of points for every frame
 """
 
 import csv
+import numpy as np
 import sys
 from tqdm import tqdm
 from shapefile import ShapefileException
@@ -41,9 +42,9 @@ def slf_int2d(args):
 
         output_header = resin.header.copy()
 
-        mesh = MeshInterpolator(output_header, True)
-        is_inside, point_interpolators = mesh.get_point_interpolators(points)
-        nb_inside = sum(map(int, is_inside))
+        mesh = MeshInterpolator(output_header, False)
+        interpolation = mesh.get_interpolation_matrix(np.array(points, dtype=np.float64).reshape(-1, 2))
+        nb_inside = int(interpolation.is_inside.sum())
 
         if nb_inside == 0:
             logger.critical('No point inside the mesh.')
@@ -68,23 +69,34 @@ def slf_int2d(args):
                                                                settings.FMT_COORD.format(y)))
             csvwriter.writerow(header)
 
+            # Only the nodes of the triangles containing the points are read
+            nodes = interpolation.used_nodes()
+            local_interpolation = interpolation.select_nodes(nodes)
+
+            # Node values are read by blocks of frames
+            block_size = max(1, settings.SERAFIN_READ_BLOCK_SIZE // (len(var_IDs) * len(nodes) *
+                                                                     resin.header.float_size))
+
             for time_index, time in enumerate(tqdm(resin.time, unit='frame')):
                 values = [time_index, time]
-
-                for var_ID in var_IDs:
-                    var = resin.read_var_in_frame(time_index, var_ID)
-                    for pt_id, (point, point_interpolator) in enumerate(zip(points, point_interpolators)):
+                if time_index % block_size == 0:
+                    block_indices = range(time_index, min(time_index + block_size, len(resin.time)))
+                    # interpolation of all the variables and frames of the block at once
+                    interpolated_values = local_interpolation.interpolate(
+                        resin.read_nodes_time_series(var_IDs, nodes, block_indices))
+
+                for var_ID, var in zip(var_IDs, interpolated_values[:, time_index % block_size, :]):
+                    for pt_id, (point, is_inside) in enumerate(zip(points, local_interpolation.is_inside)):
                         if args.long:
                             values_long = values + [str(pt_id + 1)] + [settings.FMT_COORD.format(x) for x in point]
 
-                        if point_interpolator is None:
+                        if not is_inside:
                             if args.long:
                                 csvwriter.writerow(values_long + [var_ID, settings.NAN_STR])
                             else:
                                 values.append(settings.NAN_STR)
                         else:
-                            (i, j, k), interpolator = point_interpolator
-                            int_value = settings.FMT_FLOAT.format(interpolator.dot(var[[i, j, k]]))
+                            int_value = settings.FMT_FLOAT.format(var[pt_id])
                             if args.long:
                                 csvwriter.writerow(values_long + [var_ID, int_value])
                             else:
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+"""
+Write the node-major sidecar file of a Serafin file
+(speeds up the extraction of time series at some nodes, used automatically while the Serafin file is unchanged)
+"""
+
+import sys
+from tqdm import tqdm
+
+from pyteltools.slf import Serafin
+from pyteltools.slf.node_major import write_node_major
+from pyteltools.utils.cli import logger, PyTelToolsArgParse
+
+
+def slf_node_major(args):
+    with Serafin.Read(args.in_slf, args.lang) as resin:
+        resin.read_header()
+        logger.info(resin.header.summary())
+
+        if resin.node_major is not None and not args.force:
+            logger.info('The node-major file is already up to date')
+            return
+        resin.node_major = None  # release the outdated sidecar file (if forced)
+        write_node_major(resin, lambda it: tqdm(it, unit='block'))
+
+
+parser = PyTelToolsArgParse(description=__doc__, add_args=['in_slf'])
+parser.add_group_general(['force', 'verbose'])
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    try:
+        slf_node_major(args)
+    except (Serafin.SerafinRequestError, Serafin.SerafinValidationError):
+        # Message is already reported by slf logger
+        sys.exit(1)
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Compress a Serafin file into a Serafin archive (lossless, with random access to the frames)
+"""
+
+import sys
+from tqdm import tqdm
+
+from pyteltools.slf import Serafin
+from pyteltools.slf.archive import ArchiveWrite, CODECS
+from pyteltools.utils.cli import logger, PyTelToolsArgParse
+
+
+def slf_to_slz(args):
+    with Serafin.Read(args.in_slf, args.lang) as resin:
+        resin.read_header()
+        logger.info(resin.header.summary())
+        resin.get_time()
+
+        with ArchiveWrite(args.out_slz, args.lang, overwrite=args.force, codec=args.codec, level=args.level,
+                          shuffle=not args.no_shuffle, delta=not args.no_delta,
+                          keyframe_interval=args.keyframe_interval) as resout:
+            resout.write_header(resin.header)
+            for time_index, values in tqdm(resin.iter_frames(resin.header.var_IDs, range(len(resin.time))),
+                                           total=len(resin.time), unit='frame'):
+                resout.write_entire_frame(resin.header, resin.time[time_index], values)
+
+
+parser = PyTelToolsArgParse(description=__doc__, add_args=['in_slf', 'out_slz'])
+group_compression = parser.add_argument_group('Compression')
+group_compression.add_argument('--codec', help='compression codec', choices=list(CODECS), default='zlib')
+group_compression.add_argument('--level', help='compression level (default value of the codec if not given)',
+                               type=int)
+group_compression.add_argument('--no_shuffle', help='do not shuffle the bytes of the values', action='store_true')
+group_compression.add_argument('--no_delta', help='do not store the frames as differences with the key frames',
+                               action='store_true')
+group_compression.add_argument('--keyframe_interval', help='number of frames between two key frames', type=int,
+                               default=16)
+parser.add_group_general(['force', 'verbose'])
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    try:
+        slf_to_slz(args)
+    except (Serafin.SerafinRequestError, Serafin.SerafinValidationError):
+        # Message is already reported by slf logger
+        sys.exit(1)
@@ -41,7 +41,11 @@ def slf_volume(args):
     names = ['Polygon %d' % (i + 1) for i in range(len(polygons))]
 
     # Read Serafin file
-    with Serafin.Read(args.in_slf, args.lang) as resin:
+    if args.next_slf:
+        input_stream = Serafin.MultiRead([args.in_slf] + args.next_slf, args.lang)
+    else:
+        input_stream = Serafin.Read(args.in_slf, args.lang)
+    with input_stream as resin:
         resin.read_header()
         logger.info(resin.header.summary())
         resin.get_time()
@@ -69,7 +73,7 @@ def slf_volume(args):
         else:
             volume_type = VolumeCalculator.NET
         calculator = VolumeCalculator(volume_type, upper_var, lower_var, resin, names, polygons, args.ech)
-        calculator.construct_triangles(tqdm)
+        calculator.construct_triangles()
         calculator.construct_weights(tqdm)
 
         result = []
@@ -96,6 +100,8 @@ def slf_volume(args):
 parser = PyTelToolsArgParse(description=__doc__, add_args=['in_slf'])
 parser.add_argument('in_polygons', help='set of polygons file (*.shp, *.i2s)')
 parser.add_argument('--ech', type=int, help='frequency sampling of input', default=1)
+parser.add_argument('--next_slf', nargs='+', help='following Serafin files of a restart chain (same mesh)',
+                    default=[], metavar='SLF')
 parser.add_argument('--upper_var', help='upper variable', metavar='VA', required=True)
 parser.add_argument('--lower_var', help='lower variable', metavar='VB', default=None)
 parser.add_argument('--detailed', help='add positive and negative volumes', action='store_true')
@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+"""
+Decompress a Serafin archive into a Serafin file
+"""
+
+import sys
+from tqdm import tqdm
+
+from pyteltools.slf import Serafin
+from pyteltools.slf.archive import ArchiveRead
+from pyteltools.utils.cli import logger, PyTelToolsArgParse
+
+
+def slz_to_slf(args):
+    with ArchiveRead(args.in_slz, args.lang) as resin:
+        resin.read_header()
+        logger.info(resin.header.summary())
+        resin.get_time()
+
+        output_header = resin.header.copy()
+        if args.toggle_endianness:
+            output_header.toggle_endianness()
+        if args.to_single_precision:
+            if resin.header.is_double_precision():
+                output_header.to_single_precision()
+            else:
+                logger.warn('Input file is already single precision! Argument `--to_single_precision` is ignored')
+
+        with Serafin.Write(args.out_slf, args.lang, overwrite=args.force, async_write=True) as resout:
+            resout.write_header(output_header)
+            for time_index, values in tqdm(resin.iter_frames(resin.header.var_IDs, range(len(resin.time))),
+                                           total=len(resin.time), unit='frame'):
+                resout.write_entire_frame(output_header, resin.time[time_index], values)
+
+
+parser = PyTelToolsArgParse(description=__doc__)
+parser.add_argument('in_slz', help='Serafin archive input filename')
+parser.add_known_argument('out_slf')
+parser.add_group_general(['force', 'verbose'])
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    try:
+        slz_to_slf(args)
+    except (Serafin.SerafinRequestError, Serafin.SerafinValidationError):
+        # Message is already reported by slf logger
+        sys.exit(1)
@@ -27,6 +27,31 @@ SERAFIN_EXT = ['.srf', '.slf', '.res', '.geo']
 # Language (for variables detection)
 LANG = 'fr'
 
+# Maximum size (in bytes) of a single read when reading several frames at once
+SERAFIN_READ_BLOCK_SIZE = 64 * 1024 * 1024
+
+# Number of frames read in advance by a background thread when iterating over frames (0 to disable)
+SERAFIN_PREFETCH = 2
+
+# Time (in seconds) between two checks of the size of a Serafin file being written (live reading)
+SERAFIN_FOLLOW_INTERVAL = 1.0
+
+# Number of frame buffers recycled by an asynchronous Serafin writer (frames queued while writing to disk)
+SERAFIN_WRITE_BUFFERS = 3
+
+# Memory budget (in bytes) of the cache of variable values read in frames, shared by all readers (0 to disable)
+SERAFIN_FRAME_CACHE_SIZE = 0
+
+# Compute in the precision of the Serafin file (float32 buffers for single precision files) instead of float64
+# (halves memory footprint and bandwidth, means are still accumulated in float64)
+SERAFIN_NATIVE_PRECISION = False
+
+# Persistent cache of parsed headers and time series (reused while the Serafin file is unchanged)
+SERAFIN_HEADER_CACHE = False
+
+# Folder for the header cache (cache is written next to the Serafin file if empty)
+SERAFIN_HEADER_CACHE_DIR = ''
+
 # ~> INPUTS/OUTPUTS
 
 # Format to write float values (in CSV, LandXML, VTK)
@@ -27,12 +27,19 @@ class MaxMinMeanThread(OutputThread):
             self.vector_calculator = operations.VectorMaxMinMeanCalculator(max_min_type, input_stream,
                                                                            selected_vectors, time_indices,
                                                                            additional_equations)
+        self.input_stream = input_stream
         self.time_indices = time_indices
         self.nb_frames = len(time_indices)
 
     def run(self):
         iter_pbar = ProgressBarIterator.prepare(self.tick.emit)
-        for time_index in iter_pbar(self.time_indices):
+        var_IDs = []
+        if self.has_scalar:
+            var_IDs += self.scalar_calculator.needed_var_IDs()
+        if self.has_vector:
+            var_IDs += self.vector_calculator.needed_var_IDs()
+        for time_index in iter_pbar(operations.prefetched_time_indices(self.input_stream, var_IDs,
+                                                                       self.time_indices), length=self.nb_frames):
             if self.canceled:
                 return []
             if self.has_scalar:
@@ -65,17 +72,19 @@ class ArrivalDurationThread(OutputThread):
 
     def run(self):
         iter_pbar = ProgressBarIterator.prepare(self.tick.emit)
-        for index in iter_pbar(self.time_indices[1:]):
+        var_IDs = [var_ID for calculator in self.calculators for var_ID in calculator.needed_var_IDs()]
+        for index in iter_pbar(operations.prefetched_time_indices(self.input_stream, var_IDs, self.time_indices[1:]),
+                               length=len(self.time_indices) - 1):
             if self.canceled:
                 return []
 
             for calculator in self.calculators:
                 calculator.arrival_duration_in_frame(index)
 
-        values = np.empty((2*self.nb_conditions, self.input_stream.header.nb_nodes))
+        values = np.empty((2*self.nb_conditions, self.input_stream.header.nb_nodes),
+                          dtype=self.input_stream.header.compute_float_type())
         for i, calculator in enumerate(self.calculators):
-            values[2*i, :] = calculator.arrival
-            values[2*i+1, :] = calculator.duration
+            values[2*i:2*i+2, :] = calculator.finishing_up()
         return values
 
 
@@ -88,7 +97,10 @@ class SynchMaxThread(OutputThread):
 
     def run(self):
         iter_pbar = ProgressBarIterator.prepare(self.tick.emit)
-        for time_index in iter_pbar(self.time_indices[1:]):
+        for time_index in iter_pbar(operations.prefetched_time_indices(self.calculator.input_stream,
+                                                                       self.calculator.needed_var_IDs(),
+                                                                       self.time_indices[1:]),
+                                    length=len(self.time_indices) - 1):
             if self.canceled:
                 return []
             self.calculator.synch_max_in_frame(time_index)
@@ -1,12 +1,14 @@
 import datetime
 from itertools import cycle
 import logging
+import numpy as np
 from PyQt5.QtCore import *
 from PyQt5.QtWidgets import *
 import sys
 
 from pyteltools.conf import settings
 from pyteltools.slf import Serafin
+from pyteltools.slf.interpolation import InterpolationMatrix
 
 from .util import LoadMeshDialog, MapViewer, MapCanvas, open_points, OutputProgressDialog, OutputThread, \
     PointAttributeTable, PointLabelEditor, PointPlotViewer, ProgressBarIterator, PyTelToolWidget, read_csv, \
@@ -33,8 +35,8 @@ class WriteCSVProcess(OutputThread):
                   points, point_interpolators):
         self.write_header(output_stream, selected_vars, indices, points)
 
-        nb_selected_vars = len(selected_vars)
-        nb_frames = len(output_time)
+        interpolation = InterpolationMatrix.from_point_interpolators(point_interpolators,
+                                                                     input_stream.header.nb_nodes)
 
         iter_pbar = ProgressBarIterator.prepare(self.tick.emit)
         for index, time in enumerate(iter_pbar(output_time)):
@@ -42,16 +44,11 @@ class WriteCSVProcess(OutputThread):
                 return
             output_stream.write(str(time))
 
-            var_values = []
-            for var in selected_vars:
-                var_values.append(input_stream.read_var_in_frame(index, var))
-
-            for (i, j, k), interpolator in point_interpolators:
-                if self.canceled:
-                    return
-                for index_var in range(nb_selected_vars):
+            var_values = np.array([input_stream.read_var_in_frame(index, var) for var in selected_vars])
+            for point_values in interpolation.interpolate(var_values).T:
+                for value in point_values:
                     output_stream.write(self.separator)
-                    output_stream.write(self.fmt_float.format(interpolator.dot(var_values[index_var][[i, j, k]])))
+                    output_stream.write(self.fmt_float.format(value))
 
             output_stream.write('\n')
 
@@ -26,12 +26,10 @@ class ProjectMeshThread(OutputThread):
 
     def run(self):
         iter_pbar = ProgressBarIterator.prepare(self.tick.emit, (5, 100))
-        for first_time_index, second_time_index in iter_pbar(self.calculator.time_indices):
+        for time, values in iter_pbar(self.calculator.iter_frames(), length=self.nb_frames):
             if self.canceled:
                 return
-            values = self.calculator.operation_in_frame(first_time_index, second_time_index)
-            self.out_stream.write_entire_frame(self.out_header,
-                                               self.calculator.first_in.time[first_time_index], values)
+            self.out_stream.write_entire_frame(self.out_header, time, values)
 
 
 
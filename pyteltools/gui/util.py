@@ -6,7 +6,6 @@ from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
 from shapefile import ShapefileException
-import shapely
 import struct
 
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
@@ -1103,12 +1102,13 @@ class ProgressBarIterator:
         @return <SubProgressBarIterator>:  ProgressBarIterator sub-class with pre-defined arguments
         """
         class SubProgressBarIterator(ProgressBarIterator):
-            def __init__(self, iterable, unit=None):
+            def __init__(self, iterable, unit=None, length=None):
                 """!
                 @param iterable: iterable or generator to loop over
                 @param unit: argument not used in GUI
+                @param length <int>: number of iterations (required if iterable has no length)
                 """
-                super().__init__(iterable, *args, **kwargs)
+                super().__init__(iterable, *args, length=length, **kwargs)
         return SubProgressBarIterator
 
 
@@ -1177,12 +1177,16 @@ class ConstructIndexThread(OutputThread):
         logging.info('Processing the mesh')
 
         iter_pbar = ProgressBarIterator.prepare(self.tick.emit)
-        for i, j, k in iter_pbar(self.mesh.ikle):
-            if self.canceled:
-                return
-            t = shapely.geometry.Polygon([self.mesh.points[i], self.mesh.points[j], self.mesh.points[k]])
-            self.mesh.triangles[i, j, k] = t
-            self.mesh.index.insert(i, t.bounds, obj=(i, j, k))
+
+        def iter_elements(elements):
+            for index in iter_pbar(elements):
+                if self.canceled:
+                    return
+                yield index
+
+        self.mesh.build_index(iter_elements)
+        if not self.canceled:
+            self.tick.emit(100)
 
 
 class LoadMeshDialog(OutputProgressDialog):
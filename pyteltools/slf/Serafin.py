@@ -8,14 +8,23 @@ Handles Serafin file with:
 The sizes (file, header, frame) are in bytes (8 bits).
 """
 
+from concurrent.futures import ThreadPoolExecutor
 import copy
+import io
 import numpy as np
 import os
+import queue
 import struct
+import threading
+from time import monotonic, sleep
 
+from pyteltools.conf import settings
 from pyteltools.slf.variable.variables_2d import VARIABLES_2D
 from pyteltools.slf.variable.variables_3d import VARIABLES_3D
 
+from . import header_cache
+from .frame_cache import FRAME_CACHE, FrameCache
+from .node_major import NodeMajorReader
 from .util import logger
 
 
@@ -65,16 +74,98 @@ class SerafinRequestError(Exception):
         logger.error('SERAFIN REQUEST ERROR: %s' % message)
 
 
+def copy_bytes(src, dst, offset, size):
+    """!
+    @brief Copy a byte range of a file at the current position of another file, without going through Python buffers
+    Uses `os.copy_file_range` or `os.sendfile` when available, and falls back to positional reads otherwise.
+    @param src <slf.Serafin.Read>: source stream
+    @param dst <_io.BufferedWriter>: destination file (flushed beforehand)
+    @param offset <int>: position of the range in the source file
+    @param size <int>: size of the range
+    """
+    dst.flush()
+    src_fd, dst_fd = src.file.fileno(), dst.fileno()
+    for copy_range in (lambda count: os.copy_file_range(src_fd, dst_fd, count, offset),
+                       lambda count: os.sendfile(dst_fd, src_fd, offset, count)):
+        try:
+            while size > 0:
+                copied = copy_range(size)
+                if copied == 0:
+                    break
+                offset += copied
+                size -= copied
+        except (AttributeError, OSError):
+            continue
+        dst.seek(0, os.SEEK_END)  # the position of the buffered writer is outdated
+        if size == 0:
+            return
+    while size > 0:
+        data = src._pread(offset, min(size, settings.SERAFIN_READ_BLOCK_SIZE))
+        if not data:
+            raise SerafinValidationError('Unexpected end of file while copying frames')
+        dst.write(data)
+        offset += len(data)
+        size -= len(data)
+
+
+def prefetch_frames(read_frame, time_indices, prefetch):
+    """!
+    @brief Read frames in a background thread, at most `prefetch` frames in advance
+    Exceptions raised by the background thread are re-raised in the calling thread, and closing the generator early
+    stops the background thread.
+    @param read_frame <function>: read the values of a frame from its time index
+    @param time_indices <[int]>: indices of the frames (0-based)
+    @param prefetch <int>: maximum number of frames read in advance
+    @return <generator>: time index and values of the frame
+    """
+    frames = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                frames.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def read_frames():
+        try:
+            for time_index in time_indices:
+                if not put((time_index, read_frame(time_index))):
+                    return
+        except Exception as e:
+            put(e)
+        else:
+            put(None)
+
+    thread = threading.Thread(target=read_frames, daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = frames.get()
+            if item is None:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+
+
 class SerafinHeader:
     """!
     @brief A data type for reading and storing the Serafin file header
     """
 
-    def __init__(self, file, file_size, language):
+    def __init__(self, file, file_size, language, allow_partial_frame=False):
         """!
         @param file <_io.BufferedReader>: input Serafin stream
         @param file_size <int>: file size (in bytes)
         @param language <str>: Serafin variable name language ('fr' or 'en')
+        @param allow_partial_frame <bool>: ignore an incomplete trailing frame (file being written) instead of failing
         """
         self.file_size = file_size
         if language not in ('fr', 'en'):
@@ -182,31 +273,22 @@ class SerafinHeader:
         else:
             self.nb_nodes_2d = self.nb_nodes // self.nb_planes
 
-        # IKLE
-        file.read(4)
-        nb_ikle_values = self.nb_elements * self.nb_nodes_per_elem
-        self.ikle = np.array(self.unpack_int(file.read(4 * nb_ikle_values), nb_ikle_values))
-        file.read(4)
-
-        # IPOBO
-        file.read(4)
-        self.ipobo = np.array(self.unpack_int(file.read(4 * self.nb_nodes), self.nb_nodes))
-        file.read(4)
-
-        # x coordinates
-        file.read(4)
-        coord_size = self.nb_nodes * self.float_size
-        self.x = np.array(self.unpack_float(file.read(coord_size), self.nb_nodes), dtype=self.np_float_type)
-        file.read(4)
-
-        # y coordinates
-        file.read(4)
-        self.y = np.array(self.unpack_float(file.read(coord_size), self.nb_nodes), dtype=self.np_float_type)
-        file.read(4)
-
         # Compute and set header and frame sizes
         self._set_header_size()
         self._set_frame_size()
+        if self.file_size < self.header_size:
+            raise SerafinValidationError('File is too small to contain the mesh (header is truncated)')
+
+        # IKLE, IPOBO, x and y coordinates are only read on first access (see `_load_mesh`)
+        self._ikle, self._ipobo, self._x, self._y, self._ikle_2d = None, None, None, None, None
+        filename = getattr(file, 'name', None)
+        self._mesh_source = (self.header_size - self._mesh_size(), self.endian, self.float_type, self.np_float_type,
+                             self.nb_elements, self.nb_nodes, self.nb_nodes_per_elem, self.nb_planes)
+        if isinstance(filename, str):
+            self._mesh_file = os.path.abspath(filename)
+        else:
+            self._mesh_file = None
+            self._load_mesh(file)
 
         # Deduce the number of frames and test the integer division
         self.nb_frames = (self.file_size - self.header_size) // self.frame_size
@@ -215,7 +297,9 @@ class SerafinHeader:
         diff_size = self.file_size - self.header_size - self.frame_size * self.nb_frames
         # A difference of only one byte is tolerated.
         # Indeed some old files may contain an ending \x0A character (Linux line feed)
-        if diff_size != 0 and diff_size != 1:
+        if allow_partial_frame and diff_size > 1:
+            logger.debug('Incomplete trailing frame of %i bytes is ignored' % diff_size)
+        elif diff_size != 0 and diff_size != 1:
             raise SerafinValidationError('Something wrong with the file size (header and frames). '
                                          'File is probably corrupted, difference of %i bytes' % diff_size)
 
@@ -232,21 +316,132 @@ class SerafinHeader:
                 var_id = var_table[name]
             self.var_IDs.append(var_id)
 
-        # Build ikle2d
+        # test the integer division (for ikle2d)
         if not self.is_2d:
-            ikle = self.ikle.reshape(self.nb_elements, self.nb_nodes_per_elem)
-            self.ikle_2d = np.empty([self.nb_elements // (self.nb_planes - 1), 3], dtype=int)
-            nb_lines = self.ikle_2d.shape[0]
-            # test the integer division
-            if nb_lines * (self.nb_planes - 1) != self.nb_elements:
+            if self.nb_elements % (self.nb_planes - 1) != 0:
                 raise SerafinValidationError('The number of elements is not divisible by (number of planes - 1)')
-            for i in range(nb_lines):
-                self.ikle_2d[i] = ikle[i, [0, 1, 2]]
-        else:
-            self.ikle_2d = self.ikle.reshape(self.nb_elements, self.nb_nodes_per_elem)
 
         logger.debug('Finished reading the header')
 
+    def _load_mesh(self, file=None):
+        """!
+        @brief Read IKLE, IPOBO, x and y coordinates at once and decode them without any intermediate Python object
+        The mesh is read at its offset in the original file (reopened if necessary), as it was laid out when the
+        header was read (later modifications of the header, such as endianness or precision, are not relevant).
+        When the file is reopened, frames may have been appended in the meantime: only the mesh records (and the
+        record of the mesh dimensions preceding them) are checked to be unchanged.
+        @param file <_io.BufferedReader>: input Serafin stream (reopened from its path if None)
+        """
+        mesh_offset, endian, float_type, np_float_type, nb_elements, nb_nodes, nb_nodes_per_elem, nb_planes = \
+            self._mesh_source
+        nb_ikle_values = nb_elements * nb_nodes_per_elem
+        float_size = np.dtype(float_type).itemsize
+        record_sizes = [4 * nb_ikle_values, 4 * nb_nodes, nb_nodes * float_size, nb_nodes * float_size]
+        mesh_size = sum(record_sizes) + 8 * len(record_sizes)
+        int_type = np.dtype(endian + 'i4')
+        if file is None:
+            with open(self._mesh_file, 'rb') as f:
+                f.seek(mesh_offset - 24, 0)
+                dimensions = np.frombuffer(f.read(24), dtype=int_type)
+                mesh_bytes = f.read(mesh_size)
+            if len(mesh_bytes) != mesh_size:
+                raise SerafinValidationError('File is too small to contain the mesh (header is truncated)')
+            markers = []
+            offset = 0
+            for record_size in record_sizes:
+                markers.append(np.frombuffer(mesh_bytes, dtype=int_type, count=1, offset=offset)[0])
+                markers.append(np.frombuffer(mesh_bytes, dtype=int_type, count=1, offset=offset + 4 + record_size)[0])
+                offset += record_size + 8
+            if dimensions.tolist() != [16, nb_elements, nb_nodes, nb_nodes_per_elem, 1, 16] \
+                    or markers != [size for record_size in record_sizes for size in (record_size, record_size)]:
+                raise SerafinValidationError('The mesh of file %s was modified since its header was read'
+                                             % self._mesh_file)
+        else:
+            file.seek(mesh_offset, 0)
+            mesh_bytes = file.read(mesh_size)
+            if len(mesh_bytes) != mesh_size:
+                raise SerafinValidationError('File is too small to contain the mesh (header is truncated)')
+        logger.debug('Reading the mesh (%i bytes)' % mesh_size)
+
+        float_type = np.dtype(endian + float_type)
+        offset = 4
+        ikle = np.frombuffer(mesh_bytes, dtype=int_type, count=nb_ikle_values, offset=offset).astype(int)
+        offset += 4 * nb_ikle_values + 8
+        ipobo = np.frombuffer(mesh_bytes, dtype=int_type, count=nb_nodes, offset=offset).astype(int)
+        offset += 4 * nb_nodes + 8
+        x = np.frombuffer(mesh_bytes, dtype=float_type, count=nb_nodes, offset=offset).astype(np_float_type)
+        offset += nb_nodes * float_size + 8
+        y = np.frombuffer(mesh_bytes, dtype=float_type, count=nb_nodes, offset=offset).astype(np_float_type)
+
+        # Build ikle2d
+        if nb_planes == 0:
+            ikle_2d = ikle.reshape(nb_elements, nb_nodes_per_elem)
+        else:
+            # bottom triangles of the prisms in the first layer
+            ikle_2d = ikle.reshape(nb_elements, nb_nodes_per_elem)[:nb_elements // (nb_planes - 1), :3].copy()
+
+        # Arrays which were already set (or loaded) are kept
+        self._ikle = ikle if self._ikle is None else self._ikle
+        self._ipobo = ipobo if self._ipobo is None else self._ipobo
+        self._x = x if self._x is None else self._x
+        self._y = y if self._y is None else self._y
+        self._ikle_2d = ikle_2d if self._ikle_2d is None else self._ikle_2d
+
+    @property
+    def ikle(self):
+        """Connectivity table (1-based node indices, flattened)"""
+        if self._ikle is None:
+            self._load_mesh()
+        return self._ikle
+
+    @ikle.setter
+    def ikle(self, value):
+        self._ikle = value
+
+    @property
+    def ipobo(self):
+        """Boundary node numbering"""
+        if self._ipobo is None:
+            self._load_mesh()
+        return self._ipobo
+
+    @ipobo.setter
+    def ipobo(self, value):
+        self._ipobo = value
+
+    @property
+    def x(self):
+        """Node x coordinates"""
+        if self._x is None:
+            self._load_mesh()
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        self._x = value
+
+    @property
+    def y(self):
+        """Node y coordinates"""
+        if self._y is None:
+            self._load_mesh()
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        self._y = value
+
+    @property
+    def ikle_2d(self):
+        """Connectivity table of the 2D triangles (1-based node indices), of shape (nb_elements_2d, 3)"""
+        if self._ikle_2d is None:
+            self._load_mesh()
+        return self._ikle_2d
+
+    @ikle_2d.setter
+    def ikle_2d(self, value):
+        self._ikle_2d = value
+
     def _set_as_single_precision(self):
         """Set Serafin as single precision"""
         self.float_type = 'f'
@@ -299,6 +494,86 @@ class SerafinHeader:
         fmt = self.endian + str(nb) + self.float_type
         return struct.pack(fmt, *args)
 
+    def pack_int_array(self, values):
+        """!
+        Pack an array of integers (without any intermediate Python object)
+        @param values <numpy 1D-array>: integers to pack
+        @return <bytes>
+        """
+        return np.asarray(values, dtype=self.endian + 'i4').tobytes()
+
+    def pack_float_array(self, values):
+        """!
+        Pack an array of floats (without any intermediate Python object)
+        @param values <numpy 1D-array>: floats to pack
+        @return <bytes>
+        """
+        return np.asarray(values, dtype=self.endian + self.float_type).tobytes()
+
+    def to_bytes(self):
+        """!
+        @brief Serialize the header as it is written at the beginning of a Serafin file
+        @return <bytes>: header content
+        """
+        file = io.BytesIO()
+        # Title and file type
+        file.write(self.pack_int(80))
+        file.write(self.title)
+        file.write(self.file_type)
+        file.write(self.pack_int(80))
+
+        # Number of variables
+        file.write(self.pack_int(8))
+        file.write(self.pack_int(self.nb_var))
+        file.write(self.pack_int(self.nb_var_quadratic))
+        file.write(self.pack_int(8))
+
+        # Variable names and units
+        for j in range(self.nb_var):
+            file.write(self.pack_int(2 * 16))
+            file.write(self.var_names[j].ljust(16))
+            file.write(self.var_units[j].ljust(16))
+            file.write(self.pack_int(2 * 16))
+
+        # Date
+        file.write(self.pack_int(10 * 4))
+        file.write(self.pack_int(*self.params, nb=10))
+        file.write(self.pack_int(10 * 4))
+        if self.params[-1] == 1:
+            file.write(self.pack_int(6 * 4))
+            file.write(self.pack_int(*self.date, nb=6))
+            file.write(self.pack_int(6 * 4))
+
+        # Number of elements, of nodes, of nodes per element and the magic number
+        file.write(self.pack_int(4 * 4))
+        file.write(self.pack_int(self.nb_elements))
+        file.write(self.pack_int(self.nb_nodes))
+        file.write(self.pack_int(self.nb_nodes_per_elem))
+        file.write(self.pack_int(1))  # magic number
+        file.write(self.pack_int(4 * 4))
+
+        # IKLE
+        nb_ikle_values = self.nb_elements * self.nb_nodes_per_elem
+        file.write(self.pack_int(4 * nb_ikle_values))
+        file.write(self.pack_int_array(self.ikle))
+        file.write(self.pack_int(4 * nb_ikle_values))
+
+        # IPOBO
+        file.write(self.pack_int(4 * self.nb_nodes))
+        file.write(self.pack_int_array(self.ipobo))
+        file.write(self.pack_int(4 * self.nb_nodes))
+
+        # X coordinates
+        file.write(self.pack_int(self.float_size * self.nb_nodes))
+        file.write(self.pack_float_array(self.x))
+        file.write(self.pack_int(self.float_size * self.nb_nodes))
+
+        # Y coordinates
+        file.write(self.pack_int(self.float_size * self.nb_nodes))
+        file.write(self.pack_float_array(self.y))
+        file.write(self.pack_int(self.float_size * self.nb_nodes))
+        return file.getvalue()
+
     def toggle_endianness(self):
         """Toggle original endianness (between big or little endian)"""
         if self.endian == '>':
@@ -307,13 +582,17 @@ class SerafinHeader:
             self.endian = '>'
         logger.debug('Toggle endianness to %s' % ('big' if self.endian == '>' else 'litte'))
 
-    def _set_header_size(self):
-        """Set header size"""
+    def _mesh_size(self):
+        """Returns the size of the mesh records (IKLE, IPOBO, x and y coordinates) at the end of the header"""
         nb_ikle_values = self.nb_elements * self.nb_nodes_per_elem
         coord_size = self.nb_nodes * self.float_size
+        return (nb_ikle_values * 4 + 8) + (self.nb_nodes * 4 + 8) + 2 * (coord_size + 8)
+
+    def _set_header_size(self):
+        """Set header size"""
         self.header_size = (80 + 8) + (8 + 8) + (self.nb_var * (8 + 32)) \
                                     + (40 + 8) + (self.params[-1] * ((6 * 4) + 8)) + (16 + 8) \
-                                    + (nb_ikle_values * 4 + 8) + (self.nb_nodes * 4 + 8) + 2 * (coord_size + 8)
+                                    + self._mesh_size()
 
     def _set_frame_size(self):
         """Set frame size (all variable values for one time step)"""
@@ -355,8 +634,7 @@ class SerafinHeader:
         new_header.nb_nodes //= nb_planes
         new_header.nb_nodes_per_elem = 3
         new_header.nb_nodes_2d = new_header.nb_nodes
-        npd = new_header.nb_nodes_per_elem
-        new_header.ikle = np.take(self.ikle, [2*npd*i+j for i in range(new_header.nb_elements) for j in range(3)])
+        new_header.ikle = self.ikle_2d.flatten()
         new_header.ipobo = self.ipobo[:self.nb_nodes_2d]
         new_header.x = self.x[:self.nb_nodes_2d]
         new_header.y = self.y[:self.nb_nodes_2d]
@@ -371,6 +649,13 @@ class SerafinHeader:
     def is_double_precision(self):
         return self.float_type == 'd'
 
+    def compute_float_type(self):
+        """!
+        @brief Float type of the computation buffers (see `settings.SERAFIN_NATIVE_PRECISION`)
+        @return <numpy.dtype>: float type of the file in native precision mode, float64 otherwise
+        """
+        return self.np_float_type if settings.SERAFIN_NATIVE_PRECISION else np.float64
+
     def to_single_precision(self):
         self.file_type = bytes('SERAFIN', SLF_EIT).ljust(8)
         self.float_type = 'f'
@@ -489,37 +774,173 @@ class Serafin:
 class Read(Serafin):
     """!
     @brief Serafin file input stream
+
+    Thread safety: once the header (and the time) are read, the reading methods (`read_var_in_frame`,
+    `read_vars_in_frames`, `read_nodes_time_series`, ...) can be called concurrently from several threads on the same
+    instance. Frame data is read with positional reads (`os.pread`, or seek/read under a lock where it is not
+    available) which do not depend on a shared file position. `read_header`, `get_time` and `refresh` modify the
+    instance and must not run concurrently with other calls.
+
+    Returned values: `read_var_in_frame` and the other reading methods return arrays owned by the caller, except in
+    two opt-in modes where they are shared, read-only arrays: the memory-mapped mode (`use_memmap`, zero-copy views on
+    the file) and the frame cache (`settings.SERAFIN_FRAME_CACHE_SIZE`). The frames yielded by `iter_frames` are
+    read-only as well.
     """
-    def __init__(self, filename, language):
+    def __init__(self, filename, language, use_memmap=False, live=False):
         """!
         @param filename <str>: path to input Serafin file
         @param language <str>: Serafin variable name language ('fr' or 'en')
+        @param use_memmap <bool>: map the frames in memory (variables are then read as read-only zero-copy views)
+        @param live <bool>: the file is still being written (see `refresh` and `follow`)
         """
         super().__init__(filename, 'rb', language)
         self.header = None
         self.time = []
         self.file_size = os.path.getsize(self.filename)
+        self.use_memmap = use_memmap
+        self.live = live
+        self.buffer = None  # memory map of the whole file (bytes, only with `use_memmap`)
+        self.values = None  # memory-mapped values of shape (nb_frames, nb_var, nb_nodes) (only with `use_memmap`)
+        self.node_major = None  # reader of the node-major sidecar file (if present and up to date)
+        self.file_key = None  # identifier of the file content in the frame cache (see slf.frame_cache)
+        self._prefetched = threading.local()  # prefetched frame being processed by each thread (see `iter_frames`)
+        self._lock = threading.Lock()  # protects the file position where `os.pread` is not available
         logger.info('Reading the input file: "%s" of size %d bytes' % (filename, self.file_size))
 
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.buffer, self.values, self.node_major = None, None, None  # release the memory maps
+        return super().__exit__(exc_type, exc_val, exc_tb)
+
     def read_header(self):
         """!
         @brief Read the file header and check the file consistency
+        The header is loaded from the persistent cache if it is enabled (see `settings.SERAFIN_HEADER_CACHE`)
+        For a live file, an incomplete trailing frame is ignored and the mesh is read at once (neither the caches nor
+        the node-major file are used)
+        """
+        if self.live:
+            self.file_size = os.path.getsize(self.filename)
+            self.header = SerafinHeader(self.file, self.file_size, self.language, allow_partial_frame=True)
+            self.header._load_mesh(self.file)
+        elif settings.SERAFIN_HEADER_CACHE:
+            self.header = header_cache.load_header(self.filename, self.language, SerafinHeader)
+            if self.header is None:
+                self.header = SerafinHeader(self.file, self.file_size, self.language)
+                header_cache.save_header(self.filename, self.language, self.header)
+        else:
+            self.header = SerafinHeader(self.file, self.file_size, self.language)
+        if not self.live:
+            self.node_major = NodeMajorReader.open_if_fresh(self.filename, self.header)
+        self.file_key = FrameCache.file_key(self.filename)
+        if self.use_memmap:
+            self._map_frames()
+
+    def _get_buffer(self):
+        """!
+        @brief Get a (read-only) memory map of the whole file
+        Only the map of the `use_memmap` mode is kept by the reader, other maps are released as soon as the caller
+        drops them.
+        @return <numpy.memmap>: file content as bytes
         """
-        self.header = SerafinHeader(self.file, self.file_size, self.language)
+        if self.buffer is not None:
+            return self.buffer
+        return np.memmap(self.filename, dtype=np.uint8, mode='r')
+
+    def _frames_view(self, buffer):
+        """!
+        @brief Get a strided view of all the frames of shape (nb_frames, nb_var, nb_nodes) skipping record markers
+        @param buffer <numpy.memmap>: memory map of the whole file (see `_get_buffer`)
+        @return <numpy 3D-array>: read-only view on the memory-mapped file
+        """
+        header = self.header
+        dtype = np.dtype(header.endian + header.float_type)
+        shape = (header.nb_frames, header.nb_var, header.nb_nodes)
+        if header.nb_frames == 0 or header.nb_var == 0:
+            return np.empty(shape, dtype=dtype)
+        var_size = 8 + header.nb_nodes * header.float_size
+        return np.ndarray(shape, dtype=dtype, buffer=buffer, offset=header.header_size + 8 + header.float_size + 4,
+                          strides=(header.frame_size, var_size, header.float_size))
+
+    def _map_frames(self):
+        """!
+        @brief Map all the frames in memory for the reader lifetime (values are then read as zero-copy slices)
+        """
+        self.buffer = np.memmap(self.filename, dtype=np.uint8, mode='r')
+        self.values = self._frames_view(self.buffer)
 
     def get_time(self):
         """!
         @brief Read the time in the Serafin file
+        All the frame times are gathered at once through a strided view of the memory-mapped file.
+        The attribute `time` is set as a list (for backward compatibility)
+        @return <numpy 1D-array>: time values (in seconds)
         """
         if self.header is None:
             raise SerafinRequestError('Cannot read time without any header (forgot read_header ?)')
+        if settings.SERAFIN_HEADER_CACHE and not self.live:
+            time = header_cache.load_time(self.filename, self.language)
+            if time is not None:
+                self.time = time.tolist()
+                return time
         logger.debug('Reading the time series from the file')
-        self.file.seek(self.header.header_size, 0)
-        for i in range(self.header.nb_frames):
-            self.file.read(4)
-            self.time.append(self.header.unpack_float(self.file.read(self.header.float_size), 1)[0])
-            self.file.read(4)
-            self.file.seek(self.header.frame_size - 8 - self.header.float_size, 1)
+        header = self.header
+        if header.nb_frames == 0:
+            time = np.empty(0, dtype=np.float64)
+        else:
+            time = np.array(np.ndarray((header.nb_frames,), dtype=np.dtype(header.endian + header.float_type),
+                                       buffer=self._get_buffer(), offset=header.header_size + 4,
+                                       strides=(header.frame_size,)), dtype=np.float64)
+        if settings.SERAFIN_HEADER_CACHE and not self.live:
+            header_cache.save_time(self.filename, time)
+        self.time = time.tolist()
+        return time
+
+    def refresh(self):
+        """!
+        @brief Take into account the new complete frames of a live file (see `live`) and update the time
+        Frames which were already written are assumed to be unchanged.
+        @return <int>: number of new frames
+        """
+        if self.header is None:
+            raise SerafinRequestError('Cannot refresh without any header (forgot read_header ?)')
+        header = self.header
+        file_size = os.path.getsize(self.filename)
+        if file_size < header.file_size:
+            raise SerafinValidationError('File %s was truncated while being read' % self.filename)
+        nb_frames = (file_size - header.header_size) // header.frame_size
+        nb_new_frames = nb_frames - header.nb_frames
+        if nb_new_frames > 0:
+            logger.debug('%i new frame%s' % (nb_new_frames, ['', 's'][nb_new_frames > 1]))
+            self.file_size = header.file_size = file_size
+            header.nb_frames = nb_frames
+            self.buffer = None
+            if self.use_memmap:
+                self._map_frames()
+            self.get_time()
+        return nb_new_frames
+
+    def follow(self, start=0, poll_interval=None, timeout=None):
+        """!
+        @brief Iterate over the frames of a live file (see `live`), waiting for the new complete frames
+        The file size is polled (every `settings.SERAFIN_FOLLOW_INTERVAL` seconds by default).
+        @param start <int>: index of the first frame (0-based)
+        @param poll_interval <float>: time between two checks of the file size (in seconds)
+        @param timeout <float>: stop after this time without any new frame (in seconds, None to wait forever)
+        @return <generator>: time indices of the complete frames
+        """
+        if poll_interval is None:
+            poll_interval = settings.SERAFIN_FOLLOW_INTERVAL
+        time_index = start
+        last_frame_time = monotonic()
+        while True:
+            while time_index < self.header.nb_frames:
+                yield time_index
+                time_index += 1
+                last_frame_time = monotonic()
+            if self.refresh() == 0:
+                if timeout is not None and monotonic() - last_frame_time >= timeout:
+                    return
+                sleep(poll_interval)
 
     def subset_time(self, start, end, ech):
         """!
@@ -553,6 +974,7 @@ class Read(Serafin):
     def read_var_in_frame(self, time_index, var_ID):
         """!
         @brief Read a single variable in a frame
+        Values are read-only if they come from the memory-mapped file or from the frame cache (see slf.frame_cache)
         @param time_index <int>: the index of the frame (0-based)
         @param var_ID <str>: variable ID
         @return <numpy 1D-array>: values of the variables, of length equal to the number of nodes
@@ -561,11 +983,252 @@ class Read(Serafin):
             raise SerafinRequestError('Impossible to read a negative time index!')
         logger.debug('Reading variable %s at frame %i' % (var_ID, time_index))
         pos_var = self._get_var_index(var_ID)
-        self.file.seek(self.header.header_size + time_index * self.header.frame_size
-                       + 8 + self.header.float_size + pos_var * (8 + self.header.float_size * self.header.nb_nodes), 0)
-        self.file.read(4)
-        return np.array(self.header.unpack_float(self.file.read(self.header.float_size * self.header.nb_nodes),
-                                                 self.header.nb_nodes), dtype=self.header.np_float_type)
+        values = self._prefetched_values(time_index, pos_var)
+        if values is not None:
+            return values.copy()
+        if self.values is not None:
+            if time_index >= self.header.nb_frames:
+                raise SerafinRequestError('Time index %i is out of range' % time_index)
+            return self.values[time_index, pos_var]
+        if FrameCache.max_size() > 0:
+            if self.file_key is None:  # the header may have been assigned without `read_header`
+                self.file_key = FrameCache.file_key(self.filename)
+            key = (self.file_key, time_index, pos_var)
+            values = FRAME_CACHE.get(key)
+            if values is None:
+                values = self._read_var_in_frame(time_index, pos_var)
+                FRAME_CACHE.put(key, values)
+            return values
+        return self._read_var_in_frame(time_index, pos_var)
+
+    def _prefetched_values(self, time_index, pos_var):
+        """!
+        @brief Get the values of a variable in the frame being processed by `iter_frames` in the current thread
+        @param time_index <int>: the index of the frame (0-based)
+        @param pos_var <int>: the index of the variable (0-based)
+        @return <numpy 1D-array>: read-only prefetched values (None if they were not prefetched)
+        """
+        frame = getattr(self._prefetched, 'frame', None)
+        if frame is not None and frame[0] == time_index:
+            return frame[1].get(pos_var)
+        return None
+
+    def _read_var_in_frame(self, time_index, pos_var):
+        """!
+        @brief Read a single variable in a frame from the file
+        @param time_index <int>: the index of the frame (0-based)
+        @param pos_var <int>: the index of the variable (0-based)
+        @return <numpy 1D-array>: values of the variables, of length equal to the number of nodes
+        """
+        header = self.header
+        size = header.float_size * header.nb_nodes
+        data = self._pread(header.header_size + time_index * header.frame_size + 8 + header.float_size
+                           + pos_var * (8 + size) + 4, size)
+        if len(data) != size:
+            raise SerafinValidationError('File is too small to contain frame %i' % time_index)
+        return np.frombuffer(data, dtype=np.dtype(header.endian + header.float_type)).astype(header.np_float_type)
+
+    def _pread(self, offset, size):
+        """!
+        @brief Read bytes at a given position without using the shared file position (thread-safe)
+        @param offset <int>: position in the file
+        @param size <int>: number of bytes to read
+        @return <bytes>: data (shorter than `size` only at the end of the file)
+        """
+        if not hasattr(os, 'pread'):
+            with self._lock:
+                self.file.seek(offset, 0)
+                return self.file.read(size)
+        fd = self.file.fileno()
+        chunks = []
+        while size > 0:
+            data = os.pread(fd, size, offset)
+            if not data:
+                break
+            chunks.append(data)
+            offset += len(data)
+            size -= len(data)
+        return chunks[0] if len(chunks) == 1 else b''.join(chunks)
+
+    def _check_time_indices(self, time_indices):
+        """!
+        @brief Check that all the requested time indices are inside the file
+        @param time_indices <[int]>: indices of the frames (0-based)
+        @return <numpy 1D-array>: time indices as integers
+        """
+        time_indices = np.asarray(time_indices, dtype=np.int64).reshape(-1)
+        if len(time_indices) > 0:
+            if time_indices.min() < 0:
+                raise SerafinRequestError('Impossible to read a negative time index!')
+            if time_indices.max() >= self.header.nb_frames:
+                raise SerafinRequestError('Time index %i is out of range' % time_indices.max())
+        return time_indices
+
+    @staticmethod
+    def _contiguous_runs(time_indices, max_length):
+        """!
+        @brief Split time indices into runs of consecutive frames
+        @param time_indices <numpy 1D-array>: indices of the frames (0-based)
+        @param max_length <int>: maximum number of frames in a run
+        @return <generator>: position of the run in `time_indices`, first time index and number of frames
+        """
+        if len(time_indices) == 0:
+            return
+        breaks = np.flatnonzero(np.diff(time_indices) != 1) + 1
+        starts = np.concatenate(([0], breaks))
+        ends = np.concatenate((breaks, [len(time_indices)]))
+        for start, end in zip(starts, ends):
+            for position in range(start, end, max_length):
+                yield position, time_indices[position], min(max_length, end - position)
+
+    def read_vars_in_frames(self, var_IDs, time_indices, out=None, nb_threads=1):
+        """!
+        @brief Read several variables in several frames at once
+        Consecutive frames are read with a single read call (bounded by `settings.SERAFIN_READ_BLOCK_SIZE`)
+        @param var_IDs <[str]>: variable IDs
+        @param time_indices <[int]>: indices of the frames (0-based)
+        @param out <numpy 3D-array>: optional output array of shape (number of variables, number of frames, nb_nodes)
+        @param nb_threads <int>: number of threads reading the variables in parallel (each one reads its own variables)
+        @return <numpy 3D-array>: values of shape (number of variables, number of frames, nb_nodes)
+        """
+        pos_vars = [self._get_var_index(var_ID) for var_ID in var_IDs]
+        time_indices = self._check_time_indices(time_indices)
+        header = self.header
+        shape = (len(pos_vars), len(time_indices), header.nb_nodes)
+        if out is None:
+            out = np.empty(shape, dtype=header.np_float_type)
+        elif out.shape != shape:
+            raise SerafinRequestError('Output array shape %s is not %s' % (out.shape, shape))
+        if not pos_vars or len(time_indices) == 0:
+            return out
+        logger.debug('Reading %i variable(s) in %i frame(s)' % shape[:2])
+
+        if self.values is not None:
+            for i, pos_var in enumerate(pos_vars):
+                out[i] = self.values[time_indices, pos_var]
+            return out
+        nb_threads = min(nb_threads, len(pos_vars))
+        if nb_threads <= 1:
+            self._read_frames(pos_vars, time_indices, out)
+        else:
+            bounds = np.linspace(0, len(pos_vars), nb_threads + 1).astype(int)
+            with ThreadPoolExecutor(nb_threads) as executor:
+                futures = [executor.submit(self._read_frames, pos_vars[start:end], time_indices, out[start:end])
+                           for start, end in zip(bounds[:-1], bounds[1:])]
+                for future in futures:
+                    future.result()
+        return out
+
+    def _read_frames(self, pos_vars, time_indices, out):
+        """!
+        @brief Read several variables in several frames from the file (see `read_vars_in_frames`)
+        @param pos_vars <[int]>: the indices of the variables (0-based)
+        @param time_indices <numpy 1D-array>: indices of the frames (0-based)
+        @param out <numpy 3D-array>: output array of shape (number of variables, number of frames, nb_nodes)
+        """
+        header = self.header
+        dtype = np.dtype(header.endian + header.float_type)
+        var_size = 8 + header.nb_nodes * header.float_size
+        first_var, last_var = min(pos_vars), max(pos_vars)
+        # bytes to read in a frame: from the values of the first variable to the end of the values of the last one
+        var_offset = 8 + header.float_size + first_var * var_size + 4
+        span = (last_var - first_var) * var_size + header.nb_nodes * header.float_size
+        max_frames = max(1, settings.SERAFIN_READ_BLOCK_SIZE // header.frame_size)
+
+        for position, time_index, nb_frames in Read._contiguous_runs(time_indices, max_frames):
+            size = (nb_frames - 1) * header.frame_size + span
+            data = self._pread(header.header_size + time_index * header.frame_size + var_offset, size)
+            if len(data) != size:
+                raise SerafinValidationError('File is too small to contain frame %i' % (time_index + nb_frames - 1))
+            for i, pos_var in enumerate(pos_vars):
+                out[i, position:position + nb_frames] = np.ndarray((nb_frames, header.nb_nodes), dtype=dtype,
+                                                                   buffer=data,
+                                                                   offset=(pos_var - first_var) * var_size,
+                                                                   strides=(header.frame_size, header.float_size))
+
+    def iter_frames(self, var_IDs, time_indices, prefetch=None):
+        """!
+        @brief Iterate over frames while a background thread reads the next ones
+        While a frame is being processed, `read_var_in_frame` called from the iterating thread returns (a copy of) the
+        prefetched values of this frame, so that per-frame calculations can be left unchanged. Other threads are not
+        affected.
+        @param var_IDs <[str]>: variable IDs to prefetch
+        @param time_indices <[int]>: indices of the frames (0-based)
+        @param prefetch <int>: number of frames read in advance (`settings.SERAFIN_PREFETCH` by default, 0 to disable)
+        @return <generator>: time index and values of shape (number of variables, nb_nodes)
+        """
+        pos_vars = [self._get_var_index(var_ID) for var_ID in var_IDs]
+        time_indices = self._check_time_indices(time_indices)
+        if prefetch is None:
+            prefetch = settings.SERAFIN_PREFETCH
+
+        if prefetch <= 0 or self.values is not None:
+            frames = ((time_index, self.read_vars_in_frames(var_IDs, [time_index])[:, 0])
+                      for time_index in time_indices)
+        else:
+            frames = self._prefetch_frames(pos_vars, time_indices, prefetch)
+
+        previous_frame = getattr(self._prefetched, 'frame', None)
+        try:
+            for time_index, values in frames:
+                values.flags.writeable = False
+                self._prefetched.frame = (time_index, dict(zip(pos_vars, values)))
+                yield int(time_index), values
+        finally:
+            self._prefetched.frame = previous_frame
+            frames.close()
+
+    def _prefetch_frames(self, pos_vars, time_indices, prefetch):
+        """!
+        @brief Read frames in a background thread, at most `prefetch` frames in advance (see `prefetch_frames`)
+        @return <generator>: time index and values of shape (number of variables, nb_nodes)
+        """
+        def read_frame(time_index):
+            values = np.empty((len(pos_vars), 1, self.header.nb_nodes), dtype=self.header.np_float_type)
+            self._read_frames(pos_vars, [time_index], values)
+            return values[:, 0]
+        return prefetch_frames(read_frame, time_indices, prefetch)
+
+    def read_var_in_frames(self, var_ID, time_indices, out=None):
+        """!
+        @brief Read a single variable in several frames at once
+        @param var_ID <str>: variable ID
+        @param time_indices <[int]>: indices of the frames (0-based)
+        @param out <numpy 2D-array>: optional output array of shape (number of frames, nb_nodes)
+        @return <numpy 2D-array>: values of shape (number of frames, nb_nodes)
+        """
+        if out is not None:
+            out = out[np.newaxis]  # a view to fill `out` directly
+        return self.read_vars_in_frames([var_ID], time_indices, out)[0]
+
+    def read_nodes_time_series(self, var_IDs, node_indices, time_indices):
+        """!
+        @brief Read several variables at some nodes only, in several frames
+        Only the requested node values are gathered (in increasing node order), from the node-major sidecar file if
+        it is available (see slf.node_major) or from the memory-mapped file otherwise
+        @param var_IDs <[str]>: variable IDs
+        @param node_indices <[int]>: indices of the nodes (0-based)
+        @param time_indices <[int]>: indices of the frames (0-based)
+        @return <numpy 3D-array>: values of shape (number of variables, number of frames, number of nodes)
+        """
+        pos_vars = [self._get_var_index(var_ID) for var_ID in var_IDs]
+        time_indices = self._check_time_indices(time_indices)
+        node_indices = np.asarray(node_indices, dtype=np.int64).reshape(-1)
+        if len(node_indices) > 0:
+            if node_indices.min() < 0 or node_indices.max() >= self.header.nb_nodes:
+                raise SerafinRequestError('Node indices are not inside [0, %i]' % (self.header.nb_nodes - 1))
+        logger.debug('Reading %i variable(s) at %i node(s) in %i frame(s)'
+                     % (len(pos_vars), len(node_indices), len(time_indices)))
+
+        unique_nodes, inverse = np.unique(node_indices, return_inverse=True)
+        out = np.empty((len(pos_vars), len(time_indices), len(unique_nodes)), dtype=self.header.np_float_type)
+        if self.node_major is not None:
+            self.node_major.read_nodes_time_series(pos_vars, unique_nodes, time_indices, out)
+        else:
+            frames = self.values if self.values is not None else self._frames_view(self._get_buffer())
+            for i, pos_var in enumerate(pos_vars):
+                out[i] = frames[:, pos_var][np.ix_(time_indices, unique_nodes)]
+        return out[:, :, inverse]
 
     def read_var_in_frame_as_3d(self, time_index, var_ID):
         """!
@@ -581,116 +1244,552 @@ class Read(Serafin):
 
     def read_var_in_frame_at_layer(self, time_index, var_ID, iplan):
         """!
-        @brief Read a single variable in a frame at specific layer
+        @brief Read a single variable in a frame at specific layer (only the nodes of this layer are read)
         @param time_index <int>: the index of the frame (0-based)
         @param var_ID <str>: variable ID
         @param iplan <int>: 1-based index of layer
+        @return <numpy 1D-array>: values of the variables, of length equal to the number of 2D nodes
+        """
+        return self.read_var_in_frame_at_layers(time_index, var_ID, iplan, iplan)[0]
+
+    def read_var_in_frame_at_layers(self, time_index, var_ID, first_plan, last_plan):
+        """!
+        @brief Read a single variable in a frame for a range of consecutive layers (only their nodes are read)
+        Values are read-only views if they come from the memory-mapped file
+        @param time_index <int>: the index of the frame (0-based)
+        @param var_ID <str>: variable ID
+        @param first_plan <int>: 1-based index of the first layer
+        @param last_plan <int>: 1-based index of the last layer (included)
+        @return <numpy 2D-array>: values of shape (number of layers, number of 2D nodes)
+        """
+        header = self.header
+        if header.is_2d:
+            raise SerafinRequestError('Extracting values at a specific layer is only possible in 3D!')
+        for iplan in (first_plan, last_plan):
+            if iplan < 1 or iplan > header.nb_planes:
+                raise SerafinRequestError('Layer %i is not inside [1, %i]' % (iplan, header.nb_planes))
+        if first_plan > last_plan:
+            raise SerafinRequestError('Layer range [%i, %i] is empty' % (first_plan, last_plan))
+        time_index = self._check_time_indices([time_index])[0]
+        pos_var = self._get_var_index(var_ID)
+        shape = (last_plan - first_plan + 1, header.nb_nodes_2d)
+
+        values = self._prefetched_values(time_index, pos_var)
+        if values is not None:
+            return values.reshape(header.nb_planes, header.nb_nodes_2d)[first_plan - 1:last_plan].copy()
+        if self.values is not None:
+            return self.values[time_index, pos_var].reshape(header.nb_planes, header.nb_nodes_2d)[first_plan - 1:
+                                                                                                  last_plan]
+        size = shape[0] * shape[1] * header.float_size
+        data = self._pread(header.header_size + time_index * header.frame_size + 8 + header.float_size
+                           + pos_var * (8 + header.nb_nodes * header.float_size) + 4
+                           + (first_plan - 1) * header.nb_nodes_2d * header.float_size, size)
+        if len(data) != size:
+            raise SerafinValidationError('File is too small to contain frame %i' % time_index)
+        values = np.frombuffer(data, dtype=np.dtype(header.endian + header.float_type))
+        return values.astype(header.np_float_type).reshape(shape)
+
+
+class LayerRead:
+    """!
+    @brief Single layer of a 3D Serafin input stream, seen as a 2D input stream
+    Only the values of the nodes of the layer are read, so that calculations (see slf.variables) can be done on this
+    layer only.
+    """
+    def __init__(self, input_stream, iplan):
+        """!
+        @param input_stream <slf.Serafin.Read>: 3D input stream (with its header already read)
+        @param iplan <int>: 1-based index of layer
+        """
+        if input_stream.header.is_2d:
+            raise SerafinRequestError('Extracting values at a specific layer is only possible in 3D!')
+        if iplan < 1 or iplan > input_stream.header.nb_planes:
+            raise SerafinRequestError('Layer %i is not inside [1, %i]' % (iplan, input_stream.header.nb_planes))
+        self.input_stream = input_stream
+        self.iplan = iplan
+        self.header = input_stream.header.copy_as_2d()
+        self.time = input_stream.time
+
+    def read_var_in_frame(self, time_index, var_ID):
+        """!
+        @brief Read a single variable in a frame at the selected layer
+        @param time_index <int>: the index of the frame (0-based)
+        @param var_ID <str>: variable ID
+        @return <numpy 1D-array>: values of the variables, of length equal to the number of 2D nodes
+        """
+        return self.input_stream.read_var_in_frame_at_layer(time_index, var_ID, self.iplan)
+
+
+class MultiRead:
+    """!
+    @brief Virtual Serafin input stream over an ordered list of files sharing the same mesh (e.g. restart chain)
+    The frames of all the files are concatenated in a single time axis. When files overlap, the frames of a file which
+    are not before the first frame of the next file are ignored (the most recent file wins). It provides the reading
+    methods of `Read` and has to be used with a `with` statement.
+    """
+    def __init__(self, filenames, language, use_memmap=False):
+        """!
+        @param filenames <[str]>: paths to input Serafin files (in chronological order)
+        @param language <str>: Serafin variable name language ('fr' or 'en')
+        @param use_memmap <bool>: map the frames in memory (see `Read`)
+        """
+        if not filenames:
+            raise SerafinRequestError('At least one Serafin file is required')
+        self.filenames = filenames
+        self.filename = filenames[0]
+        self.language = language
+        self.readers = [Read(filename, language, use_memmap) for filename in filenames]
+        self.header = None
+        self.time = []
+        self._reader_indices = None  # index of the file of each frame
+        self._local_indices = None  # index of each frame in its file
+
+    def __enter__(self):
+        entered = []
+        try:
+            for reader in self.readers:
+                entered.append(reader.__enter__())
+        except BaseException:
+            for reader in entered:
+                reader.__exit__(None, None, None)
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for reader in self.readers:
+            reader.__exit__(exc_type, exc_val, exc_tb)
+        return False
+
+    def read_header(self):
+        """!
+        @brief Read the headers and the times of all the files, check that they share the same mesh and variables and
+            build the concatenated time axis
+        """
+        first_header = None
+        for reader in self.readers:
+            reader.read_header()
+            reader.get_time()
+            header = reader.header
+            if first_header is None:
+                first_header = header
+                continue
+            for attribute in ('nb_nodes', 'nb_elements', 'nb_planes', 'var_IDs'):
+                if getattr(header, attribute) != getattr(first_header, attribute):
+                    raise SerafinValidationError('File %s is not consistent with %s (%s differs)'
+                                                 % (reader.filename, self.filename, attribute))
+            if not np.array_equal(header.ikle, first_header.ikle) or not np.allclose(header.x, first_header.x) \
+                    or not np.allclose(header.y, first_header.y):
+                raise SerafinValidationError('File %s does not share the mesh of %s' % (reader.filename, self.filename))
+
+        reader_indices, local_indices = [], []
+        for i, reader in enumerate(self.readers):
+            nb_frames = reader.header.nb_frames
+            next_times = [next_reader.time[0] for next_reader in self.readers[i + 1:] if next_reader.time]
+            if next_times:
+                nb_frames = int(np.searchsorted(np.array(reader.time), next_times[0], side='left'))
+                if nb_frames < reader.header.nb_frames:
+                    logger.debug('%i overlapping frame(s) of %s are ignored'
+                                 % (reader.header.nb_frames - nb_frames, reader.filename))
+            reader_indices.append(np.full(nb_frames, i, dtype=np.int64))
+            local_indices.append(np.arange(nb_frames, dtype=np.int64))
+        self._reader_indices = np.concatenate(reader_indices)
+        self._local_indices = np.concatenate(local_indices)
+
+        self.header = first_header.copy()
+        self.header.nb_frames = len(self._reader_indices)
+
+    def get_time(self):
+        """!
+        @brief Get the concatenated time (the attribute `time` is set as a list)
+        @return <numpy 1D-array>: time values (in seconds)
+        """
+        if self.header is None:
+            raise SerafinRequestError('Cannot read time without any header (forgot read_header ?)')
+        time = np.array([self.readers[i].time[j] for i, j in zip(self._reader_indices, self._local_indices)],
+                        dtype=np.float64)
+        self.time = time.tolist()
+        return time
+
+    def subset_time(self, start, end, ech):
+        """!
+        Get a subset of the time frames list (see `Read.subset_time`)
+        """
+        return [(time_index, time) for time_index, time in enumerate(self.time)
+                if start <= time <= end and time_index % ech == 0]
+
+    def _get_var_index(self, var_ID):
+        if self.header is None:
+            raise SerafinRequestError('Cannot extract variable from empty list (forgot read_header ?)')
+        return self.readers[0]._get_var_index(var_ID)
+
+    def _check_time_indices(self, time_indices):
+        """!
+        @brief Check that all the requested time indices are inside the concatenated time axis
+        @param time_indices <[int]>: indices of the frames (0-based)
+        @return <numpy 1D-array>: time indices as integers
+        """
+        time_indices = np.asarray(time_indices, dtype=np.int64).reshape(-1)
+        if len(time_indices) > 0:
+            if time_indices.min() < 0:
+                raise SerafinRequestError('Impossible to read a negative time index!')
+            if time_indices.max() >= self.header.nb_frames:
+                raise SerafinRequestError('Time index %i is out of range' % time_indices.max())
+        return time_indices
+
+    def _split_by_file(self, time_indices):
+        """!
+        @brief Group time indices by file
+        @param time_indices <numpy 1D-array>: indices of the frames (0-based)
+        @return <generator>: reader, positions in `time_indices` (boolean mask) and time indices in the file
+        """
+        reader_indices = self._reader_indices[time_indices]
+        for reader_index in np.unique(reader_indices):
+            mask = reader_indices == reader_index
+            yield self.readers[reader_index], mask, self._local_indices[time_indices[mask]]
+
+    def read_var_in_frame(self, time_index, var_ID):
+        """!
+        @brief Read a single variable in a frame (see `Read.read_var_in_frame`)
+        @param time_index <int>: the index of the frame (0-based)
+        @param var_ID <str>: variable ID
         @return <numpy 1D-array>: values of the variables, of length equal to the number of nodes
         """
+        self._get_var_index(var_ID)
+        time_index = self._check_time_indices([time_index])[0]
+        reader = self.readers[self._reader_indices[time_index]]
+        return reader.read_var_in_frame(int(self._local_indices[time_index]), var_ID)
+
+    def read_vars_in_frames(self, var_IDs, time_indices, out=None):
+        """!
+        @brief Read several variables in several frames (see `Read.read_vars_in_frames`)
+        @param var_IDs <[str]>: variable IDs
+        @param time_indices <[int]>: indices of the frames (0-based)
+        @param out <numpy 3D-array>: optional output array of shape (number of variables, number of frames, nb_nodes)
+        @return <numpy 3D-array>: values of shape (number of variables, number of frames, nb_nodes)
+        """
+        for var_ID in var_IDs:
+            self._get_var_index(var_ID)
+        time_indices = self._check_time_indices(time_indices)
+        if out is None:
+            out = np.empty((len(var_IDs), len(time_indices), self.header.nb_nodes), dtype=self.header.np_float_type)
+        for reader, mask, local_indices in self._split_by_file(time_indices):
+            out[:, mask] = reader.read_vars_in_frames(var_IDs, local_indices)
+        return out
+
+    def read_var_in_frames(self, var_ID, time_indices, out=None):
+        """!
+        @brief Read a single variable in several frames (see `read_vars_in_frames`)
+        @return <numpy 2D-array>: values of shape (number of frames, nb_nodes)
+        """
+        return self.read_vars_in_frames([var_ID], time_indices, None if out is None else out[np.newaxis])[0]
+
+    def read_nodes_time_series(self, var_IDs, node_indices, time_indices):
+        """!
+        @brief Read several variables at some nodes only, in several frames (see `Read.read_nodes_time_series`)
+        @return <numpy 3D-array>: values of shape (number of variables, number of frames, number of nodes)
+        """
+        for var_ID in var_IDs:
+            self._get_var_index(var_ID)
+        time_indices = self._check_time_indices(time_indices)
+        node_indices = np.asarray(node_indices, dtype=np.int64).reshape(-1)
+        out = np.empty((len(var_IDs), len(time_indices), len(node_indices)), dtype=self.header.np_float_type)
+        for reader, mask, local_indices in self._split_by_file(time_indices):
+            out[:, mask] = reader.read_nodes_time_series(var_IDs, node_indices, local_indices)
+        return out
+
+    def iter_frames(self, var_IDs, time_indices, prefetch=None):
+        """!
+        @brief Iterate over frames while the next ones are read in advance (see `Read.iter_frames`)
+        @return <generator>: time index and values of shape (number of variables, nb_nodes)
+        """
+        time_indices = self._check_time_indices(time_indices)
+        reader_indices = self._reader_indices[time_indices]
+        start = 0
+        while start < len(time_indices):  # runs of consecutive requested frames in the same file
+            end = start + 1
+            while end < len(time_indices) and reader_indices[end] == reader_indices[start]:
+                end += 1
+            reader = self.readers[reader_indices[start]]
+            frames = reader.iter_frames(var_IDs, self._local_indices[time_indices[start:end]], prefetch)
+            try:
+                for time_index, (_, values) in zip(time_indices[start:end], frames):
+                    yield int(time_index), values
+            finally:
+                frames.close()
+            start = end
+
+    def read_var_in_frame_as_3d(self, time_index, var_ID):
+        """!
+        @brief Read a single variable in a 3D frame (see `Read.read_var_in_frame_as_3d`)
+        """
         if self.header.is_2d:
-            raise SerafinRequestError('Extracting values at a specific layer is only possible in 3D!')
-        if iplan < 1 or iplan > self.header.nb_planes:
-            raise SerafinRequestError('Layer %i is not inside [1, %i]' % (iplan, self.header.nb_planes))
-        return self.read_var_in_frame_as_3d(time_index, var_ID)[iplan + 1]
+            raise SerafinRequestError('Reading values as 3D is only possible in 3D!')
+        return self.read_var_in_frame(time_index, var_ID).reshape((self.header.nb_planes, self.header.nb_nodes_2d))
+
+    def read_var_in_frame_at_layer(self, time_index, var_ID, iplan):
+        """!
+        @brief Read a single variable in a frame at specific layer (see `Read.read_var_in_frame_at_layer`)
+        """
+        return self.read_var_in_frame_at_layers(time_index, var_ID, iplan, iplan)[0]
+
+    def read_var_in_frame_at_layers(self, time_index, var_ID, first_plan, last_plan):
+        """!
+        @brief Read a single variable in a frame for a range of layers (see `Read.read_var_in_frame_at_layers`)
+        """
+        time_index = self._check_time_indices([time_index])[0]
+        reader = self.readers[self._reader_indices[time_index]]
+        return reader.read_var_in_frame_at_layers(int(self._local_indices[time_index]), var_ID, first_plan, last_plan)
 
 
 class Write(Serafin):
     """!
     @brief Serafin file output stream
     """
-    def __init__(self, filename, language, overwrite=False):
+    def __init__(self, filename, language, overwrite=False, async_write=False, append=False):
         """!
         @param filename <str>: path to output Serafin file
         @param language <str>: Serafin variable name language ('fr' or 'en')
         @param overwrite <bool>: overwrite if file already exists
+        @param async_write <bool>: write frames in a background thread (see `write_entire_frame`)
+        @param append <bool>: write new frames at the end of an existing file (see `write_header`)
         """
-        mode = 'wb' if overwrite else 'xb'
+        if append:
+            mode = 'r+b'
+        else:
+            mode = 'wb' if overwrite else 'xb'
         super().__init__(filename, mode, language)
+        self.append = append
+        self.existing_header = None  # header of the existing file (only with `append`)
+        self.async_write = async_write
+        self._frame_buffer = None  # recycled frame buffer (see `_get_frame_buffer`)
+        self._free_buffers = None  # recycled frame buffers ready to be filled (only with `async_write`)
+        self._free_buffers_key = None
+        self._pending = None  # filled frame buffers waiting to be written (only with `async_write`)
+        self._writer = None
+        self._write_error = None
         logger.info('Writing the output file: "%s"' % filename)
 
     def __enter__(self):
         try:
-            return Serafin.__enter__(self)
+            Serafin.__enter__(self)
         except FileExistsError:
             raise SerafinRequestError('Cannot overwrite existing file')
+        except FileNotFoundError:
+            raise SerafinRequestError('Cannot append to a missing file')
+        if self.async_write:
+            self._pending = queue.Queue()
+            self._writer = threading.Thread(target=self._write_frames, daemon=True)
+            self._writer.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self._writer is not None:
+            self._pending.put(None)
+            self._writer.join()
+            self._writer = None
+        self.file.close()
+        if self._write_error is not None and exc_type is None:
+            raise self._write_error
+        return False
+
+    def _write_frames(self):
+        """!
+        @brief Write the pending frame buffers (target of the writer thread) and recycle them
+        After a write error, the remaining buffers are only recycled and the error is re-raised in the calling thread.
+        """
+        while True:
+            item = self._pending.get()
+            try:
+                if item is None:
+                    return
+                free_buffers, frame_buffer = item
+                if self._write_error is None:
+                    try:
+                        self.file.write(frame_buffer[0])
+                    except Exception as e:
+                        self._write_error = e
+                free_buffers.put(frame_buffer)
+            finally:
+                self._pending.task_done()
+
+    def _check_appending(self):
+        """!
+        @brief In append mode, forbid writing frames before the existing header is checked (and the file position moved
+            to its end) by `write_header`, which would overwrite the beginning of the file
+        """
+        if self.append and self.existing_header is None:
+            raise SerafinRequestError('Cannot append frames to file %s before checking its header (see `write_header`)'
+                                      % self.filename)
+
+    def _check_write_error(self):
+        if self._write_error is not None:
+            raise self._write_error
+
+    def flush(self):
+        """!
+        @brief Wait until all the pending frames are written and flush the file
+        """
+        if self._pending is not None:
+            self._pending.join()
+        self._check_write_error()
+        self.file.flush()
 
     def write_header(self, header):
         """!
         @brief Write Serafin header from attributes
+        In append mode, the header is not written but checked against the existing one (see `_check_existing_header`)
         """
+        self.flush()
+        if self.append:
+            self._check_existing_header(header)
+            return
         logger.debug('Writing header with {} nodes, {} elements{} and {} variable{}'.format(header.nb_nodes,
             header.nb_elements, '' if header.is_2d else ', %i layers' % header.nb_planes,
             header.nb_var, ['', 's'][header.nb_var > 1]))
-        # Title and file type
-        self.file.write(header.pack_int(80))
-        self.file.write(header.title)
-        self.file.write(header.file_type)
-        self.file.write(header.pack_int(80))
+        self.file.write(header.to_bytes())
 
-        # Number of variables
-        self.file.write(header.pack_int(8))
-        self.file.write(header.pack_int(header.nb_var))
-        self.file.write(header.pack_int(header.nb_var_quadratic))
-        self.file.write(header.pack_int(8))
-
-        # Variable names and units
-        for j in range(header.nb_var):
-            self.file.write(header.pack_int(2 * 16))
-            self.file.write(header.var_names[j].ljust(16))
-            self.file.write(header.var_units[j].ljust(16))
-            self.file.write(header.pack_int(2 * 16))
-
-        # Date
-        self.file.write(header.pack_int(10 * 4))
-        self.file.write(header.pack_int(*header.params, nb=10))
-        self.file.write(header.pack_int(10 * 4))
-        if header.params[-1] == 1:
-            self.file.write(header.pack_int(6 * 4))
-            self.file.write(header.pack_int(*header.date, nb=6))
-            self.file.write(header.pack_int(6 * 4))
-
-        # Number of elements, of nodes, of nodes per element and the magic number
-        self.file.write(header.pack_int(4 * 4))
-        self.file.write(header.pack_int(header.nb_elements))
-        self.file.write(header.pack_int(header.nb_nodes))
-        self.file.write(header.pack_int(header.nb_nodes_per_elem))
-        self.file.write(header.pack_int(1))  # magic number
-        self.file.write(header.pack_int(4 * 4))
-
-        # IKLE
-        nb_ikle_values = header.nb_elements * header.nb_nodes_per_elem
-        self.file.write(header.pack_int(4 * nb_ikle_values))
-        self.file.write(header.pack_int(*header.ikle, nb=nb_ikle_values))
-        self.file.write(header.pack_int(4 * nb_ikle_values))
-
-        # IPOBO
-        self.file.write(header.pack_int(4 * header.nb_nodes))
-        self.file.write(header.pack_int(*header.ipobo, nb=header.nb_nodes))
-        self.file.write(header.pack_int(4 * header.nb_nodes))
-
-        # X coordinates
-        self.file.write(header.pack_int(header.float_size * header.nb_nodes))
-        self.file.write(header.pack_float(*header.x, nb=header.nb_nodes))
-        self.file.write(header.pack_int(header.float_size * header.nb_nodes))
+    def _check_existing_header(self, header):
+        """!
+        @brief Check that the header of the existing file matches the output header, drop any incomplete trailing
+            frame and move to the end of the file (append mode)
+        The title is not compared.
+        @param header <SerafinHeader>: output header
+        """
+        self.file.seek(0)
+        existing_header = SerafinHeader(self.file, os.path.getsize(self.filename), self.language,
+                                        allow_partial_frame=True)
+        for attribute in ('endian', 'float_type', 'nb_var', 'nb_nodes', 'nb_elements', 'nb_nodes_per_elem',
+                          'nb_planes', 'var_IDs'):
+            if getattr(existing_header, attribute) != getattr(header, attribute):
+                raise SerafinRequestError('Cannot append to file %s: %s differs' % (self.filename, attribute))
+        for existing_name, name in zip(existing_header.var_names + existing_header.var_units,
+                                       header.var_names + header.var_units):
+            if existing_name.strip() != name.strip():
+                raise SerafinRequestError('Cannot append to file %s: variable names or units differ' % self.filename)
+        for attribute, dtype in (('ikle', int), ('x', existing_header.np_float_type),
+                                 ('y', existing_header.np_float_type)):
+            if not np.array_equal(getattr(existing_header, attribute),
+                                  np.asarray(getattr(header, attribute), dtype=dtype)):
+                raise SerafinRequestError('Cannot append to file %s: the mesh differs (%s)' % (self.filename,
+                                                                                             attribute))
+        expected_size = existing_header._expected_file_size()
+        if existing_header.file_size > expected_size:
+            logger.warning('Incomplete trailing frame of file %s is removed' % self.filename)
+            self.file.truncate(expected_size)
+        self.file.seek(expected_size)
+        logger.debug('Appending to %i existing frames' % existing_header.nb_frames)
+        self.existing_header = existing_header
+
+    @staticmethod
+    def _frame_buffer_key(header):
+        return header.endian, header.float_type, header.nb_var, header.nb_nodes
+
+    @staticmethod
+    def _new_frame_buffer(header):
+        """!
+        @brief Allocate the byte buffer of a complete frame, with its record markers already filled
+        @param header <SerafinHeader>: output header
+        @return <(numpy 1D-array, numpy 1D-array, numpy 2D-array)>: frame buffer (bytes), time and values views
+        """
+        dtype = np.dtype(header.endian + header.float_type)
+        var_size = header.float_size * header.nb_nodes
+        buffer = np.empty(8 + header.float_size + header.nb_var * (8 + var_size), dtype=np.uint8)
+        buffer[:4] = buffer[4 + header.float_size:8 + header.float_size] = \
+            np.frombuffer(header.pack_int(header.float_size), dtype=np.uint8)
+        records = buffer[8 + header.float_size:].reshape(header.nb_var, 8 + var_size)
+        records[:, :4] = records[:, -4:] = np.frombuffer(header.pack_int(var_size), dtype=np.uint8)
+        time_view = buffer[4:4 + header.float_size].view(dtype)
+        values_view = records[:, 4:-4].view(dtype)
+        return buffer, time_view, values_view
+
+    def _get_frame_buffer(self, header):
+        """!
+        @brief Get the (recycled) byte buffer of a complete frame (see `_new_frame_buffer`)
+        """
+        key = Write._frame_buffer_key(header)
+        if self._frame_buffer is None or self._frame_buffer[0] != key:
+            self._frame_buffer = (key,) + Write._new_frame_buffer(header)
+        return self._frame_buffer[1:]
 
-        # Y coordinates
-        self.file.write(header.pack_int(header.float_size * header.nb_nodes))
-        self.file.write(header.pack_float(*header.y, nb=header.nb_nodes))
-        self.file.write(header.pack_int(header.float_size * header.nb_nodes))
+    def _get_free_buffers(self, header):
+        """!
+        @brief Get the queue of recycled frame buffers (`settings.SERAFIN_WRITE_BUFFERS` buffers per header layout)
+        @param header <SerafinHeader>: output header
+        @return <queue.Queue>: frame buffers ready to be filled
+        """
+        key = Write._frame_buffer_key(header)
+        if self._free_buffers_key != key:
+            self.flush()
+            self._free_buffers = queue.Queue()
+            for _ in range(max(1, settings.SERAFIN_WRITE_BUFFERS)):
+                self._free_buffers.put(Write._new_frame_buffer(header))
+            self._free_buffers_key = key
+        return self._free_buffers
 
     def write_entire_frame(self, header, time_to_write, values):
         """!
         @brief write all variables/nodes values
+        With `async_write`, values are copied into a free frame buffer (waiting for one if all the buffers are pending)
+        and written by a background thread, so `values` can be modified as soon as this method returns. A write error
+        is re-raised by the next call, by `flush` or when exiting the `with` block.
         @param header <SerafinHeader>: output header
         @param time_to_write <float>: output time (in seconds)
         @param values <numpy 2D-array>: values to write, of dimension (nb_var, nb_nodes)
         """
-        self.file.write(header.pack_int(header.float_size))
-        self.file.write(header.pack_float(time_to_write))
-        self.file.write(header.pack_int(header.float_size))
+        self._check_appending()
+        if self._writer is None:
+            buffer, time_view, values_view = self._get_frame_buffer(header)
+            time_view[0] = time_to_write
+            values_view[...] = values  # conversion to output float type and endianness in a single pass
+            self.file.write(buffer)
+            return
+
+        self._check_write_error()
+        free_buffers = self._get_free_buffers(header)
+        frame_buffer = free_buffers.get()
+        _, time_view, values_view = frame_buffer
+        time_view[0] = time_to_write
+        values_view[...] = values
+        self._pending.put((free_buffers, frame_buffer))
 
-        for i in range(header.nb_var):
-            self.file.write(header.pack_int(header.float_size * header.nb_nodes))
-            self.file.write(header.pack_float(*values[i, :], nb=header.nb_nodes))
-            self.file.write(header.pack_int(header.float_size * header.nb_nodes))
+    def copy_frames(self, header, input_stream, time_indices, iter_pbar=lambda x, unit: x):
+        """!
+        @brief Copy frames of an input stream without decoding their values
+        The output header can select a subset of the input variables and toggle the endianness, but must keep the number
+        of nodes and the float precision. With the same endianness, the records of the frames are copied as raw bytes
+        (see `copy_bytes`), otherwise they are read by blocks and byte-swapped.
+        @param header <SerafinHeader>: output header (already written)
+        @param input_stream <slf.Serafin.Read>: input stream (with its header and time already read)
+        @param time_indices <[int]>: indices of the frames to copy (0-based)
+        @param iter_pbar: iterable progress bar
+        """
+        self._check_appending()
+        in_header = input_stream.header
+        if header.nb_nodes != in_header.nb_nodes or header.float_type != in_header.float_type:
+            raise SerafinRequestError('Frames can only be copied with the same number of nodes and float precision')
+        pos_vars = [input_stream._get_var_index(var_ID) for var_ID in header.var_IDs]
+        time_indices = input_stream._check_time_indices(time_indices)
+
+        if header.endian != in_header.endian:
+            max_frames = max(1, settings.SERAFIN_READ_BLOCK_SIZE // in_header.frame_size)
+            for i, time_index in enumerate(iter_pbar(time_indices, unit='frame')):
+                if i % max_frames == 0:
+                    values = input_stream.read_vars_in_frames(header.var_IDs, time_indices[i:i + max_frames])
+                self.write_entire_frame(header, input_stream.time[time_index], values[:, i % max_frames])
+            return
 
+        # byte ranges of a frame to copy: time record, then runs of consecutive variable records
+        self.flush()
+        var_offset = 8 + in_header.float_size
+        var_size = 8 + in_header.float_size * in_header.nb_nodes
+        ranges = [[0, var_offset]]
+        for pos_var in pos_vars:
+            offset = var_offset + pos_var * var_size
+            if ranges[-1][0] + ranges[-1][1] == offset:
+                ranges[-1][1] += var_size
+            else:
+                ranges.append([offset, var_size])
+        for time_index in iter_pbar(time_indices, unit='frame'):
+            frame_offset = in_header.header_size + int(time_index) * in_header.frame_size
+            for offset, size in ranges:
+                copy_bytes(input_stream, self.file, frame_offset + offset, size)
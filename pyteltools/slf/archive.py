@@ -0,0 +1,405 @@
+"""!
+Compressed Serafin archive (.slz) with random access to any frame.
+
+The archive stores the Serafin header followed by one compressed chunk per (frame, variable), in the Serafin float
+precision, and ends with an index (times and chunk offsets) and a fixed-size footer pointing to it:
+    prefix | compressed header | chunks (frame-major order) | times | chunk offsets | footer
+
+Before compression, the values of a chunk can be filtered (the filters are lossless):
+  - delta: bitwise XOR with the values of the same variable in the last key frame (every `keyframe_interval` frames), so
+    that reading a frame requires to decode at most two chunks
+  - shuffle: bytes are regrouped by significance (all the first bytes of the floats, then all the second bytes, ...)
+"""
+
+import io
+import lzma
+import numpy as np
+import os
+import struct
+import threading
+import zlib
+
+from pyteltools.conf import settings
+
+from .Serafin import prefetch_frames, SerafinHeader, SerafinRequestError, SerafinValidationError
+from .util import logger
+
+
+ARCHIVE_EXT = '.slz'
+MAGIC = b'SLFARCHV'
+VERSION = 1
+
+# magic, version, codec, filters, key frame interval, compressed header size
+PREFIX_FMT = '<8sHBBIQ'
+PREFIX_SIZE = struct.calcsize(PREFIX_FMT)
+# index offset, number of frames, number of variables, magic
+FOOTER_FMT = '<3Q8s'
+FOOTER_SIZE = struct.calcsize(FOOTER_FMT)
+
+CODECS = {'zlib': 0, 'lzma': 1}
+SHUFFLE, DELTA = 1, 2
+
+
+def _compress(codec, data, level):
+    if codec == CODECS['zlib']:
+        return zlib.compress(data, 6 if level is None else level)
+    return lzma.compress(data, preset=6 if level is None else level)
+
+
+def _decompress(codec, data):
+    if codec == CODECS['zlib']:
+        return zlib.decompress(data)
+    return lzma.decompress(data)
+
+
+class ArchiveWrite:
+    """!
+    @brief Compressed Serafin archive output stream (same writing methods as slf.Serafin.Write)
+    """
+    def __init__(self, filename, language, overwrite=False, codec='zlib', level=None, shuffle=True, delta=True,
+                 keyframe_interval=16):
+        """!
+        @param filename <str>: path to output archive
+        @param language <str>: Serafin variable name language ('fr' or 'en')
+        @param overwrite <bool>: overwrite if file already exists
+        @param codec <str>: compression codec ('zlib' or 'lzma')
+        @param level <int>: compression level (codec default if None)
+        @param shuffle <bool>: shuffle the bytes of the floats before compression
+        @param delta <bool>: compress the values of the frames as differences with the last key frame
+        @param keyframe_interval <int>: number of frames between two key frames (only with `delta`)
+        """
+        if codec not in CODECS:
+            raise SerafinRequestError('Compression codec %s is not implemented' % codec)
+        if keyframe_interval < 1:
+            raise SerafinRequestError('The key frame interval has to be positive')
+        self.filename = filename
+        self.language = language
+        self.mode = 'wb' if overwrite else 'xb'
+        self.codec = CODECS[codec]
+        self.level = level
+        self.filters = (SHUFFLE if shuffle else 0) | (DELTA if delta else 0)
+        self.keyframe_interval = keyframe_interval
+        self.file = None
+        self.header = None
+        self.time = []
+        self.offsets = []
+        self.key_values = None  # raw values of the last key frame (only with `delta`)
+        logger.info('Writing the output archive: "%s"' % filename)
+
+    def __enter__(self):
+        try:
+            self.file = open(self.filename, self.mode)
+        except FileExistsError:
+            raise SerafinRequestError('Cannot overwrite existing file')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        try:
+            if exc_type is None and self.header is not None:
+                self._write_index()
+        finally:
+            self.file.close()
+        return False
+
+    def write_header(self, header):
+        """!
+        @brief Write the Serafin header (compressed)
+        @param header <slf.Serafin.SerafinHeader>: output header
+        """
+        header_bytes = _compress(self.codec, header.to_bytes(), self.level)
+        self.file.write(struct.pack(PREFIX_FMT, MAGIC, VERSION, self.codec, self.filters, self.keyframe_interval,
+                                    len(header_bytes)))
+        self.file.write(header_bytes)
+        self.header = header
+
+    def write_entire_frame(self, header, time_to_write, values):
+        """!
+        @brief Write all variables/nodes values of a frame (one compressed chunk per variable)
+        @param header <slf.Serafin.SerafinHeader>: output header
+        @param time_to_write <float>: output time (in seconds)
+        @param values <numpy 2D-array>: values to write, of dimension (nb_var, nb_nodes)
+        """
+        raw_values = np.asarray(values, dtype='<' + header.float_type).reshape(header.nb_var, header.nb_nodes)
+        int_type = '<u%i' % header.float_size
+        is_key_frame = len(self.time) % self.keyframe_interval == 0
+        if self.filters & DELTA:
+            if is_key_frame:
+                self.key_values = raw_values.view(int_type).copy()
+            else:
+                raw_values = raw_values.view(int_type) ^ self.key_values
+        for var_values in raw_values:
+            if self.filters & SHUFFLE:
+                data = var_values.view(np.uint8).reshape(header.nb_nodes, header.float_size).T.tobytes()
+            else:
+                data = var_values.tobytes()
+            self.offsets.append(self.file.tell())
+            self.file.write(_compress(self.codec, data, self.level))
+        self.time.append(time_to_write)
+
+    def _write_index(self):
+        """!
+        @brief Write the times, the chunk offsets and the footer
+        """
+        index_offset = self.file.tell()
+        self.file.write(np.asarray(self.time, dtype='<f8').tobytes())
+        self.file.write(np.asarray(self.offsets + [index_offset], dtype='<u8').tobytes())
+        self.file.write(struct.pack(FOOTER_FMT, index_offset, len(self.time), self.header.nb_var, MAGIC))
+
+
+class ArchiveRead:
+    """!
+    @brief Compressed Serafin archive input stream (same reading methods as slf.Serafin.Read)
+    Thread safety: as for slf.Serafin.Read, chunks are read with positional reads (or seek/read under a lock).
+    """
+    def __init__(self, filename, language):
+        """!
+        @param filename <str>: path to input archive
+        @param language <str>: Serafin variable name language ('fr' or 'en')
+        """
+        self.filename = filename
+        self.language = language
+        self.file = None
+        self.file_size = os.path.getsize(filename)
+        self.header = None
+        self.time = []
+        self.codec = None
+        self.filters = None
+        self.keyframe_interval = None
+        self.times = None  # time values stored in the index
+        self.offsets = None  # chunk offsets (with the index offset as last value)
+        self._key_chunks = {}  # last decoded key frame chunk of each variable: variable index -> (time index, chunk)
+        self._lock = threading.Lock()  # protects the file position where `os.pread` is not available
+        logger.info('Reading the input archive: "%s" of size %d bytes' % (filename, self.file_size))
+
+    def __enter__(self):
+        self.file = open(self.filename, 'rb')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.file.close()
+        return False
+
+    def _pread(self, offset, size):
+        if hasattr(os, 'pread'):
+            data = os.pread(self.file.fileno(), size, offset)
+        else:
+            with self._lock:
+                self.file.seek(offset)
+                data = self.file.read(size)
+        if len(data) != size:
+            raise SerafinValidationError('Archive %s is truncated' % self.filename)
+        return data
+
+    def read_header(self):
+        """!
+        @brief Read the archive prefix, the Serafin header and the index
+        """
+        if self.file_size < PREFIX_SIZE + FOOTER_SIZE:
+            raise SerafinValidationError('File is too small to be a Serafin archive')
+        magic, version, self.codec, self.filters, self.keyframe_interval, header_size = \
+            struct.unpack(PREFIX_FMT, self._pread(0, PREFIX_SIZE))
+        index_offset, nb_frames, nb_var, end_magic = \
+            struct.unpack(FOOTER_FMT, self._pread(self.file_size - FOOTER_SIZE, FOOTER_SIZE))
+        if magic != MAGIC or end_magic != MAGIC:
+            raise SerafinValidationError('File is not a complete Serafin archive')
+        if version != VERSION:
+            raise SerafinValidationError('Serafin archive version %i is not supported' % version)
+
+        header_bytes = _decompress(self.codec, self._pread(PREFIX_SIZE, header_size))
+        header = SerafinHeader(io.BytesIO(header_bytes), len(header_bytes), self.language)
+        if header.nb_var != nb_var:
+            raise SerafinValidationError('Serafin archive index is not consistent with its header')
+        header.nb_frames = nb_frames
+        header.file_size = header._expected_file_size()
+        self.header = header
+
+        index = self._pread(index_offset, self.file_size - FOOTER_SIZE - index_offset)
+        self.times = np.frombuffer(index, dtype='<f8', count=nb_frames).astype(np.float64)
+        self.offsets = np.frombuffer(index, dtype='<u8', offset=8 * nb_frames).astype(np.int64)
+        if len(self.offsets) != nb_frames * nb_var + 1:
+            raise SerafinValidationError('Serafin archive index is corrupted')
+
+    def get_time(self):
+        """!
+        @brief Get the time (the attribute `time` is set as a list)
+        @return <numpy 1D-array>: time values (in seconds)
+        """
+        if self.header is None:
+            raise SerafinRequestError('Cannot read time without any header (forgot read_header ?)')
+        self.time = self.times.tolist()
+        return self.times.copy()
+
+    def subset_time(self, start, end, ech):
+        """!
+        Get a subset of the time frames list (see slf.Serafin.Read.subset_time)
+        """
+        return [(time_index, time) for time_index, time in enumerate(self.time)
+                if start <= time <= end and time_index % ech == 0]
+
+    def _get_var_index(self, var_ID):
+        if self.header is None:
+            raise SerafinRequestError('Cannot extract variable from empty list (forgot read_header ?)')
+        try:
+            return self.header.var_IDs.index(var_ID)
+        except ValueError:
+            raise SerafinRequestError('Variable ID %s not found' % var_ID)
+
+    def _check_time_indices(self, time_indices):
+        time_indices = np.asarray(time_indices, dtype=np.int64).reshape(-1)
+        if len(time_indices) > 0:
+            if time_indices.min() < 0:
+                raise SerafinRequestError('Impossible to read a negative time index!')
+            if time_indices.max() >= self.header.nb_frames:
+                raise SerafinRequestError('Time index %i is out of range' % time_indices.max())
+        return time_indices
+
+    def _read_chunk(self, time_index, pos_var):
+        """!
+        @brief Read and decompress a chunk (without the delta filter)
+        @return <numpy 1D-array>: raw values as unsigned integers of the float size
+        """
+        header = self.header
+        chunk = self.offsets[time_index * header.nb_var + pos_var]
+        try:
+            data = _decompress(self.codec, self._pread(int(chunk), int(self.offsets[time_index * header.nb_var
+                                                                                    + pos_var + 1] - chunk)))
+            if len(data) != header.float_size * header.nb_nodes:
+                raise ValueError('unexpected size of the decompressed values')
+        except (zlib.error, lzma.LZMAError, ValueError) as e:
+            raise SerafinValidationError('Serafin archive %s is corrupted (frame %i, variable %i): %s'
+                                         % (self.filename, time_index, pos_var, e))
+        raw_values = np.frombuffer(data, dtype=np.uint8)
+        if self.filters & SHUFFLE:
+            raw_values = raw_values.reshape(header.float_size, header.nb_nodes).T.copy()
+        return raw_values.view('<u%i' % header.float_size).reshape(header.nb_nodes)
+
+    def _read_key_chunk(self, key_frame, pos_var):
+        """!
+        @brief Read a key frame chunk, reusing the last one decoded for this variable (consecutive frames share it)
+        @return <numpy 1D-array>: raw values as unsigned integers of the float size (read-only)
+        """
+        cached = self._key_chunks.get(pos_var)
+        if cached is not None and cached[0] == key_frame:
+            return cached[1]
+        raw_values = self._read_chunk(key_frame, pos_var)
+        raw_values.flags.writeable = False
+        self._key_chunks[pos_var] = (key_frame, raw_values)
+        return raw_values
+
+    def _read_var_in_frame(self, time_index, pos_var):
+        if self.filters & DELTA:
+            key_frame = time_index - time_index % self.keyframe_interval
+            raw_values = self._read_key_chunk(key_frame, pos_var)
+            if key_frame != time_index:
+                raw_values = raw_values ^ self._read_chunk(time_index, pos_var)
+        else:
+            raw_values = self._read_chunk(time_index, pos_var)
+        return raw_values.view('<' + self.header.float_type).astype(self.header.np_float_type)
+
+    def read_var_in_frame(self, time_index, var_ID):
+        """!
+        @brief Read a single variable in a frame (at most two chunks are decompressed)
+        @param time_index <int>: the index of the frame (0-based)
+        @param var_ID <str>: variable ID
+        @return <numpy 1D-array>: values of the variables, of length equal to the number of nodes
+        """
+        pos_var = self._get_var_index(var_ID)
+        time_index = self._check_time_indices([time_index])[0]
+        return self._read_var_in_frame(int(time_index), pos_var)
+
+    def read_vars_in_frames(self, var_IDs, time_indices, out=None):
+        """!
+        @brief Read several variables in several frames
+        @param var_IDs <[str]>: variable IDs
+        @param time_indices <[int]>: indices of the frames (0-based)
+        @param out <numpy 3D-array>: optional output array of shape (number of variables, number of frames, nb_nodes)
+        @return <numpy 3D-array>: values of shape (number of variables, number of frames, nb_nodes)
+        """
+        pos_vars = [self._get_var_index(var_ID) for var_ID in var_IDs]
+        time_indices = self._check_time_indices(time_indices)
+        if out is None:
+            out = np.empty((len(pos_vars), len(time_indices), self.header.nb_nodes), dtype=self.header.np_float_type)
+        for j, time_index in enumerate(time_indices):
+            for i, pos_var in enumerate(pos_vars):
+                out[i, j] = self._read_var_in_frame(int(time_index), pos_var)
+        return out
+
+    def read_var_in_frames(self, var_ID, time_indices, out=None):
+        """!
+        @brief Read a single variable in several frames (see `read_vars_in_frames`)
+        @return <numpy 2D-array>: values of shape (number of frames, nb_nodes)
+        """
+        return self.read_vars_in_frames([var_ID], time_indices, None if out is None else out[np.newaxis])[0]
+
+    def read_nodes_time_series(self, var_IDs, node_indices, time_indices):
+        """!
+        @brief Read several variables at some nodes only, in several frames (whole chunks are decompressed)
+        @return <numpy 3D-array>: values of shape (number of variables, number of frames, number of nodes)
+        """
+        node_indices = np.asarray(node_indices, dtype=np.int64).reshape(-1)
+        max_frames = max(1, settings.SERAFIN_READ_BLOCK_SIZE // max(1, len(var_IDs) * self.header.nb_nodes
+                                                                    * self.header.float_size))
+        time_indices = self._check_time_indices(time_indices)
+        out = np.empty((len(var_IDs), len(time_indices), len(node_indices)), dtype=self.header.np_float_type)
+        for start in range(0, len(time_indices), max_frames):
+            block = self.read_vars_in_frames(var_IDs, time_indices[start:start + max_frames])
+            out[:, start:start + max_frames] = block[:, :, node_indices]
+        return out
+
+    def iter_frames(self, var_IDs, time_indices, prefetch=None):
+        """!
+        @brief Iterate over frames while the next ones are decompressed in a background thread
+        @param var_IDs <[str]>: variable IDs
+        @param time_indices <[int]>: indices of the frames (0-based)
+        @param prefetch <int>: number of frames read in advance (`settings.SERAFIN_PREFETCH` by default, 0 to disable)
+        @return <generator>: time index and values of shape (number of variables, nb_nodes)
+        """
+        for var_ID in var_IDs:
+            self._get_var_index(var_ID)
+        time_indices = self._check_time_indices(time_indices)
+        if prefetch is None:
+            prefetch = settings.SERAFIN_PREFETCH
+        read_frame = lambda time_index: self.read_vars_in_frames(var_IDs, [time_index])[:, 0]
+        if prefetch <= 0:
+            frames = ((time_index, read_frame(time_index)) for time_index in time_indices)
+        else:
+            frames = prefetch_frames(read_frame, time_indices, prefetch)
+        try:
+            for time_index, values in frames:
+                yield int(time_index), values
+        finally:
+            frames.close()
+
+    def read_var_in_frame_as_3d(self, time_index, var_ID):
+        """!
+        @brief Read a single variable in a 3D frame
+        @return <numpy 2D-array>: values of the variables with shape (planes number, number of 2D nodes)
+        """
+        if self.header.is_2d:
+            raise SerafinRequestError('Reading values as 3D is only possible in 3D!')
+        return self.read_var_in_frame(time_index, var_ID).reshape((self.header.nb_planes, self.header.nb_nodes_2d))
+
+    def read_var_in_frame_at_layer(self, time_index, var_ID, iplan):
+        """!
+        @brief Read a single variable in a frame at specific layer
+        @param iplan <int>: 1-based index of layer
+        @return <numpy 1D-array>: values of the variables, of length equal to the number of 2D nodes
+        """
+        return self.read_var_in_frame_at_layers(time_index, var_ID, iplan, iplan)[0]
+
+    def read_var_in_frame_at_layers(self, time_index, var_ID, first_plan, last_plan):
+        """!
+        @brief Read a single variable in a frame for a range of consecutive layers (the whole chunk is decompressed)
+        @param first_plan <int>: 1-based index of the first layer
+        @param last_plan <int>: 1-based index of the last layer (included)
+        @return <numpy 2D-array>: values of shape (number of layers, number of 2D nodes)
+        """
+        header = self.header
+        if header.is_2d:
+            raise SerafinRequestError('Extracting values at a specific layer is only possible in 3D!')
+        for iplan in (first_plan, last_plan):
+            if iplan < 1 or iplan > header.nb_planes:
+                raise SerafinRequestError('Layer %i is not inside [1, %i]' % (iplan, header.nb_planes))
+        if first_plan > last_plan:
+            raise SerafinRequestError('Layer range [%i, %i] is empty' % (first_plan, last_plan))
+        return self.read_var_in_frame_as_3d(time_index, var_ID)[first_plan - 1:last_plan]
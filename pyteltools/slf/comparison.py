@@ -4,7 +4,6 @@ Comparison between two Serafin files with identical meshes
 
 import numpy as np
 
-from pyteltools.slf.interpolation import Interpolator
 from pyteltools.slf.volume import TruncatedTriangularPrisms
 
 
@@ -17,7 +16,7 @@ class ReferenceMesh(TruncatedTriangularPrisms):
     """
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.area = {}
+        self.elements_inside = np.empty((0,), dtype=np.int64)
         self.point_weight = []
         self.inverse_total_area = 1
 
@@ -31,36 +30,34 @@ class ReferenceMesh(TruncatedTriangularPrisms):
         @brief Initialize the weight on all points of the mesh depending on the comparison region
         @param polygon <geom.geometry.Polygon>: A polygon defining the comparison region or None if it is the whole mesh
         """
-        self.area = {}
         self.point_weight = np.zeros((self.nb_points,), dtype=np.float64)
 
         if polygon is None:  # entire mesh
             self.inside_polygon = False
             self.triangle_polygon_intersection = {}
             self.nb_triangles_inside = self.nb_triangles
-            total_area = 0
-            for (i, j, k), t in self.triangles.items():
-                area = t.area
-                self.area[i, j, k] = area
-                total_area += area
-                self.point_weight[[i, j, k]] += area
+            self.elements_inside = np.arange(self.nb_triangles)
+            total_area = self.areas.sum()
+            np.add.at(self.point_weight, self.ikle, self.areas[:, np.newaxis])
         else:
             self.inside_polygon = True
             self.polygon = polygon
             self.nb_triangles_inside = 0
 
-            potential_elements = self.get_intersecting_elements(polygon.bounds())
+            potential_elements = self.get_intersecting_element_indices(polygon.bounds())
             self.point_weight = np.zeros((self.nb_points,), dtype=np.float64)
             self.triangle_polygon_intersection = {}
+            elements_inside = []
             total_area = 0
-            for i, j, k in potential_elements:
-                t = self.triangles[i, j, k]
+            for element in potential_elements:
+                t = self.triangle(element)
+                i, j, k = self.ikle[element]
                 if polygon.contains(t):
                     self.nb_triangles_inside += 1
-                    area = t.area
+                    area = self.areas[element]
                     total_area += area
                     self.point_weight[[i, j, k]] += area
-                    self.area[i, j, k] = area
+                    elements_inside.append(element)
                 else:
                     is_intersected, intersection = polygon.polygon_intersection(t)
                     if is_intersected:
@@ -68,8 +65,9 @@ class ReferenceMesh(TruncatedTriangularPrisms):
                         area = intersection.area
                         total_area += area
                         centroid = intersection.centroid
-                        interpolator = Interpolator(t).get_interpolator_at(centroid.x, centroid.y)
+                        interpolator = self.barycentric_coordinates(element, centroid.x, centroid.y)
                         self.triangle_polygon_intersection[i, j, k] = (area, interpolator)
+            self.elements_inside = np.array(elements_inside, dtype=np.int64)
         self.point_weight /= 3.0
         self.inverse_total_area = 1 / total_area
 
@@ -120,10 +118,10 @@ class ReferenceMesh(TruncatedTriangularPrisms):
         @param values <numpy.1D-array>: The difference between the test mesh and the reference mesh
         @return <dict>: The value of the signed deviation for every triangles in the comparison area
         """
-        ewsd = {}
-        for i, j, k in self.area:
-            ewsd[i, j, k] = sum(values[[i, j, k]]) * self.area[i, j, k] / 3.0 * self.nb_triangles_inside \
-                            * self.inverse_total_area
+        ikle_inside = self.ikle[self.elements_inside]
+        deviations = values[ikle_inside].sum(axis=1) * self.areas[self.elements_inside] / 3.0 \
+            * self.nb_triangles_inside * self.inverse_total_area
+        ewsd = dict(zip(map(tuple, ikle_inside.tolist()), deviations.tolist()))
         if self.inside_polygon:
             for i, j, k in self.triangle_polygon_intersection:
                 area, interpolator = self.triangle_polygon_intersection[i, j, k]
@@ -300,12 +300,13 @@ class ComplexExpressionPool:
     def evaluate_expressions(self, augmented_path, input_stream, selected_expressions):
         nb_row = len(selected_expressions)
         nb_col = input_stream.header.nb_nodes
+        float_type = input_stream.header.compute_float_type()
 
         for time_index, time_value in enumerate(input_stream.time):
             values = self._evaluate_expressions(input_stream, time_index, augmented_path)
 
             # build nd-array in the selected order
-            value_array = np.empty((nb_row, nb_col))
+            value_array = np.empty((nb_row, nb_col), dtype=float_type)
             for i, expr in enumerate(selected_expressions):
                 value_array[i, :] = values[expr]
             yield time_value, value_array
@@ -6,7 +6,6 @@ import numpy as np
 
 from pyteltools.conf import settings
 
-from .interpolation import Interpolator
 from .mesh2D import Mesh2D
 from .Serafin import SLF_EIT
 from .util import logger
@@ -116,12 +115,11 @@ class TriangularVectorField(Mesh2D):
         @return <dict>: The list of tuples (normal vector, interpolator) of every intersected segments in triangles
         """
         intersections = {}
-        potential_elements = self.get_intersecting_elements(section.bounds())
-        for i, j, k in potential_elements:
-            t = self.triangles[i, j, k]
-            is_intersected, t_intersections = section.linestring_intersection(t)
+        potential_elements = self.get_intersecting_element_indices(section.bounds())
+        for element in potential_elements:
+            is_intersected, t_intersections = section.linestring_intersection(self.triangle(element))
             if is_intersected:
-                interpolator = Interpolator(t)
+                i, j, k = self.ikle[element]
                 intersections[i, j, k] = []
                 for intersection in t_intersections:
                     line = []   # the list of tuple (normal_vector, interpolator) for all start/end/turning points
@@ -129,10 +127,9 @@ class TriangularVectorField(Mesh2D):
                     for x, y in intersection.coords:
                         if prev_x is None:  # the first point doesn't have a normal vector
                             prev_x, prev_y = x, y
-                            line.append(([0, 0], interpolator.get_interpolator_at(x, y)))
+                            line.append(([0, 0], self.barycentric_coordinates(element, x, y)))
                         else:
-                            line.append(([prev_y-y, x-prev_x],
-                                        interpolator.get_interpolator_at(x, y)))
+                            line.append(([prev_y-y, x-prev_x], self.barycentric_coordinates(element, x, y)))
                     intersections[i, j, k].append(line)
         return intersections
 
@@ -297,12 +294,11 @@ class FluxCalculator:
         self.mesh = None
         self.intersections = []
 
-    def construct_triangles(self, iter_pbar=lambda x: x):
+    def construct_triangles(self):
         """!
         Construct triangular elements (index construction)
-        @param iter_pbar: iterable progress bar
         """
-        self.mesh = TriangularVectorField(self.input_stream.header, True, iter_pbar)
+        self.mesh = TriangularVectorField(self.input_stream.header, True)
 
     def construct_intersections(self):
         """!
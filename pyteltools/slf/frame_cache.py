@@ -0,0 +1,84 @@
+"""!
+Process-wide LRU cache of variable values read in Serafin frames.
+
+The cache is shared by all the Serafin readers of the process: the values of a variable in a frame are identified by
+the file (absolute path, size and modification time), the frame index and the variable position. Its size is bounded
+by `settings.SERAFIN_FRAME_CACHE_SIZE` (in bytes, the cache is disabled if it is equal to 0). Cached arrays are
+read-only because they are shared between callers.
+"""
+
+from collections import OrderedDict
+import os
+import threading
+
+from pyteltools.conf import settings
+
+
+class FrameCache:
+    """!
+    @brief LRU cache of variable values (numpy 1D-arrays) with a memory budget and hit/miss counters
+    """
+    def __init__(self):
+        self.size = 0  # current size (in bytes)
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def file_key(filename):
+        """!
+        @brief Identifier of a file content
+        @param filename <str>: path to the Serafin file
+        @return <tuple>: absolute path, size and modification time
+        """
+        stat = os.stat(filename)
+        return os.path.abspath(filename), stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def max_size():
+        """Returns the cache memory budget (in bytes)"""
+        return settings.SERAFIN_FRAME_CACHE_SIZE
+
+    def get(self, key):
+        """!
+        @brief Get cached values
+        @param key <tuple>: file key, frame index and variable position
+        @return <numpy 1D-array>: cached values (None if not in the cache)
+        """
+        with self._lock:
+            values = self._values.get(key)
+            if values is None:
+                self.misses += 1
+            else:
+                self._values.move_to_end(key)
+                self.hits += 1
+            return values
+
+    def put(self, key, values):
+        """!
+        @brief Add values to the cache (least recently used values are discarded to fit the memory budget)
+        @param key <tuple>: file key, frame index and variable position
+        @param values <numpy 1D-array>: values to cache (they become read-only)
+        """
+        max_size = FrameCache.max_size()
+        if values.nbytes > max_size:
+            return
+        values.flags.writeable = False
+        with self._lock:
+            if key in self._values:
+                return
+            self._values[key] = values
+            self.size += values.nbytes
+            while self.size > max_size:
+                _, old_values = self._values.popitem(last=False)
+                self.size -= old_values.nbytes
+
+    def clear(self):
+        """Empty the cache and reset the counters"""
+        with self._lock:
+            self._values.clear()
+            self.size, self.hits, self.misses = 0, 0, 0
+
+
+FRAME_CACHE = FrameCache()
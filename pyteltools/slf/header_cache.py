@@ -0,0 +1,125 @@
+"""!
+Persistent cache of parsed Serafin headers and time series.
+
+A cache entry is a folder containing the header mesh arrays (`.npy` files, loaded as read-only memory maps), the
+other header attributes (pickled) and the time series. It is written next to the Serafin file or in the folder
+`settings.SERAFIN_HEADER_CACHE_DIR`, and is only used while the path, size and modification time of the Serafin file
+(and the language) are unchanged.
+"""
+
+import hashlib
+import numpy as np
+import os
+import pickle
+
+from pyteltools.conf import settings
+
+from .util import logger
+
+
+CACHE_EXT = '.cache'
+HEADER_ARRAYS = ('ikle', 'ipobo', 'x', 'y', 'ikle_2d')
+
+
+def cache_path(filename):
+    """!
+    @brief Path to the cache folder of a Serafin file
+    @param filename <str>: path to the Serafin file
+    @return <str>: path to the cache folder
+    """
+    filename = os.path.abspath(filename)
+    if settings.SERAFIN_HEADER_CACHE_DIR:
+        digest = hashlib.sha1(filename.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(settings.SERAFIN_HEADER_CACHE_DIR, os.path.basename(filename) + '.' + digest)
+    return filename + CACHE_EXT
+
+
+def _cache_key(filename, language):
+    stat = os.stat(filename)
+    return os.path.abspath(filename), stat.st_size, stat.st_mtime_ns, language
+
+
+def _replace_file(path, write):
+    """Write a file under a temporary name and rename it once complete"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+
+def load_header(filename, language, header_class):
+    """!
+    @brief Load a cached header
+    @param filename <str>: path to the Serafin file
+    @param language <str>: Serafin variable name language ('fr' or 'en')
+    @param header_class <type>: header class (slf.Serafin.SerafinHeader)
+    @return <slf.Serafin.SerafinHeader>: cached header (None if the cache entry is absent or outdated)
+    """
+    folder = cache_path(filename)
+    try:
+        with open(os.path.join(folder, 'header.pkl'), 'rb') as f:
+            key, state = pickle.load(f)
+        if key != _cache_key(filename, language):
+            logger.debug('Header cache "%s" is outdated and is ignored' % folder)
+            return None
+        arrays = {name: np.load(os.path.join(folder, name + '.npy'), mmap_mode='r') for name in HEADER_ARRAYS}
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        return None
+    logger.debug('Using the header cache "%s"' % folder)
+    header = header_class.__new__(header_class)
+    header.__dict__.update(state)
+    for name, array in arrays.items():
+        setattr(header, name, array)
+    return header
+
+
+def save_header(filename, language, header):
+    """!
+    @brief Save a header in the cache (any error is only reported, the cache is optional)
+    @param filename <str>: path to the Serafin file
+    @param language <str>: Serafin variable name language ('fr' or 'en')
+    @param header <slf.Serafin.SerafinHeader>: header to save
+    """
+    folder = cache_path(filename)
+    state = {name: value for name, value in header.__dict__.items() if name.lstrip('_') not in HEADER_ARRAYS}
+    try:
+        os.makedirs(folder, exist_ok=True)
+        if os.path.exists(os.path.join(folder, 'time.npy')):
+            os.remove(os.path.join(folder, 'time.npy'))
+        for name in HEADER_ARRAYS:
+            _replace_file(os.path.join(folder, name + '.npy'), lambda f: np.save(f, getattr(header, name)))
+        _replace_file(os.path.join(folder, 'header.pkl'),
+                      lambda f: pickle.dump((_cache_key(filename, language), state), f))
+    except OSError as e:
+        logger.warning('Header cache "%s" could not be written: %s' % (folder, e))
+
+
+def load_time(filename, language):
+    """!
+    @brief Load a cached time series
+    @param filename <str>: path to the Serafin file
+    @param language <str>: Serafin variable name language ('fr' or 'en')
+    @return <numpy 1D-array>: time values (None if the cache entry is absent or outdated)
+    """
+    folder = cache_path(filename)
+    try:
+        with open(os.path.join(folder, 'header.pkl'), 'rb') as f:
+            key, _ = pickle.load(f)
+        if key != _cache_key(filename, language):
+            return None
+        return np.load(os.path.join(folder, 'time.npy'), mmap_mode='r')
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        return None
+
+
+def save_time(filename, time):
+    """!
+    @brief Save a time series in the cache (next to an existing header cache entry)
+    @param filename <str>: path to the Serafin file
+    @param time <numpy 1D-array>: time values
+    """
+    folder = cache_path(filename)
+    try:
+        _replace_file(os.path.join(folder, 'time.npy'), lambda f: np.save(f, time))
+    except OSError as e:
+        logger.warning('Time cache "%s" could not be written: %s' % (folder, e))
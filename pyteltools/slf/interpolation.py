@@ -3,6 +3,7 @@ Barycentric interpolation in triangles
 """
 
 import numpy as np
+from scipy.sparse import csr_matrix
 
 from .mesh2D import Mesh2D
 
@@ -36,27 +37,99 @@ class Interpolator:
         return np.all(coord >= 0) and np.all(coord <= 1), coord
 
 
+class InterpolationMatrix:
+    """!
+    @brief Sparse linear operator interpolating node values on points (values are NaN for points outside the mesh)
+    The interpolation of several variables and frames is a single sparse-dense matrix product.
+    """
+    def __init__(self, matrix, is_inside):
+        """!
+        @param matrix <scipy.sparse.csr_matrix>: barycentric weights of shape (number of points, number of nodes)
+        @param is_inside <numpy 1D-array>: True for the points inside the mesh
+        """
+        self.matrix = matrix
+        self.is_inside = np.asarray(is_inside, dtype=bool)
+        self.nb_points = matrix.shape[0]
+        self.outside = np.flatnonzero(~self.is_inside)
+
+    @staticmethod
+    def from_point_interpolators(point_interpolators, nb_nodes):
+        """!
+        @brief Build the matrix from point interpolators (see MeshInterpolator.get_point_interpolators)
+        @param point_interpolators <[tuple]>: nodes (i, j, k) and barycentric coordinates of each point (or None)
+        @param nb_nodes <int>: number of nodes
+        @return <slf.interpolation.InterpolationMatrix>: the interpolation matrix
+        """
+        is_inside = np.array([interpolator is not None for interpolator in point_interpolators], dtype=bool)
+        inside = [interpolator for interpolator in point_interpolators if interpolator is not None]
+        nodes = np.array([ijk for ijk, _ in inside], dtype=np.int64).reshape(-1, 3)
+        coordinates = np.array([coordinates for _, coordinates in inside], dtype=np.float64).reshape(-1, 3)
+        return InterpolationMatrix._from_arrays(is_inside, nodes, coordinates, nb_nodes)
+
+    @staticmethod
+    def _from_arrays(is_inside, nodes, coordinates, nb_nodes):
+        indptr = np.zeros(len(is_inside) + 1, dtype=np.int64)
+        np.cumsum(3 * is_inside, out=indptr[1:])
+        matrix = csr_matrix((coordinates.ravel(), nodes.ravel(), indptr), shape=(len(is_inside), nb_nodes))
+        return InterpolationMatrix(matrix, is_inside)
+
+    def used_nodes(self):
+        """!
+        @return <numpy 1D-array>: sorted indices of the nodes involved in the interpolation
+        """
+        return np.unique(self.matrix.indices)
+
+    def select_nodes(self, nodes):
+        """!
+        @brief Restrict the operator to some nodes (to interpolate values read at these nodes only)
+        @param nodes <numpy 1D-array>: node indices, including all the nodes involved in the interpolation
+        @return <slf.interpolation.InterpolationMatrix>: the operator applying on the values at the given nodes
+        """
+        return InterpolationMatrix(self.matrix[:, nodes].tocsr(), self.is_inside)
+
+    def interpolate(self, values, out=None):
+        """!
+        @brief Interpolate node values on the points
+        @param values <numpy ND-array>: node values, the last dimension being the nodes
+            (e.g. of shape (nb_var, nb_nodes) for a frame or (nb_var, nb_frames, nb_nodes) for a block of frames)
+        @param out <numpy ND-array>: optional buffer receiving the interpolated values
+        @return <numpy ND-array>: interpolated values, the last dimension being the points (NaN outside the mesh),
+            with the floating point type of the node values (float64 for integer values) if `out` is not given
+        """
+        values = np.asarray(values)
+        shape = values.shape[:-1] + (self.nb_points,)
+        interpolated = self.matrix.dot(values.reshape(-1, values.shape[-1]).T).T
+        if out is None:
+            dtype = values.dtype if np.issubdtype(values.dtype, np.floating) else np.float64
+            out = np.asarray(interpolated, dtype=dtype).reshape(shape)
+        else:
+            out[...] = interpolated.reshape(shape)
+        out[..., self.outside] = np.nan
+        return out
+
+
 class MeshInterpolator(Mesh2D):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
 
-    def get_point_interpolators(self, points):
-        nb_points = len(points)
-        is_inside = [False] * nb_points
-        point_interpolators = [None] * nb_points
-
-        for index, (x, y) in enumerate(points):
-            potential_elements = self.get_intersecting_elements((x, y, x, y))
-            if not potential_elements:
-                continue
-            for i, j, k in potential_elements:
-                t = self.triangles[i, j, k]
-                is_in, point_interpolator = Interpolator(t).is_in_triangle(x, y)
-                if is_in:
-                    is_inside[index] = True
-                    point_interpolators[index] = ((i, j, k), point_interpolator)
-                    break
+    def get_interpolation_matrix(self, points):
+        """!
+        @brief Locate the points and build the operator interpolating the node values on them
+        @param points <numpy 2D-array>: point coordinates of shape (number of points, 2)
+        @return <slf.interpolation.InterpolationMatrix>: the interpolation matrix
+        """
+        elements, coordinates = self.locate_points(points)
+        is_inside = elements >= 0
+        return InterpolationMatrix._from_arrays(is_inside, self.ikle[elements[is_inside]], coordinates[is_inside],
+                                                self.nb_points)
 
+    def get_point_interpolators(self, points):
+        elements, coordinates = self.locate_points(np.array(points, dtype=np.float64).reshape(-1, 2))
+        is_inside = (elements >= 0).tolist()
+        point_interpolators = [None] * len(elements)
+        for index in np.flatnonzero(elements >= 0):
+            i, j, k = self.ikle[elements[index]]
+            point_interpolators[index] = ((i, j, k), coordinates[index])
         return is_inside, point_interpolators
 
     def _get_line_interpolators(self, line):
@@ -69,15 +142,15 @@ class MeshInterpolator(Mesh2D):
 
         for right, up, segment in line.segments():  # for every segment, sort intersection points
             segment_intersections = []
-            potential_elements = self.get_intersecting_elements(segment.bounds())
-            for i, j, k in potential_elements:
-                t = self.triangles[i, j, k]
-                is_intersected, t_intersections = segment.linestring_intersection(t)
+            potential_elements = self.get_intersecting_element_indices(segment.bounds())
+            for element in potential_elements:
+                is_intersected, t_intersections = segment.linestring_intersection(self.triangle(element))
                 if is_intersected:
-                    interpolator = Interpolator(t)
+                    i, j, k = self.ikle[element]
                     for intersection in t_intersections:
                         for x, y in intersection.coords:
-                            segment_intersections.append((x, y, (i, j, k), interpolator.get_interpolator_at(x, y)))
+                            segment_intersections.append((x, y, (i, j, k),
+                                                          self.barycentric_coordinates(element, x, y)))
 
             # first sort by y, then sort by x
             if up:
@@ -2,43 +2,271 @@
 Representation of the 2D mesh in a 2D Serafin file.
 """
 
+from collections.abc import Mapping
+from itertools import chain
 import numpy as np
-from rtree.index import Index
 from shapely.geometry import Polygon
 
+try:
+    from rtree.index import Index
+except ImportError:  # a uniform grid index (GridIndex) is used instead
+    Index = None
+
+
+class Triangles(Mapping):
+    """!
+    @brief Read-only mapping from the triangle nodes (i, j, k) to the triangle geometry (built on demand)
+    Iteration follows the order of the elements in the mesh.
+    """
+    def __init__(self, mesh):
+        """!
+        @param mesh <slf.mesh2D.Mesh2D>: the mesh
+        """
+        self.mesh = mesh
+
+    def __getitem__(self, nodes):
+        i, j, k = nodes
+        return Polygon([self.mesh.points[i], self.mesh.points[j], self.mesh.points[k]])
+
+    def __iter__(self):
+        for i, j, k in self.mesh.ikle:
+            yield i, j, k
+
+    def __len__(self):
+        return self.mesh.nb_triangles
+
+
+class GridIndex:
+    """!
+    @brief Spatial index of bounding boxes on a uniform grid (numpy only, used if rtree is not available)
+    Cells store the identifiers of the boxes overlapping them, in a compressed (CSR) layout.
+    """
+    def __init__(self, bboxes):
+        """!
+        @param bboxes <numpy 2D-array>: bounding boxes (left, bottom, right, top), identified by their row index
+        """
+        self.bboxes = bboxes
+        nb_boxes = len(bboxes)
+        if nb_boxes == 0:
+            self.origin, self.cell_size, self.shape = np.zeros(2), 1., (1, 1)
+            self.offsets, self.ids = np.zeros(2, dtype=np.int64), np.zeros(0, dtype=np.int64)
+            return
+        self.origin = bboxes[:, :2].min(axis=0)
+        extent = bboxes[:, 2:].max(axis=0) - self.origin
+        # about one box per cell, but cells not smaller than the mean box size
+        mean_size = (bboxes[:, 2:] - bboxes[:, :2]).mean()
+        self.cell_size = max(np.sqrt(extent[0] * extent[1] / nb_boxes), mean_size, np.finfo(np.float64).tiny)
+        self.shape = tuple(np.maximum(np.ceil(extent / self.cell_size).astype(np.int64), 1))
+
+        first, last = self._cells(bboxes[:, :2]), self._cells(bboxes[:, 2:])
+        span = last - first + 1
+        counts = span[:, 0] * span[:, 1]
+        ids = np.repeat(np.arange(nb_boxes, dtype=np.int64), counts)
+        local = np.arange(len(ids)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = (first[ids, 1] + local // span[ids, 0]) * self.shape[0] + first[ids, 0] + local % span[ids, 0]
+        order = np.argsort(cells, kind='stable')
+        self.ids = ids[order]
+        self.offsets = np.zeros(self.shape[0] * self.shape[1] + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cells, minlength=self.shape[0] * self.shape[1]), out=self.offsets[1:])
+
+    def _cells(self, points):
+        cells = np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, np.array(self.shape) - 1)
+
+    def intersection(self, bounding_box):
+        """!
+        @brief Return the identifiers of the boxes intersecting the bounding box
+        @param bounding_box <tuple>: (left, bottom, right, top)
+        @return <numpy 1D-array>: sorted identifiers
+        """
+        if len(self.ids) == 0:
+            return self.ids
+        left, bottom, right, top = bounding_box
+        (i_min, j_min), (i_max, j_max) = self._cells(np.array([[left, bottom], [right, top]], dtype=np.float64))
+        rows = np.arange(j_min, j_max + 1) * self.shape[0]
+        candidates = np.concatenate([self.ids[self.offsets[row + i_min]:self.offsets[row + i_max + 1]]
+                                     for row in rows])
+        candidates = np.unique(candidates)
+        boxes = self.bboxes[candidates]
+        inside = (boxes[:, 0] <= right) & (boxes[:, 2] >= left) & (boxes[:, 1] <= top) & (boxes[:, 3] >= bottom)
+        return candidates[inside]
+
+    def intersection_v(self, mins, maxs):
+        """!
+        @brief Bulk intersection query (same interface as rtree.index.Index.intersection_v)
+        @param mins <numpy 2D-array>: (left, bottom) of the query boxes
+        @param maxs <numpy 2D-array>: (right, top) of the query boxes
+        @return <numpy 1D-array, numpy 1D-array>: identifiers intersecting the query boxes (sorted for each box), and
+            their number for every query box
+        """
+        nb_queries = len(mins)
+        if len(self.ids) == 0:
+            return self.ids, np.zeros(nb_queries, dtype=np.int64)
+        first, last = self._cells(mins), self._cells(maxs)
+        span = last - first + 1
+        counts = span[:, 0] * span[:, 1]
+        queries = np.repeat(np.arange(nb_queries, dtype=np.int64), counts)
+        local = np.arange(len(queries)) - np.repeat(np.cumsum(counts) - counts, counts)
+        cells = (first[queries, 1] + local // span[queries, 0]) * self.shape[0] \
+            + first[queries, 0] + local % span[queries, 0]
+
+        # all the (query, box) pairs of the covered cells
+        starts, counts = self.offsets[cells], self.offsets[cells + 1] - self.offsets[cells]
+        queries = np.repeat(queries, counts)
+        local = np.arange(len(queries)) - np.repeat(np.cumsum(counts) - counts, counts)
+        ids = self.ids[np.repeat(starts, counts) + local]
+
+        boxes = self.bboxes[ids]
+        inside = (boxes[:, 0] <= maxs[queries, 0]) & (boxes[:, 2] >= mins[queries, 0]) & \
+                 (boxes[:, 1] <= maxs[queries, 1]) & (boxes[:, 3] >= mins[queries, 1])
+        pairs = np.unique(queries[inside] * len(self.bboxes) + ids[inside])  # sorted by query, then by box
+        return pairs % len(self.bboxes), np.bincount(pairs // len(self.bboxes), minlength=nb_queries)
+
 
 class Mesh2D:
     """!
     The general representation of mesh in Serafin 2D.
     The basis for interpolation, volume calculations etc.
+
+    The geometrical properties of the elements (bounding boxes, areas, centroids and barycentric coefficients) are
+    stored in arrays indexed by the element index (row of `ikle`). Triangle geometries (shapely Polygon) are only
+    built on demand, with `triangle` or the mapping `triangles`.
     """
-    def __init__(self, input_header, construct_index=False, iter_pbar=lambda x: x):
+    def __init__(self, input_header, construct_index=False):
         """!
         @param input_header <slf.Serafin.SerafinHeader>: input Serafin header
-        @param construct_index <bool>: perform the index construction
-        @param iter_pbar: iterable progress bar
+        @param construct_index <bool>: perform the index construction (see `build_index`)
         """
         self.x, self.y = input_header.x[:input_header.nb_nodes_2d], input_header.y[:input_header.nb_nodes_2d]
         self.ikle = input_header.ikle_2d - 1  # back to 0-based indexing
-        self.triangles = {}
         self.nb_points = self.x.shape[0]
         self.nb_triangles = self.ikle.shape[0]
         self.points = np.stack([self.x, self.y], axis=1)
+        self._compute_element_arrays()
+        self.triangles = Triangles(self)
+        self._point_index = None  # grid index for point location (built on first use)
         if not construct_index:
+            self.index = Index() if Index is not None else GridIndex(np.empty((0, 4)))
+        else:
+            self.build_index()
+
+    def _compute_element_arrays(self):
+        """!
+        Compute the geometrical properties of all the elements (in double precision)
+        """
+        x = np.asarray(self.x, dtype=np.float64)[self.ikle]
+        y = np.asarray(self.y, dtype=np.float64)[self.ikle]
+        x1, x2, x3 = x.T
+        y1, y2, y3 = y.T
+        self.bboxes = np.stack([x.min(axis=1), y.min(axis=1), x.max(axis=1), y.max(axis=1)], axis=1)
+        self.centroids = np.stack([x.mean(axis=1), y.mean(axis=1)], axis=1)
+
+        # barycentric coordinates of (x, y) are (norm_z + (x-x1) * vec_y - (y-y1) * vec_x) / norm_z
+        self.vec_x = np.stack([x2-x3, x3-x1, x1-x2], axis=1)
+        self.vec_y = np.stack([y2-y3, y3-y1, y1-y2], axis=1)
+        self.norm_z = (x2-x1) * (y3-y1) - (y2-y1) * (x3-x1)  # twice the signed area
+        self.areas = np.abs(self.norm_z) / 2
+
+    def build_index(self, iter_pbar=None):
+        """!
+        @brief Build the spatial index of the element bounding boxes
+        The rtree is bulk loaded (packed with the STR algorithm), from the arrays if rtree>=1.1 or from a stream
+        otherwise. Without rtree, a uniform grid index is used.
+        @param iter_pbar: iterable progress bar over the element indices (optional). If given, the rtree is bulk
+            loaded from a stream wrapped by `iter_pbar`, which can also stop the iteration to interrupt the construction
+        """
+        if Index is None:
+            self.index = GridIndex(self.bboxes)
+        elif self.nb_triangles == 0:
             self.index = Index()
+        elif iter_pbar is None and hasattr(Index, 'intersection_v'):  # array interface
+            self.index = Index((np.arange(self.nb_triangles, dtype=np.int64),
+                                np.ascontiguousarray(self.bboxes[:, :2]), np.ascontiguousarray(self.bboxes[:, 2:])))
         else:
-            self._construct_index(iter_pbar)
+            if iter_pbar is None:
+                iter_pbar = iter
+            stream = ((index, tuple(self.bboxes[index]), None) for index in iter_pbar(range(self.nb_triangles)))
+            first = next(stream, None)
+            if first is None:  # interrupted before the first element (rtree rejects an empty stream)
+                self.index = Index()
+            else:
+                self.index = Index(chain([first], stream))
+
+    def triangle(self, index):
+        """!
+        @brief Build the geometry of an element
+        @param index <int>: element index
+        @return <shapely.geometry.Polygon>: the triangle
+        """
+        return Polygon(self.points[self.ikle[index]])
+
+    def barycentric_coordinates(self, index, x, y):
+        """!
+        @brief Return the barycentric coordinates of the point (x, y) in an element
+        @param index <int>: element index
+        @param x <float>: x coordinate
+        @param y <float>: y coordinate
+        @return <numpy 1D-array>: the barycentric coordinates (weights of the three nodes of the element)
+        """
+        i = self.ikle[index, 0]
+        norm_z = self.norm_z[index]
+        return (np.array([norm_z, 0, 0]) + (x - float(self.x[i])) * self.vec_y[index]
+                - (y - float(self.y[i])) * self.vec_x[index]) * (1 / norm_z)
+
+    def _point_candidates(self, points):
+        """!
+        @brief Candidate elements (intersecting bounding box) of several points
+        @param points <numpy 2D-array>: point coordinates of shape (number of points, 2)
+        @return <numpy 1D-array, numpy 1D-array>: point indices and element indices of all the candidate pairs
+        """
+        if self._point_index is None:  # a grid is much faster than rtree for bulk point queries
+            self._point_index = self.index if isinstance(self.index, GridIndex) else GridIndex(self.bboxes)
+        elements, counts = self._point_index.intersection_v(points, points)
+        return np.repeat(np.arange(len(points)), counts), elements
 
-    def _construct_index(self, iter_pbar):
+    def locate_points(self, points, chunk_size=65536):
         """!
-        Separate the index construction from the constructor, allowing a GUI override
-        @param iter_pbar: iterable progress bar
+        @brief Find the elements containing the points and the barycentric coordinates of the points (vectorized)
+        The candidate elements are found with a uniform grid index, independent from the index `index`.
+        @param points <numpy 2D-array>: point coordinates of shape (number of points, 2)
+        @param chunk_size <int>: number of points processed at once (bounds the memory of the candidate pairs)
+        @return <numpy 1D-array, numpy 2D-array>: element index of each point (-1 if outside the mesh), and the
+            barycentric coordinates of shape (number of points, 3) (zero if outside the mesh)
         """
-        self.index = Index()
-        for i, j, k in iter_pbar(self.ikle, unit='elements'):
-            t = Polygon([self.points[i], self.points[j], self.points[k]])
-            self.triangles[i, j, k] = t
-            self.index.insert(i, t.bounds, obj=(i, j, k))
+        points = np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+        elements = np.full(len(points), -1, dtype=np.int64)
+        coordinates = np.zeros((len(points), 3), dtype=np.float64)
+        first_nodes = self.ikle[:, 0]
+        for start in range(0, len(points), chunk_size):
+            chunk = points[start:start + chunk_size]
+            point_indices, candidates = self._point_candidates(chunk)
+            non_degenerate = self.norm_z[candidates] != 0  # zero-area elements contain no point
+            point_indices, candidates = point_indices[non_degenerate], candidates[non_degenerate]
+
+            # barycentric coordinates (same operations as `barycentric_coordinates`) of all the candidate pairs
+            nodes = first_nodes[candidates]
+            norm_z = self.norm_z[candidates]
+            dx = (chunk[point_indices, 0] - np.asarray(self.x[nodes], dtype=np.float64))[:, np.newaxis]
+            dy = (chunk[point_indices, 1] - np.asarray(self.y[nodes], dtype=np.float64))[:, np.newaxis]
+            pair_coordinates = np.zeros((len(candidates), 3))
+            pair_coordinates[:, 0] = norm_z
+            pair_coordinates = (pair_coordinates + dx * self.vec_y[candidates] - dy * self.vec_x[candidates]) \
+                * (1 / norm_z)[:, np.newaxis]
+            inside = np.all((pair_coordinates >= 0) & (pair_coordinates <= 1), axis=1)
+
+            # keep the first containing candidate of every point
+            found, first = np.unique(point_indices[inside], return_index=True)
+            elements[start + found] = candidates[inside][first]
+            coordinates[start + found] = pair_coordinates[inside][first]
+        return elements, coordinates
+
+    def get_intersecting_element_indices(self, bounding_box):
+        """!
+        @brief Return the indices of the elements in the mesh intersecting the bounding box
+        @param bounding_box <tuple>: (left, bottom, right, top) of a 2d geometrical object
+        @return <[int]>: The list of element indices intersecting the bounding box
+        """
+        return list(self.index.intersection(bounding_box))
 
     def get_intersecting_elements(self, bounding_box):
         """!
@@ -46,7 +274,4 @@ class Mesh2D:
         @param bounding_box <tuple>: (left, bottom, right, top) of a 2d geometrical object
         @return <[tuple]>: The list of triangles (i,j,k) intersecting the bounding box
         """
-        return list(self.index.intersection(bounding_box, objects='raw'))
-
-
-
+        return [tuple(self.ikle[index]) for index in self.get_intersecting_element_indices(bounding_box)]
@@ -9,6 +9,7 @@ import shapefile
 from pyteltools.conf import settings
 
 from . import Serafin
+from .interpolation import InterpolationMatrix
 from .util import logger
 from .variables import do_calculation, get_available_variables, get_necessary_equations
 
@@ -188,6 +189,39 @@ def evaluate_expression(input_stream, time_index, expression):
     return stack.pop()
 
 
+def prefetched_time_indices(input_stream, var_IDs, time_indices):
+    """!
+    @brief Iterate over time indices while the values of the needed variables are read in advance
+    @param input_stream <slf.Serafin.Read>: input stream
+    @param var_IDs <[str]>: needed variable IDs (computed variables are ignored)
+    @param time_indices <[int]>: indices of the frames (0-based)
+    @return <generator>: time indices
+    """
+    var_IDs = [var_ID for var_ID in dict.fromkeys(var_IDs) if var_ID in input_stream.header.var_IDs]
+    for time_index, _ in input_stream.iter_frames(var_IDs, time_indices):
+        yield time_index
+
+
+def expression_var_IDs(expression):
+    """!
+    @brief Variable IDs used in an expression
+    @param expression <[str]>: expression in postfix notation
+    @return <[str]>: variable IDs
+    """
+    return [symbol[1:-1] for symbol in expression if symbol not in OPERATORS and symbol[0] == '[']
+
+
+def equations_var_IDs(equations):
+    """!
+    @brief Input variable IDs of equations
+    @param equations <[slf.variables_utils.Equation]>: equations
+    @return <[str]>: variable IDs
+    """
+    if equations is None:
+        return []
+    return [var.ID() for equation in equations for var in equation.input]
+
+
 def detect_vector_couples(variables, available_variables):
     coupled, non_coupled, mothers, angles = [], [], [], []
     for var in variables:
@@ -452,13 +486,15 @@ class ScalarMaxMinMeanCalculator:
         self.nb_var = len(selected_scalars)
         self.nb_nodes = input_stream.header.nb_nodes
         self.additional_equations = additional_equations
+        self.float_type = input_stream.header.compute_float_type()
 
         if self.maxmin == MAX:
-            self.current_values = np.ones((self.nb_var, self.nb_nodes)) * (-float('Inf'))
+            self.current_values = np.full((self.nb_var, self.nb_nodes), -float('Inf'), dtype=self.float_type)
         elif self.maxmin == MIN:
-            self.current_values = np.ones((self.nb_var, self.nb_nodes)) * float('Inf')
-        else:
-            self.current_values = np.zeros((self.nb_var, self.nb_nodes))
+            self.current_values = np.full((self.nb_var, self.nb_nodes), float('Inf'), dtype=self.float_type)
+        else:  # sums are always accumulated in double precision
+            self.current_values = np.zeros((self.nb_var, self.nb_nodes), dtype=np.float64)
+        self.values = np.empty((self.nb_var, self.nb_nodes), dtype=self.float_type)  # reused for every frame
 
     def additional_computation_in_frame(self, time_index):
         computed_values = {}
@@ -480,7 +516,7 @@ class ScalarMaxMinMeanCalculator:
         else:
             computed_values = {}
 
-        values = np.empty((self.nb_var, self.nb_nodes))
+        values = self.values
         for i, (var, name, unit) in enumerate(self.selected_scalars):
             if var not in computed_values:
                 computed_values[var] = self.input_stream.read_var_in_frame(time_index, var)
@@ -488,20 +524,38 @@ class ScalarMaxMinMeanCalculator:
 
         with np.errstate(invalid='ignore'):
             if self.maxmin == MAX:
-                self.current_values = np.maximum(self.current_values, values)
+                np.maximum(self.current_values, values, out=self.current_values)
             elif self.maxmin == MIN:
-                self.current_values = np.minimum(self.current_values, values)
+                np.minimum(self.current_values, values, out=self.current_values)
             else:
                 self.current_values += values
 
     def finishing_up(self):
         if self.maxmin == MEAN:
-            self.current_values /= len(self.time_indices)
-        return self.current_values
+            return (self.current_values / len(self.time_indices)).astype(self.float_type, copy=False)
+        return self.current_values.copy()
+
+    def needed_var_IDs(self):
+        return [var for var, _, _ in self.selected_scalars] + equations_var_IDs(self.additional_equations)
 
     def run(self):
-        for time_index in self.time_indices:
+        for time_index in prefetched_time_indices(self.input_stream, self.needed_var_IDs(), self.time_indices):
+            self.max_min_mean_in_frame(time_index)
+
+    def follow(self, poll_interval=None, timeout=None):
+        """!
+        @brief Update the values with the frames written after the last time index in a live file
+        The values can be retrieved with `finishing_up` after each new frame (see slf.Serafin.Read.follow)
+        @param poll_interval <float>: time between two checks of the file size (in seconds)
+        @param timeout <float>: stop after this time without any new frame (in seconds, None to wait forever)
+        @return <generator>: time indices of the new frames
+        """
+        start = self.time_indices[-1] + 1 if len(self.time_indices) > 0 else 0
+        self.time_indices = list(self.time_indices)
+        for time_index in self.input_stream.follow(start, poll_interval, timeout):
             self.max_min_mean_in_frame(time_index)
+            self.time_indices.append(time_index)
+            yield time_index
 
 
 class VectorMaxMinMeanCalculator:
@@ -516,18 +570,19 @@ class VectorMaxMinMeanCalculator:
         self.additional_equations = additional_equations
 
         self.nb_nodes = input_stream.header.nb_nodes
+        self.float_type = input_stream.header.compute_float_type()
 
         self.current_values = {}
         for var, _, _ in selected_vectors:
             mother = _VECTORS[var][1]
             if self.maxmin == MAX:
-                self.current_values[var] = np.ones((self.nb_nodes,)) * (-float('Inf'))
-                self.current_values[mother] = np.ones((self.nb_nodes,)) * (-float('Inf'))
+                self.current_values[var] = np.full((self.nb_nodes,), -float('Inf'), dtype=self.float_type)
+                self.current_values[mother] = np.full((self.nb_nodes,), -float('Inf'), dtype=self.float_type)
             elif self.maxmin == MIN:
-                self.current_values[var] = np.ones((self.nb_nodes,)) * float('Inf')
-                self.current_values[mother] = np.ones((self.nb_nodes,)) * float('Inf')
-            else:
-                self.current_values[var] = np.zeros((self.nb_nodes,))
+                self.current_values[var] = np.full((self.nb_nodes,), float('Inf'), dtype=self.float_type)
+                self.current_values[mother] = np.full((self.nb_nodes,), float('Inf'), dtype=self.float_type)
+            else:  # sums are always accumulated in double precision
+                self.current_values[var] = np.zeros((self.nb_nodes,), dtype=np.float64)
 
     def additional_computation_in_frame(self, time_index):
         computed_values = {}
@@ -567,16 +622,20 @@ class VectorMaxMinMeanCalculator:
                                                     computed_values[var], self.current_values[var])
 
     def finishing_up(self):
-        values = np.empty((len(self.selected_vectors), self.nb_nodes))
+        values = np.empty((len(self.selected_vectors), self.nb_nodes), dtype=self.float_type)
         for i, (var, _, _) in enumerate(self.selected_vectors):
-            values[i, :] = self.current_values[var]
-
-        if self.maxmin == MEAN:
-            values /= len(self.time_indices)
+            if self.maxmin == MEAN:
+                values[i, :] = self.current_values[var] / len(self.time_indices)
+            else:
+                values[i, :] = self.current_values[var]
         return values
 
+    def needed_var_IDs(self):
+        var_IDs = [var_ID for var, _, _ in self.selected_vectors for var_ID in (var, _VECTORS[var][1])]
+        return var_IDs + equations_var_IDs(self.additional_equations)
+
     def run(self):
-        for time_index in self.time_indices:
+        for time_index in prefetched_time_indices(self.input_stream, self.needed_var_IDs(), self.time_indices):
             self.max_min_mean_in_frame(time_index)
 
 
@@ -589,15 +648,17 @@ class ArrivalDurationCalculator:
         self.time_indices = time_indices
         self.expression = condition.expression
         self.test_condition = condition.test_condition
+        self.float_type = input_stream.header.compute_float_type()
 
         # first
         self.previous_time = self.input_stream.time[self.time_indices[0]]
         self.previous_value = evaluate_expression(self.input_stream, self.time_indices[0], self.expression)
         self.previous_flag = self.test_condition(self.previous_value)
 
-        self.duration = np.zeros((self.input_stream.header.nb_nodes,))
-        self.arrival = np.where(self.previous_flag, self.previous_time, float('Inf'))
-        self.previous_flip = np.ones((input_stream.header.nb_nodes,)) * self.previous_time
+        # the times are kept in double precision (see `finishing_up`)
+        self.duration = np.zeros((self.input_stream.header.nb_nodes,), dtype=np.float64)
+        self.arrival = np.where(self.previous_flag, self.previous_time, float('Inf')).astype(np.float64)
+        self.previous_flip = np.full((input_stream.header.nb_nodes,), self.previous_time, dtype=np.float64)
 
     def arrival_duration_in_frame(self, index):
         current_time = self.input_stream.time[index]
@@ -626,8 +687,14 @@ class ArrivalDurationCalculator:
         self.previous_value = current_value
         self.previous_time = current_time
 
+    def finishing_up(self):
+        return np.array([self.arrival, self.duration], dtype=self.float_type)
+
+    def needed_var_IDs(self):
+        return expression_var_IDs(self.expression)
+
     def run(self):
-        for index in self.time_indices[1:]:
+        for index in prefetched_time_indices(self.input_stream, self.needed_var_IDs(), self.time_indices[1:]):
             self.arrival_duration_in_frame(index)
 
 
@@ -660,13 +727,14 @@ class Condition:
 class ProjectMeshCalculator:
     """!
     Projection and operations between two different meshes
+    The values of the second input are projected with a sparse interpolation matrix, for all the variables at once,
+    into a values buffer reused from one frame to the next.
     """
     def __init__(self, first_in, second_in, selected_vars, is_inside, point_interpolators,
                  time_indices, operation_type, use_reference=False):
         self.first_in = first_in
         self.second_in = second_in
         self.is_inside = is_inside
-        self.point_interpolators = point_interpolators
         self.time_indices = time_indices
         self.operation_type = operation_type
         self.selected_vars = selected_vars
@@ -679,59 +747,69 @@ class ProjectMeshCalculator:
 
         self.nb_var = len(self.selected_vars)
         self.nb_nodes = self.first_in.header.nb_nodes
+        self.interpolation = InterpolationMatrix.from_point_interpolators(point_interpolators,
+                                                                          self.second_in.header.nb_nodes)
+        self.values = np.empty((self.nb_var, self.nb_nodes), dtype=self.first_in.header.compute_float_type())
 
     def read_values_in_frame(self, time_index, read_second):
-        values = []
-        for i, var_ID in enumerate(self.selected_vars):
-            if read_second:
-                values.append(self.second_in.read_var_in_frame(time_index, var_ID))
-            else:
-                values.append(self.first_in.read_var_in_frame(time_index, var_ID))
-        return values
+        input_stream = self.second_in if read_second else self.first_in
+        return np.array([input_stream.read_var_in_frame(time_index, var_ID) for var_ID in self.selected_vars])
 
     def interpolate(self, values):
-        interpolated_values = []
-        for index_node in range(self.nb_nodes):
-            if not self.is_inside[index_node]:
-                interpolated_values.append(np.nan)
-            else:
-                (i, j, k), interpolator = self.point_interpolators[index_node]
-                interpolated_values.append(interpolator.dot(values[[i, j, k]]))
-        return interpolated_values
+        return self.interpolation.interpolate(values)
+
+    def operation_on_values(self, first_values, second_values):
+        """!
+        @brief Project the values of the second input and combine them with the values of the first input
+        @param first_values <numpy 2D-array>: values of the first input (ignored for a projection)
+        @param second_values <numpy 2D-array>: values of the second input, of shape (nb_var, number of nodes of B)
+        @return <numpy 2D-array>: values of shape (nb_var, nb_nodes), in a buffer overwritten by the next call
+        """
+        values = self.interpolation.interpolate(second_values, out=self.values)
+        if self.operation_type == DIFF:
+            np.subtract(first_values, values, out=values)
+        elif self.operation_type == REV_DIFF:
+            np.subtract(values, first_values, out=values)
+        elif self.operation_type == MAX_BETWEEN:
+            np.maximum(values, first_values, out=values)
+        elif self.operation_type == MIN_BETWEEN:
+            np.minimum(values, first_values, out=values)
+        return values
 
     def operation_in_frame(self, first_time_index, second_time_index):
-        if self.operation_type == PROJECT:  # projection
-            second_values = self.read_values_in_frame(second_time_index, True)
-            return np.array([self.interpolate(second_values[i]) for i in range(self.nb_var)])
-
-        if self.use_reference:
+        if self.operation_type == PROJECT or self.use_reference:
             first_values = self.first_values
         else:
-            first_values = np.array(self.read_values_in_frame(first_time_index, False))
-        second_values = self.read_values_in_frame(second_time_index, True)
-
-        if self.operation_type == DIFF:
-            return np.array([first_values[i] - np.array(self.interpolate(second_values[i]))
-                             for i in range(self.nb_var)])
-        elif self.operation_type == REV_DIFF:
-            return np.array([np.array(self.interpolate(second_values[i])) - first_values[i]
-                             for i in range(self.nb_var)])
-        elif self.operation_type == MAX_BETWEEN:
-            return np.array([np.maximum(self.interpolate(second_values[i]), first_values[i])
-                             for i in range(self.nb_var)])
+            first_values = self.read_values_in_frame(first_time_index, False)
+        return self.operation_on_values(first_values, self.read_values_in_frame(second_time_index, True))
+
+    def iter_frames(self):
+        """!
+        @brief Iterate over the output frames while the values of both inputs are read in advance
+        @return <generator>: output time and values of shape (nb_var, nb_nodes) (the values buffer is reused)
+        """
+        second_frames = self.second_in.iter_frames(self.selected_vars,
+                                                   [second_time_index for _, second_time_index in self.time_indices])
+        if self.operation_type == PROJECT or self.use_reference:
+            first_frames = ((first_time_index, self.first_values) for first_time_index, _ in self.time_indices)
         else:
-            return np.array([np.minimum(self.interpolate(second_values[i]), first_values[i])
-                             for i in range(self.nb_var)])
+            first_frames = self.first_in.iter_frames(self.selected_vars,
+                                                     [first_time_index for first_time_index, _ in self.time_indices])
+        try:
+            for (first_time_index, first_values), (second_time_index, second_values) in zip(first_frames,
+                                                                                             second_frames):
+                if self.use_reference:
+                    time = self.second_in.time[second_time_index]
+                else:
+                    time = self.first_in.time[first_time_index]
+                yield time, self.operation_on_values(first_values, second_values)
+        finally:  # stop the reading ahead of both inputs (e.g. if the iteration is interrupted)
+            first_frames.close()
+            second_frames.close()
 
     def run(self, out_stream, out_header):
-        for i, (first_time_index, second_time_index) in enumerate(self.time_indices):
-            values = self.operation_in_frame(first_time_index, second_time_index)
-            if self.use_reference:
-                out_stream.write_entire_frame(out_header,
-                                              self.second_in.time[second_time_index], values)
-            else:
-                out_stream.write_entire_frame(out_header,
-                                              self.first_in.time[first_time_index], values)
+        for time, values in self.iter_frames():
+            out_stream.write_entire_frame(out_header, time, values)
 
 
 class SynchMaxCalculator:
@@ -748,7 +826,9 @@ class SynchMaxCalculator:
         if ref_var not in selected_vars:
             self.read_ref = True
         self.nb_nodes = input_stream.header.nb_nodes
-        self.current_values = {'time': np.ones((self.nb_nodes,)) * self.input_stream.time[time_indices[0]]}
+        self.float_type = input_stream.header.compute_float_type()
+        self.current_values = {'time': np.full((self.nb_nodes,), self.input_stream.time[time_indices[0]],
+                                               dtype=self.float_type)}
 
         for var, _, _ in selected_vars:
             self.current_values[var] = self.input_stream.read_var_in_frame(time_indices[0], var)
@@ -771,12 +851,15 @@ class SynchMaxCalculator:
         self.current_values['time'] = np.where(flags, time_value, self.current_values['time'])
 
     def finishing_up(self):
-        values = np.empty((len(self.selected_vars)+1, self.nb_nodes))
+        values = np.empty((len(self.selected_vars)+1, self.nb_nodes), dtype=self.float_type)
         values[0, :] = self.current_values['time']
         for i, (var, _, _) in enumerate(self.selected_vars):
             values[i+1, :] = self.current_values[var]
         return values
 
+    def needed_var_IDs(self):
+        return [var for var, _, _ in self.selected_vars] + [self.ref_var]
+
     def run(self):
-        for time_index in self.time_indices[1:]:
+        for time_index in prefetched_time_indices(self.input_stream, self.needed_var_IDs(), self.time_indices[1:]):
             self.synch_max_in_frame(time_index)
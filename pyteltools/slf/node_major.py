@@ -0,0 +1,131 @@
+"""!
+Node-major sidecar file of a Serafin file, for fast time series extraction at some nodes.
+
+The Serafin format stores all the nodes of a frame contiguously, so reading all the frames at a single node requires
+to go through the whole file. The sidecar file stores instead, for each variable, a contiguous block of shape
+(nb_nodes, nb_frames) in little-endian with the Serafin float precision. It is written next to the Serafin file
+(with the `NODE_MAJOR_EXT` extension) and is only used while the size and modification time of the Serafin file are
+unchanged.
+"""
+
+import numpy as np
+import os
+import struct
+
+from pyteltools.conf import settings
+
+from .util import logger
+
+
+NODE_MAJOR_EXT = '.nodes'
+
+# magic, version, Serafin file size, Serafin file modification time (ns), nb_var, nb_nodes, nb_frames, float dtype
+HEADER_FMT = '<8s6q8s'
+HEADER_SIZE = struct.calcsize(HEADER_FMT)
+MAGIC = b'SLFNODES'
+VERSION = 1
+
+
+def node_major_path(filename):
+    """!
+    @brief Path to the sidecar file of a Serafin file
+    @param filename <str>: path to the Serafin file
+    @return <str>: path to the sidecar file
+    """
+    return filename + NODE_MAJOR_EXT
+
+
+def write_node_major(input_stream, iter_pbar=lambda x: x):
+    """!
+    @brief Write the sidecar file of a Serafin file in a single pass with bounded memory
+    The Serafin file is read sequentially by blocks of consecutive frames (bounded by
+    `settings.SERAFIN_READ_BLOCK_SIZE`). The values of every block are scattered at their final position in the
+    preallocated sidecar file, which is memory-mapped and flushed after each block. The file is written under a
+    temporary name and renamed once complete.
+    @param input_stream <slf.Serafin.Read>: input Serafin stream (with its header already read)
+    @param iter_pbar: iterable progress bar
+    @return <str>: path to the sidecar file
+    """
+    header = input_stream.header
+    path = node_major_path(input_stream.filename)
+    tmp_path = path + '.tmp'
+    dtype = np.dtype(header.np_float_type).newbyteorder('<')
+    stat = os.stat(input_stream.filename)
+    logger.info('Writing the node-major file: "%s"' % path)
+
+    shape = (header.nb_var, header.nb_nodes, header.nb_frames)
+    with open(tmp_path, 'wb') as f:
+        f.write(struct.pack(HEADER_FMT, MAGIC, VERSION, stat.st_size, stat.st_mtime_ns, header.nb_var,
+                            header.nb_nodes, header.nb_frames, bytes(dtype.str, 'ascii')))
+        f.truncate(HEADER_SIZE + int(np.prod(shape)) * dtype.itemsize)
+
+    if np.prod(shape) > 0:
+        block_size = max(1, settings.SERAFIN_READ_BLOCK_SIZE // (header.nb_var * header.nb_nodes * dtype.itemsize))
+        blocks = [(start, min(start + block_size, header.nb_frames))
+                  for start in range(0, header.nb_frames, block_size)]
+        values = np.empty((header.nb_var, block_size, header.nb_nodes), dtype=header.np_float_type)
+        output = np.memmap(tmp_path, dtype=dtype, mode='r+', offset=HEADER_SIZE, shape=shape)
+        try:
+            for start, end in iter_pbar(blocks):
+                block = input_stream.read_vars_in_frames(header.var_IDs, range(start, end),
+                                                         out=values[:, :end - start])
+                output[:, :, start:end] = block.transpose(0, 2, 1)
+                output.flush()
+        finally:
+            del output
+
+    os.replace(tmp_path, path)
+    return path
+
+
+class NodeMajorReader:
+    """!
+    @brief Reader of a node-major sidecar file
+    """
+    def __init__(self, path, nb_var, nb_nodes, nb_frames, dtype):
+        """!
+        @param path <str>: path to the sidecar file
+        @param nb_var <int>: number of variables
+        @param nb_nodes <int>: number of nodes
+        @param nb_frames <int>: number of frames
+        @param dtype <numpy.dtype>: stored float type
+        """
+        self.path = path
+        self.values = np.memmap(path, dtype=dtype, mode='r', offset=HEADER_SIZE,
+                                shape=(nb_var, nb_nodes, nb_frames))
+
+    @staticmethod
+    def open_if_fresh(filename, header):
+        """!
+        @brief Open the sidecar file of a Serafin file if it exists and is up to date
+        @param filename <str>: path to the Serafin file
+        @param header <slf.Serafin.SerafinHeader>: header of the Serafin file
+        @return <NodeMajorReader>: sidecar reader (None if the sidecar file is absent, outdated or empty)
+        """
+        path = node_major_path(filename)
+        try:
+            with open(path, 'rb') as f:
+                magic, version, size, mtime, nb_var, nb_nodes, nb_frames, dtype = \
+                    struct.unpack(HEADER_FMT, f.read(HEADER_SIZE))
+        except (FileNotFoundError, struct.error):
+            return None
+        stat = os.stat(filename)
+        if magic != MAGIC or version != VERSION or (size, mtime) != (stat.st_size, stat.st_mtime_ns):
+            logger.debug('Node-major file "%s" is outdated and is ignored' % path)
+            return None
+        if (nb_var, nb_nodes, nb_frames) != (header.nb_var, header.nb_nodes, header.nb_frames) or \
+                nb_var * nb_nodes * nb_frames == 0:
+            return None
+        logger.debug('Using the node-major file "%s"' % path)
+        return NodeMajorReader(path, nb_var, nb_nodes, nb_frames, np.dtype(dtype.rstrip(b'\0').decode('ascii')))
+
+    def read_nodes_time_series(self, pos_vars, node_indices, time_indices, out):
+        """!
+        @brief Read several variables at some nodes in several frames
+        @param pos_vars <[int]>: variable indices (0-based)
+        @param node_indices <numpy 1D-array>: indices of the nodes (0-based)
+        @param time_indices <numpy 1D-array>: indices of the frames (0-based)
+        @param out <numpy 3D-array>: output array of shape (number of variables, number of frames, number of nodes)
+        """
+        for i, pos_var in enumerate(pos_vars):
+            out[i] = self.values[pos_var][np.ix_(node_indices, time_indices)].T
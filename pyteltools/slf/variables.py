@@ -4,6 +4,8 @@ API for computing additional variables
 
 import numpy as np
 
+from pyteltools.conf import settings
+
 from .variable.variables_2d import get_available_2d_variables, get_necessary_2d_equations, \
     get_US_equation, new_variables_from_US
 # Beware: `get_US_equation` and `new_variables_from_US` are imported indirectly
@@ -35,7 +37,10 @@ def do_calculations_in_frame(equations, input_serafin, time_index, selected_outp
     @param is_2d <bool>: True if input data is 2D
     @param us_equation <slf.variables_utils.Equation>: user-specified friction law equation
     @return <numpy.ndarray>: the values of the selected output variables
+    In native precision mode (see `settings.SERAFIN_NATIVE_PRECISION`), the computed variables are kept in the input
+    float type instead of being upcast by the equations constants or operators.
     """
+    native_float_type = input_serafin.header.np_float_type if settings.SERAFIN_NATIVE_PRECISION else None
     computed_values = {}
     for equation in equations:
         input_var_IDs = list(map(lambda x: x.ID(), equation.input))
@@ -58,6 +63,8 @@ def do_calculations_in_frame(equations, input_serafin, time_index, selected_outp
 
         # handle the normal case
         output_values = do_calculation(equation, [computed_values[var_ID] for var_ID in input_var_IDs])
+        if native_float_type is not None:
+            output_values = output_values.astype(native_float_type, copy=False)
         computed_values[equation.output.ID()] = output_values
 
     # reconstruct the output values array in the order of the selected IDs
@@ -39,12 +39,11 @@ class TruncatedTriangularPrisms(Mesh2D):
         @param polygon <geom.geometry.Polyline>: A polygon
         @return <numpy.1D-array>: The weight carried by the triangle nodes
         """
-        potential_elements = self.get_intersecting_elements(polygon.bounds())
+        potential_elements = self.get_intersecting_element_indices(polygon.bounds())
         weight = np.zeros((self.nb_points,), dtype=np.float64)
-        for i, j, k in potential_elements:
-            t = self.triangles[i, j, k]
-            if polygon.contains(t):
-                weight[[i, j, k]] += t.area
+        for element in potential_elements:
+            if polygon.contains(self.triangle(element)):
+                weight[self.ikle[element]] += self.areas[element]
         return weight / 3.0
 
     def polygon_intersection(self, polygon):
@@ -53,18 +52,19 @@ class TruncatedTriangularPrisms(Mesh2D):
         @param polygon <geom.geometry.Polyline>: A polygon
         @return <numpy.1D-array, dict>: The weight carried by the triangle nodes, and the dictionary of tuple (area, centroid value) for boundary triangles
         """
-        potential_elements = self.get_intersecting_elements(polygon.bounds())
+        potential_elements = self.get_intersecting_element_indices(polygon.bounds())
         weight = np.zeros((self.nb_points,), dtype=np.float64)
         triangle_polygon_intersection = {}
-        for i, j, k in potential_elements:
-            t = self.triangles[i, j, k]
+        for element in potential_elements:
+            t = self.triangle(element)
+            i, j, k = self.ikle[element]
             if polygon.contains(t):
-                weight[[i, j, k]] += t.area
+                weight[[i, j, k]] += self.areas[element]
             else:
                 is_intersected, intersection = polygon.polygon_intersection(t)
                 if is_intersected:
                     centroid = intersection.centroid
-                    interpolator = Interpolator(t).get_interpolator_at(centroid.x, centroid.y)
+                    interpolator = self.barycentric_coordinates(element, centroid.x, centroid.y)
                     triangle_polygon_intersection[i, j, k] = (intersection.area, interpolator)
         return weight / 3.0, triangle_polygon_intersection
 
@@ -74,25 +74,24 @@ class TruncatedTriangularPrisms(Mesh2D):
         @param polygon <geom.geometry.Polyline>: A polygon
         @return <dict, dict>: The dictionaries of all triangles contained in polygon, and of tuples (base triangle, intersection) for boundary triangles
         """
-        potential_elements = self.get_intersecting_elements(polygon.bounds())
+        potential_elements = self.get_intersecting_element_indices(polygon.bounds())
         weight = np.zeros((self.nb_points,), dtype=np.float64)
         triangles = {}
         triangle_polygon_net_intersection = {}
         triangle_polygon_intersection = {}
-        for i, j, k in potential_elements:
-            t = self.triangles[i, j, k]
+        for element in potential_elements:
+            t = self.triangle(element)
+            i, j, k = self.ikle[element]
+            area = self.areas[element]
+            vertices = tuple(np.asarray(self.points[[i, j, k]], dtype=np.float64))
             if polygon.contains(t):
-                area = t.area
-                vertices = tuple(map(np.array, list(t.exterior.coords)[:-1]))
                 triangles[i, j, k] = (vertices, area)
                 weight[[i, j, k]] += area
             else:
                 is_intersected, intersection = polygon.polygon_intersection(t)
                 if is_intersected:
-                    vertices = tuple(map(np.array, list(t.exterior.coords)[:-1]))
-                    area = t.area
                     centroid = intersection.centroid
-                    interpolator = Interpolator(t).get_interpolator_at(centroid.x, centroid.y)
+                    interpolator = self.barycentric_coordinates(element, centroid.x, centroid.y)
                     triangle_polygon_net_intersection[i, j, k] = (intersection.area, interpolator)
                     triangle_polygon_intersection[i, j, k] = (vertices, area, intersection)
         return weight / 3.0, triangle_polygon_net_intersection, triangles, triangle_polygon_intersection
@@ -224,8 +223,8 @@ class VolumeCalculator:
         if self.second_var_ID == VolumeCalculator.INIT_VALUE:
             self.init_values = input_stream.read_var_in_frame(0, self.var_ID)
 
-    def construct_triangles(self, iter_pbar=lambda *args: args):
-        self.mesh = TruncatedTriangularPrisms(self.input_stream.header, True, iter_pbar)
+    def construct_triangles(self):
+        self.mesh = TruncatedTriangularPrisms(self.input_stream.header, True)
 
     def construct_weights(self, iter_pbar=lambda iter, unit: iter):
         """!
@@ -280,10 +279,10 @@ class VolumeCalculator:
         values = self.input_stream.read_var_in_frame(time_index, self.var_ID)
         if self.second_var_ID is not None:
             if self.second_var_ID == VolumeCalculator.INIT_VALUE:
-                values -= self.init_values
+                values = values - self.init_values
             else:
                 second_values = self.input_stream.read_var_in_frame(time_index, self.second_var_ID)
-                values -= second_values
+                values = values - second_values
         return values
 
     def run(self, fmt_float=settings.FMT_FLOAT):
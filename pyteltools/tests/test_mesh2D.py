@@ -0,0 +1,174 @@
+"""!
+Unittest for slf.mesh2D module
+"""
+
+import numpy as np
+import os
+import tempfile
+import unittest
+
+from pyteltools.slf import Serafin
+from pyteltools.slf.interpolation import InterpolationMatrix, Interpolator, MeshInterpolator
+from pyteltools.slf.mesh2D import GridIndex, Mesh2D
+from pyteltools.slf.misc import DIFF, MAX_BETWEEN, PROJECT, ProjectMeshCalculator
+from pyteltools.tests.test_serafin import write_dummy_slf
+
+
+class Mesh2DTestCase(unittest.TestCase):
+    def setUp(self):
+        folder = tempfile.TemporaryDirectory()
+        path = os.path.join(folder.name, 'dummy.slf')
+        write_dummy_slf(path)
+        with Serafin.Read(path, 'fr') as resin:
+            resin.read_header()
+            self.header = resin.header
+            self.mesh = Mesh2D(resin.header, True)
+        folder.cleanup()
+
+    def test_element_arrays(self):
+        self.assertTrue(np.array_equal(self.mesh.bboxes, [[0, 0, 3, 6], [3, 0, 6, 6], [0, 0, 6, 2]]))
+        self.assertTrue(np.allclose(self.mesh.areas, [6, 6, 6]))
+        self.assertTrue(np.allclose(self.mesh.centroids, [[2, 8/3], [4, 8/3], [3, 2/3]]))
+        for index, (i, j, k) in enumerate(self.mesh.ikle):
+            t = self.mesh.triangles[i, j, k]
+            self.assertAlmostEqual(t.area, self.mesh.areas[index])
+            self.assertTrue(self.mesh.triangle(index).equals(t))
+            self.assertTrue(np.allclose(self.mesh.barycentric_coordinates(index, 2.5, 1.5),
+                                        Interpolator(t).get_interpolator_at(2.5, 1.5)))
+        self.assertEqual(list(self.mesh.triangles), [tuple(nodes) for nodes in self.mesh.ikle])
+
+    def test_intersecting_elements(self):
+        self.assertEqual(sorted(self.mesh.get_intersecting_element_indices((4, 3, 5, 4))), [1])
+        self.assertEqual(sorted(self.mesh.get_intersecting_element_indices((2.5, 1, 3.5, 1.5))), [0, 1, 2])
+        self.assertEqual(self.mesh.get_intersecting_elements((4, 3, 5, 4)), [(0, 3, 2)])
+
+    def test_build_index_progress(self):
+        mesh = Mesh2D(self.header, False)
+        processed = []
+
+        def iter_pbar(elements):
+            for index in elements:
+                processed.append(index)
+                yield index
+        mesh.build_index(iter_pbar)
+        self.assertEqual(processed, [0, 1, 2])
+        self.assertEqual(sorted(mesh.get_intersecting_element_indices((2.5, 1, 3.5, 1.5))), [0, 1, 2])
+
+        # interrupted construction
+        mesh.build_index(lambda elements: iter(()))
+        self.assertEqual(len(mesh.get_intersecting_element_indices((2.5, 1, 3.5, 1.5))), 0)
+
+    def test_locate_points(self):
+        points = np.array([[2.5, 1.5], [3., 6.], [4., 3.], [10., 10.], [3., 1.], [1., 5.]])
+        elements, coordinates = self.mesh.locate_points(points, chunk_size=4)
+        self.assertTrue(np.array_equal(elements[[0, 2, 3, 4, 5]], [2, 1, -1, 2, -1]))
+        self.assertIn(elements[1], [0, 1])  # shared node
+        for point, element, point_coordinates in zip(points, elements, coordinates):
+            if element >= 0:
+                self.assertTrue(np.array_equal(point_coordinates, self.mesh.barycentric_coordinates(element, *point)))
+                nodes = self.mesh.ikle[element]
+                self.assertTrue(np.allclose(point_coordinates.dot(self.mesh.points[nodes]), point))
+            else:
+                self.assertTrue(np.array_equal(point_coordinates, [0, 0, 0]))
+
+    def test_locate_points_degenerate(self):
+        header = self.header.copy()
+        header.x, header.y = np.append(header.x, 1.5), np.append(header.y, 3.)  # middle of the edge (1, 2)
+        header.ikle_2d = np.vstack([header.ikle_2d, [1, 5, 2]])  # zero-area element
+        header.nb_nodes_2d += 1
+        mesh = Mesh2D(header, False)
+        with np.errstate(divide='raise', invalid='raise'):
+            elements, coordinates = mesh.locate_points(np.array([[1.5, 3.], [2.5, 1.5], [0.5, 5.]]))
+        self.assertIn(elements[0], [0, 1])
+        self.assertTrue(np.array_equal(elements[1:], [2, -1]))
+        self.assertTrue(np.allclose(coordinates[0].dot(mesh.points[mesh.ikle[elements[0]]]), [1.5, 3.]))
+
+    def test_interpolation_matrix(self):
+        mesh = MeshInterpolator(self.header, False)
+        points = np.array([[2.5, 1.5], [10., 10.], [4., 3.]])
+        values = np.arange(2 * mesh.nb_points, dtype=np.float32).reshape(2, -1) ** 2
+        elements, coordinates = mesh.locate_points(points)
+        interpolation = mesh.get_interpolation_matrix(points)
+        interpolated = interpolation.interpolate(values)
+        self.assertEqual(interpolated.shape, (2, 3))
+        self.assertEqual(interpolated.dtype, np.float32)
+        self.assertEqual(interpolation.interpolate(values.astype(np.int64)).dtype, np.float64)
+        self.assertTrue(np.all(np.isnan(interpolated[:, 1])))
+        for index_point in (0, 2):
+            nodes = mesh.ikle[elements[index_point]]
+            self.assertTrue(np.allclose(interpolated[:, index_point], values[:, nodes].dot(coordinates[index_point])))
+
+        is_inside, point_interpolators = mesh.get_point_interpolators(points)
+        self.assertEqual(is_inside, interpolation.is_inside.tolist())
+        other = InterpolationMatrix.from_point_interpolators(point_interpolators, mesh.nb_points)
+        self.assertTrue(np.allclose(other.interpolate(values), interpolated, equal_nan=True))
+
+        nodes = interpolation.used_nodes()
+        local_interpolation = interpolation.select_nodes(nodes)
+        frames = np.stack([values, 2 * values], axis=1)[:, :, nodes]
+        self.assertTrue(np.allclose(local_interpolation.interpolate(frames)[:, 1, :], 2 * interpolated,
+                                    equal_nan=True))
+
+    def test_project_mesh(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, 'dummy.slf')
+            times, values = write_dummy_slf(path)
+            with Serafin.Read(path, 'fr') as first_in, Serafin.Read(path, 'fr') as second_in:
+                first_in.read_header()
+                first_in.get_time()
+                second_in.read_header()
+                second_in.get_time()
+                mesh = MeshInterpolator(second_in.header, False)
+                is_inside, point_interpolators = mesh.get_point_interpolators(list(zip(first_in.header.x,
+                                                                                       first_in.header.y)))
+                var_IDs = first_in.header.var_IDs[:2]
+                time_indices = [(0, 4), (2, 1), (4, 0)]
+
+                for operation_type, use_reference in [(PROJECT, False), (DIFF, False), (MAX_BETWEEN, True)]:
+                    calculator = ProjectMeshCalculator(first_in, second_in, var_IDs, is_inside, point_interpolators,
+                                                       time_indices, operation_type, use_reference)
+                    for (time, result), (first_time_index, second_time_index) in zip(calculator.iter_frames(),
+                                                                                      time_indices):
+                        second_values = values[second_time_index, :2]
+                        self.assertEqual(time, times[second_time_index if use_reference else first_time_index])
+                        if operation_type == PROJECT:
+                            expected = second_values
+                        elif operation_type == DIFF:
+                            expected = values[first_time_index, :2] - second_values
+                        else:
+                            expected = np.maximum(second_values, values[0, :2])
+                        self.assertTrue(np.allclose(result, expected, atol=1e-6))
+                        result = result.copy()  # the values buffer is reused
+                        self.assertTrue(np.array_equal(calculator.operation_in_frame(first_time_index,
+                                                                                     second_time_index), result))
+
+                # interrupted iteration
+                calculator = ProjectMeshCalculator(first_in, second_in, var_IDs, is_inside, point_interpolators,
+                                                   time_indices, DIFF, False)
+                frames = calculator.iter_frames()
+                next(frames)
+                self.assertIsNotNone(second_in._prefetched.frame)
+                frames.close()
+                self.assertIsNone(first_in._prefetched.frame)
+                self.assertIsNone(second_in._prefetched.frame)
+
+    def test_grid_index(self):
+        random = np.random.RandomState(0)
+        corners = random.uniform(0, 100, (500, 2))
+        bboxes = np.hstack([corners, corners + random.uniform(0, 5, (500, 2))])
+        index = GridIndex(bboxes)
+        for left, bottom in random.uniform(-10, 110, (50, 2)):
+            right, top = left + random.uniform(0, 20), bottom + random.uniform(0, 20)
+            expected = np.flatnonzero((bboxes[:, 0] <= right) & (bboxes[:, 2] >= left)
+                                      & (bboxes[:, 1] <= top) & (bboxes[:, 3] >= bottom))
+            self.assertTrue(np.array_equal(index.intersection((left, bottom, right, top)), expected))
+        self.assertEqual(len(GridIndex(np.empty((0, 4))).intersection((0, 0, 1, 1))), 0)
+        mins = random.uniform(-10, 110, (50, 2))
+        maxs = mins + random.uniform(0, 20, (50, 2))
+        ids, counts = index.intersection_v(mins, maxs)
+        self.assertTrue(np.array_equal(np.split(ids, np.cumsum(counts)[:-1])[7],
+                                       index.intersection(tuple(mins[7]) + tuple(maxs[7]))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,623 @@
+"""!
+Unittest for slf.Serafin module
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+from pyteltools.conf import settings
+from pyteltools.slf import Serafin
+from pyteltools.slf.archive import ArchiveRead, ArchiveWrite
+from pyteltools.slf.frame_cache import FRAME_CACHE
+from pyteltools.slf.misc import ArrivalDurationCalculator, Condition, MAX, MEAN, ScalarMaxMinMeanCalculator, \
+    SynchMaxCalculator
+from pyteltools.slf.node_major import write_node_major
+
+
+def write_dummy_slf(path, endian='>', float_type='f', nb_planes=0, nb_frames=5):
+    """!
+    @brief Write a small Serafin file with plain struct calls (independent reference encoder)
+    @return <(numpy 1D-array, numpy 3D-array)>: written times and values of shape (nb_frames, nb_var, nb_nodes)
+    """
+    x_2d, y_2d = np.array([3., 0., 6., 3.]), np.array([6., 0., 0., 2.])
+    ikle_2d = np.array([[1, 2, 4], [1, 4, 3], [2, 3, 4]])
+    if nb_planes == 0:
+        x, y, ikle = x_2d, y_2d, ikle_2d.flatten()
+        nb_nodes_per_elem = 3
+    else:
+        nb_nodes_2d = len(x_2d)
+        x, y = np.tile(x_2d, nb_planes), np.tile(y_2d, nb_planes)
+        ikle = []
+        for iplan in range(nb_planes - 1):
+            for elem in ikle_2d:
+                lower = elem + iplan * nb_nodes_2d
+                ikle.extend(list(lower) + list(lower + nb_nodes_2d))
+        nb_nodes_per_elem = 6
+    nb_nodes, nb_elements = len(x), len(ikle) // nb_nodes_per_elem
+    var_names = ['VITESSE U', 'VITESSE V', 'COTE Z'] if nb_planes else ['VITESSE U', 'VITESSE V', "HAUTEUR D'EAU"]
+    nb_var = len(var_names)
+    params = [1, 0, 0, 0, 0, 0, nb_planes, 0, 0, 0]
+
+    def record(fmt, *values):
+        data = struct.pack(endian + fmt, *values)
+        marker = struct.pack(endian + 'i', len(data))
+        return marker + data + marker
+
+    times = np.arange(nb_frames, dtype=np.float64) * 10.
+    values = np.random.RandomState(0).uniform(-3, 3, (nb_frames, nb_var, nb_nodes))
+    with open(path, 'wb') as f:
+        title = bytes('DUMMY SERAFIN', Serafin.SLF_EIT).ljust(72)
+        file_type = bytes('SERAFIN ' if float_type == 'f' else 'SERAFIND', Serafin.SLF_EIT)
+        f.write(record('80s', title + file_type))
+        f.write(record('2i', nb_var, 0))
+        for name in var_names:
+            f.write(record('32s', bytes(name, Serafin.SLF_EIT).ljust(16) + b'M/S'.ljust(16)))
+        f.write(record('10i', *params))
+        f.write(record('4i', nb_elements, nb_nodes, nb_nodes_per_elem, 1))
+        f.write(record('%ii' % len(ikle), *ikle))
+        f.write(record('%ii' % nb_nodes, *([0] * nb_nodes)))
+        f.write(record('%i%s' % (nb_nodes, float_type), *x))
+        f.write(record('%i%s' % (nb_nodes, float_type), *y))
+        for time, frame_values in zip(times, values):
+            f.write(record(float_type, time))
+            for var_values in frame_values:
+                f.write(record('%i%s' % (nb_nodes, float_type), *var_values))
+    return times, values.astype(np.float32 if float_type == 'f' else np.float64)
+
+
+class SerafinTestCase(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, 'dummy.slf')
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_memmap_read(self):
+        for endian in ('>', '<'):
+            for float_type in ('f', 'd'):
+                _, values = write_dummy_slf(self.path, endian, float_type)
+                with Serafin.Read(self.path, 'fr', use_memmap=True) as resin:
+                    resin.read_header()
+                    self.assertEqual(resin.values.shape, values.shape)
+                    for time_index in range(values.shape[0]):
+                        for pos_var, var_ID in enumerate(resin.header.var_IDs):
+                            var_values = resin.read_var_in_frame(time_index, var_ID)
+                            self.assertFalse(var_values.flags.writeable)
+                            self.assertTrue(np.array_equal(var_values, values[time_index, pos_var]))
+                os.remove(self.path)
+
+    def test_memmap_read_3d(self):
+        _, values = write_dummy_slf(self.path, nb_planes=3)
+        with Serafin.Read(self.path, 'fr') as resin, Serafin.Read(self.path, 'fr', use_memmap=True) as resin_map:
+            resin.read_header()
+            resin_map.read_header()
+            for time_index in range(values.shape[0]):
+                self.assertTrue(np.array_equal(resin.read_var_in_frame_as_3d(time_index, 'Z'),
+                                               resin_map.read_var_in_frame_as_3d(time_index, 'Z')))
+
+    def test_read_at_layers(self):
+        _, values = write_dummy_slf(self.path, nb_planes=3)
+        with Serafin.Read(self.path, 'fr') as resin, Serafin.Read(self.path, 'fr', use_memmap=True) as resin_map:
+            resin.read_header()
+            resin_map.read_header()
+            for time_index in range(values.shape[0]):
+                planes = values[time_index, 1].reshape(3, 4)
+                for reader in (resin, resin_map):
+                    self.assertTrue(np.array_equal(reader.read_var_in_frame_at_layer(time_index, 'V', 1), planes[0]))
+                    self.assertTrue(np.array_equal(reader.read_var_in_frame_at_layer(time_index, 'V', 3), planes[2]))
+                    self.assertTrue(np.array_equal(reader.read_var_in_frame_at_layers(time_index, 'V', 2, 3),
+                                                   planes[1:]))
+            with self.assertRaises(Serafin.SerafinRequestError):
+                resin.read_var_in_frame_at_layer(0, 'V', 4)
+            layer_stream = Serafin.LayerRead(resin, 2)
+            self.assertEqual(layer_stream.header.nb_nodes, 4)
+            self.assertTrue(np.array_equal(layer_stream.read_var_in_frame(4, 'Z'), values[4, 2, 4:8]))
+
+    def test_archive(self):
+        archive_path = os.path.join(self.folder.name, 'dummy.slz')
+        for endian, float_type in (('>', 'f'), ('<', 'd')):
+            times, values = write_dummy_slf(self.path, endian, float_type, nb_frames=7)
+            for codec, shuffle, delta in (('zlib', True, True), ('lzma', False, True), ('zlib', True, False)):
+                with Serafin.Read(self.path, 'fr') as resin:
+                    resin.read_header()
+                    resin.get_time()
+                    with ArchiveWrite(archive_path, 'fr', overwrite=True, codec=codec, shuffle=shuffle, delta=delta,
+                                      keyframe_interval=3) as resout:
+                        resout.write_header(resin.header)
+                        for time_index, frame_values in resin.iter_frames(resin.header.var_IDs, range(7)):
+                            resout.write_entire_frame(resin.header, resin.time[time_index], frame_values)
+                with ArchiveRead(archive_path, 'fr') as resin:
+                    resin.read_header()
+                    self.assertEqual((resin.header.nb_frames, resin.header.float_type), (7, float_type))
+                    self.assertTrue(np.array_equal(resin.get_time(), times))
+                    self.assertTrue(np.array_equal(resin.header.x, [3., 0., 6., 3.]))
+                    for time_index in (5, 0, 3, 6):
+                        self.assertTrue(np.array_equal(resin.read_var_in_frame(time_index, 'V'),
+                                                       values[time_index, 1]))
+                    self.assertTrue(np.array_equal(resin.read_vars_in_frames(['H', 'U'], [4, 1]),
+                                                   values[[4, 1]][:, [2, 0]].transpose(1, 0, 2)))
+                    self.assertTrue(np.array_equal(resin.read_nodes_time_series(['U'], [3, 0], range(7))[0],
+                                                   values[:, 0, [3, 0]]))
+                    for time_index, frame_values in resin.iter_frames(['U', 'H'], [6, 2]):
+                        self.assertTrue(np.array_equal(frame_values, values[time_index, [0, 2]]))
+                    chunk = int(resin.offsets[0])
+
+        with open(archive_path, 'r+b') as f:  # corrupt the first chunk
+            f.seek(chunk)
+            f.write(b'\xff' * 4)
+        with ArchiveRead(archive_path, 'fr') as resin:
+            resin.read_header()
+            with self.assertRaises(Serafin.SerafinValidationError):
+                resin.read_var_in_frame(0, 'U')
+        with self.assertRaises(Serafin.SerafinRequestError):
+            ArchiveWrite(archive_path, 'fr', codec='bz2')
+
+    def test_archive_3d(self):
+        archive_path = os.path.join(self.folder.name, 'dummy.slz')
+        _, values = write_dummy_slf(self.path, nb_planes=3, nb_frames=6)
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            resin.get_time()
+            with ArchiveWrite(archive_path, 'fr', overwrite=True, keyframe_interval=3) as resout:
+                resout.write_header(resin.header)
+                for time_index, frame_values in resin.iter_frames(resin.header.var_IDs, range(6)):
+                    resout.write_entire_frame(resin.header, resin.time[time_index], frame_values)
+        with ArchiveRead(archive_path, 'fr') as resin:
+            resin.read_header()
+            read_chunk = resin._read_chunk
+            with mock.patch.object(resin, '_read_chunk', side_effect=read_chunk) as counter:
+                for time_index in range(6):  # each key frame chunk is decompressed once
+                    self.assertTrue(np.array_equal(resin.read_var_in_frame(time_index, 'Z'), values[time_index, 2]))
+                self.assertEqual(counter.call_count, 6)
+            self.assertTrue(np.array_equal(resin.read_var_in_frame_at_layers(4, 'U', 2, 3),
+                                           values[4, 0].reshape(3, 4)[1:3]))
+            self.assertTrue(np.array_equal(resin.read_var_in_frame_at_layer(1, 'V', 1), values[1, 1, :4]))
+            with self.assertRaises(Serafin.SerafinRequestError):
+                resin.read_var_in_frame_at_layers(0, 'U', 3, 2)
+
+    def test_native_precision(self):
+        _, values = write_dummy_slf(self.path, nb_frames=20)
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            for native, float_type in ((False, np.float64), (True, np.float32)):
+                settings.SERAFIN_NATIVE_PRECISION = native
+                try:
+                    maximum = ScalarMaxMinMeanCalculator(MAX, resin, [('H', '', ''), ('U', '', '')], range(20))
+                    mean = ScalarMaxMinMeanCalculator(MEAN, resin, [('H', '', '')], range(20))
+                    maximum.run()
+                    mean.run()
+                    resin.get_time()
+                    synch_max = SynchMaxCalculator(resin, [('U', '', '')], range(20), 'H')
+                    synch_max.run()
+                    arrival = ArrivalDurationCalculator(resin, range(20), Condition(['[H]'], ['H'], '>', 0.))
+                    arrival.run()
+                finally:
+                    settings.SERAFIN_NATIVE_PRECISION = False
+                self.assertEqual(synch_max.finishing_up().dtype, float_type)
+                self.assertTrue(np.array_equal(synch_max.finishing_up()[1],
+                                               values[values[:, 2].argmax(axis=0), 0, range(4)]))
+                self.assertEqual((arrival.arrival.dtype, arrival.duration.dtype), (np.float64, np.float64))
+                self.assertEqual(arrival.finishing_up().dtype, float_type)
+                self.assertEqual(maximum.finishing_up().dtype, float_type)
+                self.assertTrue(np.array_equal(maximum.finishing_up(), values[:, [2, 0]].max(axis=0)))
+                self.assertEqual(mean.finishing_up().dtype, float_type)
+                self.assertTrue(np.allclose(mean.finishing_up()[0], values[:, 2].astype(np.float64).mean(axis=0),
+                                            rtol=1e-6))
+
+    def test_read_header(self):
+        for endian in ('>', '<'):
+            write_dummy_slf(self.path, endian, 'd')
+            with Serafin.Read(self.path, 'fr') as resin:
+                resin.read_header()
+                header = resin.header
+                self.assertEqual(header.nb_frames, 5)
+                self.assertEqual(header.var_IDs, ['U', 'V', 'H'])
+                self.assertTrue(np.array_equal(header.ikle, [1, 2, 4, 1, 4, 3, 2, 3, 4]))
+                self.assertTrue(np.array_equal(header.x, [3., 0., 6., 3.]))
+                self.assertTrue(np.array_equal(header.y, [6., 0., 0., 2.]))
+                self.assertEqual(header.x.dtype, np.float64)
+            os.remove(self.path)
+
+    def test_read_header_3d(self):
+        write_dummy_slf(self.path, nb_planes=3)
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            header = resin.header
+            self.assertEqual(header.nb_elements, 6)
+            self.assertTrue(np.array_equal(header.ikle_2d, [[1, 2, 4], [1, 4, 3], [2, 3, 4]]))
+            header_2d = header.copy_as_2d()
+            self.assertTrue(np.array_equal(header_2d.ikle, [1, 2, 4, 1, 4, 3, 2, 3, 4]))
+            self.assertEqual(header_2d.nb_nodes, 4)
+
+    def test_write_identical(self):
+        out_path = os.path.join(self.folder.name, 'out.slf')
+        for endian in ('>', '<'):
+            for float_type in ('f', 'd'):
+                for nb_planes in (0, 3):
+                    write_dummy_slf(self.path, endian, float_type, nb_planes)
+                    with Serafin.Read(self.path, 'fr') as resin:
+                        resin.read_header()
+                        resin.get_time()
+                        with Serafin.Write(out_path, 'fr', overwrite=True) as resout:
+                            resout.write_header(resin.header)
+                            for time_index, time in enumerate(resin.time):
+                                values = np.vstack([resin.read_var_in_frame(time_index, var_ID)
+                                                    for var_ID in resin.header.var_IDs])
+                                resout.write_entire_frame(resin.header, time, values)
+                    with open(self.path, 'rb') as f_in, open(out_path, 'rb') as f_out:
+                        self.assertEqual(f_in.read(), f_out.read())
+
+    def test_async_write(self):
+        times, values = write_dummy_slf(self.path)
+        out_path = os.path.join(self.folder.name, 'out.slf')
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            resin.get_time()
+            with Serafin.Write(out_path, 'fr', async_write=True) as resout:
+                resout.write_header(resin.header)
+                frame_values = np.empty((resin.header.nb_var, resin.header.nb_nodes))
+                for time_index, time in enumerate(resin.time):
+                    frame_values[...] = values[time_index]  # buffer is reused immediately
+                    resout.write_entire_frame(resin.header, time, frame_values)
+        with open(self.path, 'rb') as f, open(out_path, 'rb') as g:
+            self.assertEqual(f.read(), g.read())
+
+    def test_async_write_error(self):
+        write_dummy_slf(self.path)
+        out_path = os.path.join(self.folder.name, 'out.slf')
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            resout = Serafin.Write(out_path, 'fr', async_write=True)
+            with self.assertRaises(ValueError):
+                with resout:
+                    resout.write_header(resin.header)
+                    resout.file.close()  # the writer thread fails on the next frame
+                    resout.write_entire_frame(resin.header, 0.0, np.zeros((resin.header.nb_var,
+                                                                           resin.header.nb_nodes)))
+            self.assertIsNone(resout._writer)
+
+    def test_copy_frames(self):
+        for float_type in ('f', 'd'):
+            times, values = write_dummy_slf(self.path, float_type=float_type)
+            for toggle_endianness in (False, True):
+                out_path = os.path.join(self.folder.name, 'out.slf')
+                with Serafin.Read(self.path, 'fr') as resin:
+                    resin.read_header()
+                    resin.get_time()
+                    output_header = resin.header.copy()
+                    output_header.set_variables([(var_ID, resin.header.var_names[i], resin.header.var_units[i])
+                                                 for i, var_ID in [(2, 'H'), (0, 'U')]])
+                    if toggle_endianness:
+                        output_header.toggle_endianness()
+                    with Serafin.Write(out_path, 'fr', overwrite=True) as resout:
+                        resout.write_header(output_header)
+                        resout.copy_frames(output_header, resin, [0, 3, 4])
+                with Serafin.Read(out_path, 'fr') as resin:
+                    resin.read_header()
+                    self.assertEqual(resin.header.endian, '<' if toggle_endianness else '>')
+                    self.assertTrue(np.array_equal(resin.get_time(), times[[0, 3, 4]]))
+                    self.assertTrue(np.array_equal(resin.read_vars_in_frames(['U', 'H'], range(3)),
+                                                   values[[0, 3, 4]][:, [0, 2]].transpose(1, 0, 2)))
+
+    def test_copy_bytes_fallback(self):
+        write_dummy_slf(self.path)
+        out_path = os.path.join(self.folder.name, 'out.bin')
+
+        def unsupported(*args):
+            raise OSError('unsupported')
+        with mock.patch('os.copy_file_range', unsupported, create=True), \
+                mock.patch('os.sendfile', unsupported, create=True):
+            with Serafin.Read(self.path, 'fr') as resin, open(out_path, 'wb') as f:
+                resin.read_header()
+                Serafin.copy_bytes(resin, f, 10, 100)
+        with open(self.path, 'rb') as f:
+            f.seek(10)
+            expected = f.read(100)
+        with open(out_path, 'rb') as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_append(self):
+        times, values = write_dummy_slf(self.path)
+        out_path = os.path.join(self.folder.name, 'out.slf')
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            resin.get_time()
+            header = resin.header.copy()
+            with Serafin.Write(out_path, 'fr') as resout:
+                resout.write_header(header)
+                for time_index in range(3):
+                    resout.write_entire_frame(header, times[time_index], values[time_index])
+                resout.file.write(b'\0' * 10)  # incomplete trailing frame
+            with Serafin.Write(out_path, 'fr', append=True) as resout:
+                resout.write_header(header)
+                self.assertEqual(resout.existing_header.nb_frames, 3)
+                for time_index in range(3, 5):
+                    resout.write_entire_frame(header, times[time_index], values[time_index])
+            with open(self.path, 'rb') as f, open(out_path, 'rb') as g:
+                self.assertEqual(f.read(), g.read())
+
+            with self.assertRaises(Serafin.SerafinRequestError):  # the header would be overwritten
+                with Serafin.Write(out_path, 'fr', append=True) as resout:
+                    resout.write_entire_frame(header, times[0], values[0])
+            with open(self.path, 'rb') as f, open(out_path, 'rb') as g:
+                self.assertEqual(f.read(), g.read())
+
+            header.set_variables([(header.var_IDs[0], header.var_names[0], header.var_units[0])])
+            with self.assertRaises(Serafin.SerafinRequestError):
+                with Serafin.Write(out_path, 'fr', append=True) as resout:
+                    resout.write_header(header)
+        with self.assertRaises(Serafin.SerafinRequestError):
+            with Serafin.Write(os.path.join(self.folder.name, 'missing.slf'), 'fr', append=True):
+                pass
+
+    def test_live(self):
+        times, values = write_dummy_slf(self.path)
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            header_size, frame_size = resin.header.header_size, resin.header.frame_size
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        with open(self.path, 'wb') as f:
+            f.write(content[:header_size + 2 * frame_size + 10])  # incomplete third frame
+
+        with Serafin.Read(self.path, 'fr', live=True) as resin:
+            resin.read_header()
+            resin.get_time()
+            self.assertEqual(resin.header.nb_frames, 2)
+            calculator = ScalarMaxMinMeanCalculator(MAX, resin, [('H', '', '')], [0, 1])
+            calculator.run()
+            with open(self.path, 'ab') as f:
+                f.write(content[header_size + 2 * frame_size + 10:])
+            self.assertEqual(list(calculator.follow(poll_interval=0, timeout=0)), [2, 3, 4])
+            self.assertEqual(resin.time, times.tolist())
+            self.assertTrue(np.array_equal(calculator.finishing_up()[0], values[:, 2].max(axis=0)))
+
+    def test_multi_read(self):
+        times, values = write_dummy_slf(self.path)
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            header_size, frame_size = resin.header.header_size, resin.header.frame_size
+        with open(self.path, 'rb') as f:
+            content = f.read()
+        paths = [os.path.join(self.folder.name, 'run%i.slf' % i) for i in range(2)]
+        for path, (first, last) in zip(paths, [(0, 3), (2, 5)]):  # frame 2 is in both files
+            with open(path, 'wb') as f:
+                f.write(content[:header_size])
+                f.write(content[header_size + first * frame_size:header_size + last * frame_size])
+
+        with Serafin.MultiRead(paths, 'fr') as resin:
+            resin.read_header()
+            self.assertEqual(resin.header.nb_frames, 5)
+            self.assertTrue(np.array_equal(resin.get_time(), times))
+            self.assertTrue(np.array_equal(resin.read_var_in_frame(3, 'V'), values[3, 1]))
+            self.assertTrue(np.array_equal(resin.read_vars_in_frames(['H', 'U'], [4, 1, 2]),
+                                           values[[4, 1, 2]][:, [2, 0]].transpose(1, 0, 2)))
+            self.assertTrue(np.array_equal(resin.read_nodes_time_series(['V'], [3, 0], range(5))[0],
+                                           values[:, 1][:, [3, 0]]))
+            calculator = ScalarMaxMinMeanCalculator(MAX, resin, [('H', '', '')], range(5))
+            calculator.run()
+            self.assertTrue(np.array_equal(calculator.finishing_up()[0], values[:, 2].max(axis=0)))
+
+    def test_concurrent_reads(self):
+        _, values = write_dummy_slf(self.path, nb_frames=20)
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            requests = [(time_index, var_ID) for time_index in range(20) for var_ID in resin.header.var_IDs] * 5
+            with ThreadPoolExecutor(8) as executor:
+                results = list(executor.map(lambda request: resin.read_var_in_frame(*request), requests))
+            for (time_index, var_ID), var_values in zip(requests, results):
+                self.assertTrue(np.array_equal(var_values, values[time_index, resin.header.var_IDs.index(var_ID)]))
+            self.assertTrue(np.array_equal(resin.read_vars_in_frames(['V', 'H', 'U'], range(20), nb_threads=3),
+                                           values[:, [1, 2, 0]].transpose(1, 0, 2)))
+
+    def test_get_time(self):
+        for endian in ('>', '<'):
+            for float_type in ('f', 'd'):
+                times, _ = write_dummy_slf(self.path, endian, float_type)
+                with Serafin.Read(self.path, 'fr') as resin:
+                    resin.read_header()
+                    time = resin.get_time()
+                    self.assertTrue(np.array_equal(time, times))
+                    self.assertEqual(resin.time, list(times))
+                    self.assertIsNone(resin.buffer)  # the file is only mapped while the time is read
+                os.remove(self.path)
+
+    def test_read_in_frames(self):
+        time_indices = [0, 1, 2, 4, 3]
+        for use_memmap in (False, True):
+            for float_type in ('f', 'd'):
+                _, values = write_dummy_slf(self.path, float_type=float_type)
+                with Serafin.Read(self.path, 'fr', use_memmap=use_memmap) as resin:
+                    resin.read_header()
+                    block = resin.read_vars_in_frames(['H', 'U'], time_indices)
+                    self.assertEqual(block.shape, (2, 5, 4))
+                    self.assertTrue(np.array_equal(block[0], values[time_indices, 2]))
+                    self.assertTrue(np.array_equal(block[1], values[time_indices, 0]))
+
+                    out = np.empty((2, 4), dtype=values.dtype)
+                    resin.read_var_in_frames('V', [3, 4], out=out)
+                    self.assertTrue(np.array_equal(out, values[[3, 4], 1]))
+                    with self.assertRaises(Serafin.SerafinRequestError):
+                        resin.read_var_in_frames('V', [5])
+                os.remove(self.path)
+
+    def test_read_nodes_time_series(self):
+        for endian in ('>', '<'):
+            _, values = write_dummy_slf(self.path, endian, 'd')
+            with Serafin.Read(self.path, 'fr') as resin:
+                resin.read_header()
+                series = resin.read_nodes_time_series(['V', 'U'], [3, 0, 3], [4, 1, 2])
+                self.assertEqual(series.shape, (2, 3, 3))
+                self.assertTrue(np.array_equal(series[0], values[np.ix_([4, 1, 2], [1], [3, 0, 3])][:, 0]))
+                self.assertTrue(np.array_equal(series[1], values[np.ix_([4, 1, 2], [0], [3, 0, 3])][:, 0]))
+                self.assertIsNone(resin.buffer)
+                with self.assertRaises(Serafin.SerafinRequestError):
+                    resin.read_nodes_time_series(['U'], [4], [0])
+            os.remove(self.path)
+
+    def test_node_major(self):
+        _, values = write_dummy_slf(self.path, '<', 'd')
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            self.assertIsNone(resin.node_major)
+            block_size = settings.SERAFIN_READ_BLOCK_SIZE
+            settings.SERAFIN_READ_BLOCK_SIZE = 2 * 3 * 4 * 8  # blocks of 2 frames
+            try:
+                with mock.patch.object(resin, '_pread', wraps=resin._pread) as pread:
+                    write_node_major(resin)
+                # a single pass over the frames (each frame is read once, in order)
+                self.assertEqual([call[0][0] for call in pread.call_args_list],
+                                 [resin.header.header_size + time_index * resin.header.frame_size + 8 + 8 + 4
+                                  for time_index in range(5)])
+            finally:
+                settings.SERAFIN_READ_BLOCK_SIZE = block_size
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            self.assertIsNotNone(resin.node_major)
+            self.assertTrue(np.array_equal(resin.node_major.values, values.transpose(1, 2, 0)))
+            series = resin.read_nodes_time_series(['H', 'U'], [2, 1, 2], [3, 0])
+            self.assertTrue(np.array_equal(series[0], values[np.ix_([3, 0], [2], [2, 1, 2])][:, 0]))
+            self.assertTrue(np.array_equal(series[1], values[np.ix_([3, 0], [0], [2, 1, 2])][:, 0]))
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            self.assertIsNone(resin.node_major)
+
+    def test_header_cache(self):
+        times, values = write_dummy_slf(self.path, nb_planes=3)
+        settings.SERAFIN_HEADER_CACHE, settings.SERAFIN_HEADER_CACHE_DIR = True, ''
+        try:
+            with Serafin.Read(self.path, 'fr') as resin:
+                resin.read_header()
+                resin.get_time()
+                ref_header = resin.header
+            self.assertTrue(os.path.isdir(self.path + '.cache'))
+            with Serafin.Read(self.path, 'fr') as resin:
+                resin.read_header()
+                self.assertIsInstance(resin.header.ikle, np.memmap)
+                for name in ('nb_frames', 'nb_planes', 'var_IDs', 'header_size', 'frame_size', 'endian'):
+                    self.assertEqual(getattr(resin.header, name), getattr(ref_header, name))
+                for name in ('ikle', 'ipobo', 'x', 'y', 'ikle_2d'):
+                    self.assertTrue(np.array_equal(getattr(resin.header, name), getattr(ref_header, name)))
+                self.assertTrue(np.array_equal(resin.get_time(), times))
+                self.assertTrue(np.array_equal(resin.read_var_in_frame(2, 'Z'), values[2, 2]))
+
+            write_dummy_slf(self.path, nb_planes=3, nb_frames=2)
+            stat = os.stat(self.path)
+            os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000))
+            with Serafin.Read(self.path, 'fr') as resin:
+                resin.read_header()
+                self.assertNotIsInstance(resin.header.ikle, np.memmap)
+                self.assertEqual(resin.get_time().tolist(), [0., 10.])
+        finally:
+            settings.SERAFIN_HEADER_CACHE = False
+
+    def test_lazy_header(self):
+        write_dummy_slf(self.path, '<', 'd', nb_planes=3)
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            header = resin.header
+            self.assertIsNone(header._x)
+            self.assertEqual(header.nb_nodes, 12)
+            frame_size = header.frame_size
+        header.toggle_endianness()
+        header.to_single_precision()
+        header_copy = header.copy()
+        self.assertTrue(np.array_equal(header_copy.x, np.tile([3., 0., 6., 3.], 3)))
+        self.assertTrue(np.array_equal(header_copy.ikle_2d, [[1, 2, 4], [1, 4, 3], [2, 3, 4]]))
+        self.assertIsNone(header._x)
+
+        # a frame appended after the header was read (e.g. by a running simulation) is not a modification of the mesh
+        with open(self.path, 'r+b') as f:
+            f.seek(-frame_size, 2)
+            last_frame = f.read()
+            f.write(last_frame)
+        self.assertTrue(np.array_equal(header.x, np.tile([3., 0., 6., 3.], 3)))
+
+        headers = []
+        for _ in range(2):
+            with Serafin.Read(self.path, 'fr') as resin:
+                resin.read_header()
+                headers.append(resin.header)
+        write_dummy_slf(self.path, '<', 'd', nb_planes=2)  # another mesh
+        with self.assertRaises(Serafin.SerafinValidationError):
+            headers[0].ipobo
+        with open(self.path, 'r+b') as f:
+            f.truncate(100)
+        with self.assertRaises(Serafin.SerafinValidationError):
+            headers[1].ipobo
+
+    def test_frame_cache(self):
+        _, values = write_dummy_slf(self.path)
+        settings.SERAFIN_FRAME_CACHE_SIZE = 2 * 4 * 4  # two variables of 4 nodes in single precision
+        FRAME_CACHE.clear()
+        try:
+            with Serafin.Read(self.path, 'fr') as resin, Serafin.Read(self.path, 'fr') as other:
+                resin.read_header()
+                other.read_header()
+                for time_index, var_ID in [(0, 'U'), (1, 'U'), (0, 'U'), (2, 'H')]:
+                    self.assertTrue(np.array_equal(resin.read_var_in_frame(time_index, var_ID),
+                                                   values[time_index, resin.header.var_IDs.index(var_ID)]))
+                self.assertEqual((FRAME_CACHE.hits, FRAME_CACHE.misses, FRAME_CACHE.size), (1, 3, 32))
+                var_values = other.read_var_in_frame(0, 'U')  # shared with the first reader
+                self.assertEqual(FRAME_CACHE.hits, 2)
+                self.assertFalse(var_values.flags.writeable)
+                other.read_var_in_frame(1, 'U')  # discarded as least recently used
+                self.assertEqual(FRAME_CACHE.misses, 4)
+        finally:
+            settings.SERAFIN_FRAME_CACHE_SIZE = 0
+            FRAME_CACHE.clear()
+
+    def test_frame_cache_without_read_header(self):
+        other_path = self.path + '.other.slf'
+        _, values = write_dummy_slf(self.path, float_type='f')
+        _, other_values = write_dummy_slf(other_path, float_type='d', nb_frames=3)
+        headers = []
+        for path in (self.path, other_path):
+            with Serafin.Read(path, 'fr') as resin:
+                resin.read_header()
+                headers.append(resin.header)
+        settings.SERAFIN_FRAME_CACHE_SIZE = 1024
+        FRAME_CACHE.clear()
+        try:
+            with Serafin.Read(self.path, 'fr') as resin, Serafin.Read(other_path, 'fr') as other:
+                resin.header, other.header = headers  # as done by the GUI and the workflow
+                self.assertTrue(np.array_equal(resin.read_var_in_frame(0, 'U'), values[0, 0]))
+                var_values = other.read_var_in_frame(0, 'U')
+                self.assertEqual(var_values.dtype, np.float64)
+                self.assertTrue(np.array_equal(var_values, other_values[0, 0]))
+                self.assertEqual((FRAME_CACHE.hits, FRAME_CACHE.misses), (0, 2))
+        finally:
+            settings.SERAFIN_FRAME_CACHE_SIZE = 0
+            FRAME_CACHE.clear()
+            os.remove(other_path)
+
+    def test_iter_frames(self):
+        _, values = write_dummy_slf(self.path)
+        with Serafin.Read(self.path, 'fr') as resin:
+            resin.read_header()
+            for prefetch in (0, 1, 3):
+                time_indices = []
+                for time_index, frame_values in resin.iter_frames(['H', 'U'], [4, 0, 2], prefetch=prefetch):
+                    time_indices.append(time_index)
+                    self.assertTrue(np.array_equal(frame_values, values[time_index, [2, 0]]))
+                    var_values = resin.read_var_in_frame(time_index, 'H')  # a writable copy of the prefetched values
+                    self.assertTrue(np.array_equal(var_values, frame_values[0]))
+                    self.assertTrue(var_values.flags.writeable and not np.shares_memory(var_values, frame_values))
+                    self.assertIsNotNone(resin._prefetched_values(time_index, 2))
+                    with ThreadPoolExecutor(1) as executor:  # prefetched values are only seen by this thread
+                        self.assertIsNone(executor.submit(resin._prefetched_values, time_index, 2).result())
+                    self.assertTrue(np.array_equal(resin.read_var_in_frame(time_index, 'V'), values[time_index, 1]))
+                self.assertEqual(time_indices, [4, 0, 2])
+            for time_index, _ in resin.iter_frames(['U'], range(5), prefetch=1):  # early stop
+                break
+            self.assertIsNone(resin._prefetched.frame)
+            with self.assertRaises(Serafin.SerafinRequestError):
+                list(resin.iter_frames(['U'], [5]))
@@ -47,6 +47,8 @@ class PyTelToolsArgParse(argparse.ArgumentParser):
             self.add_argument('in_slf', help='Serafin input filename')
         elif 'out_slf' == arg_id:
             self.add_argument('out_slf', help='Serafin output filename')
+        elif 'out_slz' == arg_id:
+            self.add_argument('out_slz', help='Serafin archive output filename')
         elif 'out_csv' == arg_id:
             self.add_argument('out_csv', help='output csv file')
         elif 'shift' == arg_id:
@@ -123,7 +125,7 @@ class PyTelToolsArgParse(argparse.ArgumentParser):
         # Output files
         if 'force' in self.args_known_ids:
             if not new_args.force:
-                for out_arg in ('out_csv', 'out_slf'):
+                for out_arg in ('out_csv', 'out_slf', 'out_slz'):
                     if out_arg in new_args:
                         out_path = getattr(new_args, out_arg)
                         if os.path.isfile(out_path):
@@ -2,7 +2,6 @@ import math
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 from PyQt5.QtWidgets import *
-from shapely.geometry import Polygon
 
 from .util import ConfigureDialog
 
@@ -261,22 +260,7 @@ class Node(QGraphicsItem):
         pass
 
     def construct_mesh(self, mesh):
-        five_percent = 0.05 * mesh.nb_triangles
-        nb_processed = 0
-        current_percent = 0
-
-        for i, j, k in mesh.ikle:
-            t = Polygon([mesh.points[i], mesh.points[j], mesh.points[k]])
-            mesh.triangles[i, j, k] = t
-            mesh.index.insert(i, t.bounds, obj=(i, j, k))
-
-            nb_processed += 1
-            if nb_processed > five_percent:
-                nb_processed = 0
-                current_percent += 5
-                self.progress_bar.setValue(current_percent)
-                QApplication.processEvents()
-
+        mesh.build_index()
         self.progress_bar.setValue(0)
         QApplication.processEvents()
 
@@ -3,13 +3,12 @@ from multiprocessing import Process, Queue
 import numpy as np
 import os
 from shapefile import ShapefileException
-from shapely.geometry import Polygon
 
 from pyteltools.conf import settings
 from pyteltools.geom import BlueKenue, Shapefile
 from pyteltools.slf.datatypes import SerafinData, PolylineData, PointData, CSVData
 from pyteltools.slf.flux import FluxCalculator, PossibleFluxComputation, TriangularVectorField
-from pyteltools.slf.interpolation import MeshInterpolator
+from pyteltools.slf.interpolation import InterpolationMatrix, MeshInterpolator
 import pyteltools.slf.misc as operations
 from pyteltools.slf import Serafin
 from pyteltools.slf.variables import do_calculations_in_frame, get_available_variables, \
@@ -478,10 +477,9 @@ def write_simple_slf(input_data, filename):
         input_stream.header = input_data.header
         input_stream.time = input_data.time
 
-        with Serafin.Write(filename, input_data.language, True) as output_stream:
+        with Serafin.Write(filename, input_data.language, True, async_write=True) as output_stream:
             output_stream.write_header(output_header)
             for time_index in input_data.selected_time_indices:
-                # FIXME Optimization: Do calculations only on target layer and avoid reshaping afterwards
                 values = do_calculations_in_frame(input_data.equations, input_stream, time_index,
                                                   input_data.selected_vars, output_header.np_float_type,
                                                   is_2d=output_header.is_2d, us_equation=input_data.us_equation)
@@ -585,10 +583,10 @@ def write_arrival_duration(input_data, filename):
         for calculator in calculators:
             calculator.run()
 
-        values = np.empty((2*len(conditions), input_data.header.nb_nodes))
+        values = np.empty((2*len(conditions), input_data.header.nb_nodes),
+                          dtype=input_data.header.compute_float_type())
         for i, calculator in enumerate(calculators):
-            values[2*i, :] = calculator.arrival
-            values[2*i+1, :] = calculator.duration
+            values[2*i:2*i+2, :] = calculator.finishing_up()
 
         if time_unit == 'minute':
             values /= 60
@@ -661,7 +659,7 @@ def write_project_mesh(first_input, filename):
         mesh.index = second_input.index
         mesh.triangles = second_input.triangles
     else:
-        construct_mesh(mesh)
+        mesh.build_index()
         second_input.index = mesh.index
         second_input.triangles = mesh.triangles
 
@@ -702,27 +700,19 @@ def write_slf_layer_selection(input_data, filename):
         input_stream.header = input_data.header
         input_stream.time = input_data.time
 
+        layer_stream = Serafin.LayerRead(input_stream, input_data.metadata['layer_selection'])
         with Serafin.Write(filename, input_data.language, True) as output_stream:
             output_stream.write_header(output_header)
             for time_index in input_data.selected_time_indices:
-                values = do_calculations_in_frame(input_data.equations, input_stream, time_index,
-                                                  input_data.selected_vars, output_header.np_float_type,
-                                                  is_2d=output_header.is_2d, us_equation=input_data.us_equation)
-                new_shape = (values.shape[0], input_stream.header.nb_planes,
-                             values.shape[1] // input_stream.header.nb_planes)
-                values_at_layer = values.reshape(new_shape)[:, input_data.metadata['layer_selection'] - 1, :]
+                values_at_layer = do_calculations_in_frame(input_data.equations, layer_stream, time_index,
+                                                           input_data.selected_vars, output_header.np_float_type,
+                                                           is_2d=output_header.is_2d,
+                                                           us_equation=input_data.us_equation)
                 output_stream.write_entire_frame(output_header, input_data.time[time_index], values_at_layer)
 
     return True, success_message('Write Serafin', input_data.job_id)
 
 
-def construct_mesh(mesh):
-    for i, j, k in mesh.ikle:
-        t = Polygon([mesh.points[i], mesh.points[j], mesh.points[k]])
-        mesh.triangles[i, j, k] = t
-        mesh.index.insert(i, t.bounds, obj=(i, j, k))
-
-
 def compute_volume(node_id, fid, data, aux_data, options, csv_separator, fmt_float):
     if not data.header.is_2d:
         return False, node_id, fid, None, fail_message('the input file is not 2d', 'Compute Volume',
@@ -767,7 +757,7 @@ def compute_volume(node_id, fid, data, aux_data, options, csv_separator, fmt_flo
         mesh.index = data.index
         mesh.triangles = data.triangles
     else:
-        construct_mesh(mesh)
+        mesh.build_index()
         data.index = mesh.index
         data.triangles = mesh.triangles
 
@@ -831,7 +821,7 @@ def compute_flux(node_id, fid, data, aux_data, options, csv_separator, fmt_float
         mesh.index = data.index
         mesh.triangles = data.triangles
     else:
-        construct_mesh(mesh)
+        mesh.build_index()
         data.index = mesh.index
         data.triangles = mesh.triangles
 
@@ -889,7 +879,7 @@ def interpolate_points(node_id, fid, data, aux_data, options, csv_separator, fmt
         mesh.index = data.index
         mesh.triangles = data.triangles
     else:
-        construct_mesh(mesh)
+        mesh.build_index()
         data.index = mesh.index
         data.triangles = mesh.triangles
 
@@ -916,7 +906,7 @@ def interpolate_points(node_id, fid, data, aux_data, options, csv_separator, fmt
                                                     settings.FMT_COORD.format(y)))
     csv_data = CSVData(data.filename, header)
 
-    nb_selected_vars = len(selected_vars)
+    interpolation = InterpolationMatrix.from_point_interpolators(point_interpolators, data.header.nb_nodes)
 
     with Serafin.Read(data.filename, data.language) as input_stream:
         input_stream.header = data.header
@@ -925,13 +915,9 @@ def interpolate_points(node_id, fid, data, aux_data, options, csv_separator, fmt
         for index, index_time in enumerate(data.selected_time_indices):
             row = [str(data.time[index_time])]
 
-            var_values = []
-            for var in selected_vars:
-                var_values.append(input_stream.read_var_in_frame(index_time, var))
-
-            for (i, j, k), interpolator in point_interpolators:
-                for index_var in range(nb_selected_vars):
-                    row.append(fmt_float.format(interpolator.dot(var_values[index_var][[i, j, k]])))
+            var_values = np.array([input_stream.read_var_in_frame(index_time, var) for var in selected_vars])
+            for point_values in interpolation.interpolate(var_values).T:
+                row.extend(fmt_float.format(value) for value in point_values)
             csv_data.add_row(row)
 
     csv_data.write(filename, csv_separator)
@@ -973,7 +959,7 @@ def interpolate_lines(node_id, fid, data, aux_data, options, csv_separator, fmt_
         mesh.index = data.index
         mesh.triangles = data.triangles
     else:
-        construct_mesh(mesh)
+        mesh.build_index()
         data.index = mesh.index
         data.triangles = mesh.triangles
 
@@ -1048,7 +1034,7 @@ def project_lines(node_id, fid, data, aux_data, options, csv_separator, fmt_floa
         mesh.index = data.index
         mesh.triangles = data.triangles
     else:
-        construct_mesh(mesh)
+        mesh.build_index()
         data.index = mesh.index
         data.triangles = mesh.triangles
 
@@ -269,10 +269,10 @@ class WriteSerafinNode(OneInOneOutNode):
                 self.progress_bar.setValue(100 * (i+1) / len(input_data.selected_time_indices))
                 QApplication.processEvents()
 
-            values = np.empty((2*len(conditions), input_data.header.nb_nodes))
+            values = np.empty((2*len(conditions), input_data.header.nb_nodes),
+                              dtype=input_data.header.compute_float_type())
             for i, calculator in enumerate(calculators):
-                values[2*i, :] = calculator.arrival
-                values[2*i+1, :] = calculator.duration
+                values[2*i:2*i+2, :] = calculator.finishing_up()
 
             if time_unit == 'minute':
                 values /= 60
@@ -365,10 +365,8 @@ class WriteSerafinNode(OneInOneOutNode):
                 with Serafin.Write(self.filename, first_input.language, True) as out_stream:
                     out_stream.write_header(output_header)
 
-                    for i, (first_time_index, second_time_index) in enumerate(calculator.time_indices):
-                        values = calculator.operation_in_frame(first_time_index, second_time_index)
-                        out_stream.write_entire_frame(output_header,
-                                                      calculator.first_in.time[first_time_index], values)
+                    for i, (time, values) in enumerate(calculator.iter_frames()):
+                        out_stream.write_entire_frame(output_header, time, values)
 
                         self.progress_bar.setValue(100 * (i+1) / len(common_frames))
                         QApplication.processEvents()
@@ -389,16 +387,14 @@ class WriteSerafinNode(OneInOneOutNode):
         with Serafin.Read(input_data.filename, input_data.language) as input_stream:
             input_stream.header = input_data.header
             input_stream.time = input_data.time
+            layer_stream = Serafin.LayerRead(input_stream, input_data.metadata['layer_selection'])
             with Serafin.Write(self.filename, input_data.language, True) as output_stream:
                 output_stream.write_header(output_header)
                 for i, time_index in enumerate(input_data.selected_time_indices):
-                    # FIXME Optimization: Do calculations only on target layer and avoid reshaping afterwards
-                    values = do_calculations_in_frame(input_data.equations, input_stream, time_index,
-                                                      input_data.selected_vars, output_header.np_float_type,
-                                                      is_2d=output_header.is_2d, us_equation=input_data.us_equation)
-                    new_shape = (values.shape[0], input_stream.header.nb_planes,
-                                 values.shape[1] // input_stream.header.nb_planes)
-                    values_at_layer = values.reshape(new_shape)[:,input_data.metadata['layer_selection'] - 1,:]
+                    values_at_layer = do_calculations_in_frame(input_data.equations, layer_stream, time_index,
+                                                               input_data.selected_vars, output_header.np_float_type,
+                                                               is_2d=output_header.is_2d,
+                                                               us_equation=input_data.us_equation)
                     output_stream.write_entire_frame(output_header, input_data.time[time_index], values_at_layer)
                     self.progress_bar.setValue(100 * (i+1) / len(input_data.selected_time_indices))
                     QApplication.processEvents()